@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import simpy
+
+from elevatorcontrol import ElevatorControl
+from eventsink import NullSink
+from kpi import QuantileSketch
+from simulation import Simulation
+from trafficgenerator import TrafficGenerator
+
+
+# metric name -> True if higher is better
+METRICS = {
+    'requests_per_second': True,
+    'peak_memory_kb': False,
+    'latency_p50_us': False,
+    'latency_p99_us': False,
+    'arrivals_per_second': True,
+    'import_ms': False,
+    'run_ms': False,
+    'cold_start_ms': False,
+}
+
+# run in a fresh interpreter by bench_cold_start, prints import and run
+# times in ms
+COLD_START = '''
+import time
+start = time.perf_counter()
+from simulation import run
+from config import SimConfig
+imported = time.perf_counter()
+run(SimConfig(sim_time={sim_time}, num_elevators={num_elevators}))
+done = time.perf_counter()
+print((imported - start)*1000, (done - imported)*1000)
+'''
+
+
+def simulation_scenarios(quick=False):
+    """Returns end to end scenarios as (name, Simulation kwargs,
+    simulation end time)"""
+    sim_time = 5000 if quick else 50000
+    scenarios = []
+    for floors in [10, 40]:
+        for num_elevators in [1, 8, 24]:
+            for dist_lambda in [10, 1]:
+                if quick and (floors, num_elevators) == (40, 24):
+                    continue
+                name = f'sim-floors{floors}-cars{num_elevators}' + \
+                    f'-lambda{dist_lambda}'
+                scenarios.append((name, {
+                    'floors': tuple(range(1, floors + 1)),
+                    'num_elevators': num_elevators,
+                    'dist_lambda': dist_lambda,
+                    'batched_traffic': True,
+                }, sim_time))
+    return scenarios
+
+
+def bench_simulation(params, sim_time, seed=0):
+    """
+    Function runs one simulation measuring requests per wall second and
+    latency of ElevatorControl.request_service, then reruns it under
+    tracemalloc, which slows allocations down, for peak memory
+    """
+    sim = Simulation(sink=NullSink(), seed=seed, **params)
+    control = sim.elevatorcontrol
+    latency = QuantileSketch()
+    request_service = control.request_service
+
+    def timed_request_service(floor_at, floor_to, count):
+        start = time.perf_counter()
+        request = request_service(floor_at, floor_to, count)
+        latency.add((time.perf_counter() - start)*1e6)
+        return request
+
+    control.request_service = timed_request_service
+
+    start = time.perf_counter()
+    sim.run(sim_time)
+    wall_time = time.perf_counter() - start
+
+    tracemalloc.start()
+    Simulation(sink=NullSink(), seed=seed, **params).run(sim_time)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'requests_per_second': sim.requests/wall_time,
+        'peak_memory_kb': peak/1024,
+        'latency_p50_us': latency.quantile(0.5),
+        'latency_p99_us': latency.quantile(0.99),
+    }
+
+
+def bench_queue_depth(depth, floors=40, repeats=200, seed=0):
+    """
+    Function measures LookScheduler.add_request latency on an elevator
+    that already holds depth requests
+    """
+    rng = np.random.default_rng(seed)
+    floors = tuple(range(1, floors + 1))
+    latency = QuantileSketch()
+    control = ElevatorControl(simpy.Environment(), 1, floors, 1, 4, 4, 1,
+        sink=NullSink())
+    scheduler = control.schedulers[1]
+    pairs = [tuple(rng.choice(floors, 2, replace=False).tolist())
+        for _ in range(depth + repeats)]
+
+    for floor_from, floor_to in pairs[:depth]:
+        scheduler.add_request(floor_from, floor_to)
+    for floor_from, floor_to in pairs[depth:]:
+        start = time.perf_counter()
+        scheduler.add_request(floor_from, floor_to)
+        latency.add((time.perf_counter() - start)*1e6)
+
+    return {'latency_p50_us': latency.quantile(0.5),
+        'latency_p99_us': latency.quantile(0.99)}
+
+
+def bench_traffic(arrivals=200000, floors=40):
+    """Function measures arrivals drawn per second by
+    TrafficGenerator.arrivals"""
+    traffic = TrafficGenerator(simpy.Environment(), 10,
+        tuple(range(1, floors + 1)))
+    stream = traffic.arrivals()
+    start = time.perf_counter()
+    for _ in range(arrivals):
+        next(stream)
+    return {'arrivals_per_second': arrivals/(time.perf_counter() - start)}
+
+
+def bench_cold_start(sim_time=1000, num_elevators=2):
+    """
+    Function measures a short run through simulation.run in a fresh
+    interpreter, as orchestration starting many runs sees it: import
+    time, run time and the wall time of the whole process
+    """
+    code = COLD_START.format(sim_time=sim_time, num_elevators=num_elevators)
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', code], check=True,
+        capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    wall_time = time.perf_counter() - start
+    import_ms, run_ms = map(float, output.split())
+    return {'import_ms': import_ms, 'run_ms': run_ms,
+        'cold_start_ms': wall_time*1000}
+
+
+def run_benchmarks(quick=False, repeats=3):
+    """
+    Function runs the whole suite, keeping the best of repeats for
+    every metric to damp noise
+
+    :return: (dict) with 'meta' and 'results', scenario -> metrics
+    """
+    def best_of(bench, *args):
+        runs = [bench(*args) for _ in range(repeats)]
+        return {name: (max if METRICS[name] else min)(
+            run[name] for run in runs) for name in runs[0]}
+
+    results = {}
+    for name, params, sim_time in simulation_scenarios(quick):
+        results[name] = best_of(bench_simulation, params, sim_time)
+        print(f'{name:40s} {results[name]}', file=sys.stderr)
+
+    for depth in ([10, 100] if quick else [10, 100, 1000]):
+        name = f'queue-depth{depth}'
+        results[name] = best_of(bench_queue_depth, depth)
+        print(f'{name:40s} {results[name]}', file=sys.stderr)
+
+    results['traffic-arrivals'] = best_of(bench_traffic)
+    print(f"{'traffic-arrivals':40s} {results['traffic-arrivals']}",
+        file=sys.stderr)
+
+    results['cold-start'] = best_of(bench_cold_start)
+    print(f"{'cold-start':40s} {results['cold-start']}", file=sys.stderr)
+
+    meta = {'python': platform.python_version(), 'numpy': np.__version__,
+        'simpy': simpy.__version__, 'machine': platform.machine(),
+        'quick': quick, 'time': time.strftime('%Y-%m-%d %H:%M:%S')}
+    return {'meta': meta, 'results': results}
+
+
+def compare(baseline, current, tolerance=0.25):
+    """
+    Function lists metrics of current that are worse than baseline by
+    more than tolerance (relative)
+
+    :return: (list) of (scenario, metric, baseline value, current value)
+    """
+    regressions = []
+    for scenario, metrics in baseline['results'].items():
+        for name, base in metrics.items():
+            value = current['results'].get(scenario, {}).get(name)
+            if value is None or base is None or base == 0:
+                continue
+            change = (value - base)/base
+            if METRICS[name]:
+                change = -change
+            if change > tolerance:
+                regressions.append((scenario, name, base, value))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark simulation hot paths')
+    parser.add_argument('--quick', action='store_true',
+        help='fewer and shorter scenarios')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--save', metavar='FILE',
+        help='write results as JSON baseline')
+    parser.add_argument('--compare', metavar='FILE',
+        help='fail if results regress against JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+        help='allowed relative regression (default 0.25)')
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.quick, args.repeats)
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump(current, baseline_file, indent=2)
+    else:
+        print(json.dumps(current, indent=2))
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(json.load(baseline_file), current,
+                args.tolerance)
+        for scenario, name, base, value in regressions:
+            print(f'REGRESSION {scenario} {name}: {base:.1f} -> {value:.1f}')
+        if regressions:
+            sys.exit(1)
+        print('No regressions')
@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import multiprocessing
+
+from eventsink import NullSink
+from kpi import KPICollector
+import simulation
+
+
+def partition(buildings, workers):
+    """
+    Function splits buildings into at most workers contiguous shards,
+    balanced by number of elevators
+
+    :return: (list) of lists of (index, building dict)
+    """
+    indexed = list(enumerate(buildings))
+    workers = max(1, min(workers, len(indexed)))
+    weights = [building.get('num_elevators', 1) for building in buildings]
+    target = sum(weights)/workers
+
+    shards = [[]]
+    load = 0
+    for (index, building), weight in zip(indexed, weights):
+        if load >= target and len(shards) < workers:
+            shards.append([])
+            load = 0
+        shards[-1].append((index, building))
+        load += weight
+    return shards
+
+
+def run_shard(connection, shard, sim_params, seed):
+    """
+    Function runs in a worker process: builds one Simulation hosting the
+    buildings of shard and advances it to the times the coordinator
+    sends, replying after each window, until asked for results. The
+    buildings draw from streams of seed keyed by their campus index, so
+    results do not depend on how the campus is sharded
+    """
+    sim = simulation.Simulation(sink=NullSink(),
+        buildings=[building for _, building in shard], streams=seed,
+        first_building=shard[0][0] + 1, **sim_params)
+    sim.start()
+
+    while True:
+        command, value = connection.recv()
+        if command == 'run':
+            if value > sim.env.now:
+                sim.env.run(value)
+            connection.send(('done', sim.requests))
+        elif command == 'results':
+            buildings = sim.building_results()
+            connection.send(('results', (sim.requests,
+                [control.kpi for control in sim.controls], buildings)))
+            connection.close()
+            return
+
+
+def run_campus(buildings, sim_time, workers=None, window=None,
+        base_seed=simulation.RANDOM_SEED, progress=None, **sim_params):
+    """
+    Function simulates independent buildings (each with its own
+    ElevatorControl and TrafficGenerator) sharded across worker
+    processes. Workers advance in lockstep windows of simulation time,
+    so a campus run progresses evenly, and KPIs are merged at the end.
+
+    :param buildings: (int) number of identical buildings or (list) of
+        dicts overriding simulation.BUILDING_PARAMETERS per building
+    :param window: simulation time between synchronisations, a tenth
+        of sim_time by default
+    :param base_seed: seed of the buildings' random streams, see
+        streams.RandomStreams, each building draws its own whatever
+        the number of workers
+    :param progress: callable(time, requests) called after each window
+    :param sim_params: other Simulation parameters, e.g. engine
+    :return: (dict) with 'results' over the campus and 'buildings', a
+        list of per building KPI summaries
+    """
+    if isinstance(buildings, int):
+        buildings = [{}]*buildings
+    workers = workers or os.cpu_count() or 1
+    window = window or sim_time/10
+    shards = partition(buildings, workers)
+
+    connections = []
+    processes = []
+    for shard in shards:
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=run_shard,
+            args=(child, shard, sim_params, base_seed), daemon=True)
+        process.start()
+        connections.append(parent)
+        processes.append(process)
+
+    try:
+        now = 0
+        while now < sim_time:
+            now = min(now + window, sim_time)
+            for connection in connections:
+                connection.send(('run', now))
+            requests = sum(connection.recv()[1] for connection in connections)
+            if progress is not None:
+                progress(now, requests)
+
+        requests = 0
+        kpi = KPICollector()
+        building_results = []
+        for connection in connections:
+            connection.send(('results', None))
+        for connection in connections:
+            shard_requests, collectors, shard_buildings = connection.recv()[1]
+            requests += shard_requests
+            for collector in collectors:
+                kpi.merge(collector)
+            building_results.extend(shard_buildings)
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    results = {'sim_time': sim_time, 'requests': requests}
+    results.update(kpi.summary())
+    building_results.sort(key=lambda result: result['building'])
+    return {'results': results, 'buildings': building_results}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 3:
+        start = time.perf_counter()
+        campus = run_campus(int(sys.argv[2]), float(sys.argv[1]),
+            progress=lambda now, requests: print(f'{now:>12.1f}'
+            + f' {requests:>10d} requests', file=sys.stderr))
+        print(campus['results'])
+        print(f'Wall time {time.perf_counter() - start:.1f} s')
+    else:
+        print("Provide simulation time and number of buildings in format"+\
+        ": python campus.py SIM_TIME BUILDINGS")
@@ -0,0 +1,88 @@
+import pickle
+import random
+import sys
+import zlib
+
+import numpy as np
+
+from simulation import Simulation
+
+
+# file header, bumped whenever the snapshot layout changes
+MAGIC = b'ELVSIM\x00\x02'
+
+
+def dumps(sim: Simulation, level: int = 6):
+    """
+    Function serializes the state of sim, see Simulation.snapshot, as
+    a header followed by a zlib compressed pickle
+    :param level: (int) zlib compression level, 0 to 9
+    :return: (bytes)
+    """
+    state = pickle.dumps(sim.snapshot(), protocol=pickle.HIGHEST_PROTOCOL)
+    return MAGIC + zlib.compress(state, level)
+
+
+def loads(data: bytes, sink=None):
+    """
+    Function restores a simulation serialized by dumps. Snapshots are
+    pickles, only load the ones you trust.
+    :return: (Simulation)
+    """
+    if not data.startswith(MAGIC):
+        raise ValueError('Not a simulation checkpoint, or of another version')
+    state = pickle.loads(zlib.decompress(data[len(MAGIC):]))
+    return Simulation.restore(state, sink)
+
+
+def save(sim: Simulation, file_path, level: int = 6):
+    """Function writes the state of sim to a checkpoint file"""
+    with open(file_path, 'wb') as checkpoint:
+        checkpoint.write(dumps(sim, level))
+
+
+def load(file_path, sink=None):
+    """Function restores a simulation from a checkpoint file"""
+    with open(file_path, 'rb') as checkpoint:
+        return loads(checkpoint.read(), sink)
+
+
+def fork(data: bytes, seed=None, sink=None, reset_kpi=False):
+    """
+    Function starts a new run from a checkpoint, e.g. a warmed up
+    building, instead of simulating the warm-up again
+
+    :param data: (bytes) checkpoint made by dumps
+    :param seed: reseeds random and np.random, and the simulation's
+        streams if any, after the restore and drops arrivals drawn
+        ahead, so forks of the same checkpoint see different futures
+    :param reset_kpi: (bool) forget KPIs and request count of the
+        warm-up, requests in flight are delivered into the new KPIs
+    :return: (Simulation)
+    """
+    sim = loads(data, sink)
+    if reset_kpi:
+        sim.requests = 0
+        for control in sim.controls:
+            control.kpi = type(control.kpi)()
+            for elevator in control.elevators.values():
+                elevator.kpi = control.kpi
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+        if sim.streams is not None:
+            sim.streams.reseed(seed)
+        for traffic in sim.traffics:
+            traffic.discard_buffer()
+    return sim
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        # resume a checkpoint and run it further
+        sim = load(sys.argv[1])
+        sim.run(float(sys.argv[2]))
+        sim.close()
+    else:
+        print("Provide checkpoint and simulation time in format"+\
+        ": python checkpoint.py CHECKPOINT SIM_TIME")
@@ -0,0 +1,111 @@
+import json
+from dataclasses import dataclass, asdict, fields
+from typing import Optional, Union
+
+
+RANDOM_SEED = 42
+SIM_INIT_TIME = 0 # Initial simulation time
+FLOORS = tuple(range(1, 10))
+FLOOR_HEIGHT = 4  # in meters
+MAX_ACCELERATION = 1  # in meters per second square, same deceleration
+MAX_SPEED = 4  # in meters per second
+EXP_DIST_LAMBDA = 10 # Generating interarrival time
+
+
+def floor_tuple(floors):
+    """Function returns floors as a tuple, from a list as JSON gives it
+    or from a count of floors numbered from 1"""
+    if isinstance(floors, int):
+        return tuple(range(1, floors + 1))
+    if isinstance(floors, list):
+        return tuple(floors)
+    return floors
+
+
+@dataclass(frozen=True)
+class SimConfig:
+    """
+    Class: Everything a headless simulation run needs, typed and
+    validated once, for embedding the simulator in other programs, see
+    simulation.run. Plain data, so configs travel as JSON to workers.
+    The seed seeds the per-component streams, see streams.RandomStreams,
+    so runs never read or change the global random state. The event
+    engine is the default, it starts faster and needs no simpy.
+    """
+    sim_time: float
+    floors: tuple = FLOORS
+    num_elevators: int = 1
+    floor_height: float = FLOOR_HEIGHT
+    max_speed: float = MAX_SPEED
+    max_acceleration: float = MAX_ACCELERATION
+    dist_lambda: float = EXP_DIST_LAMBDA
+    capacity: Optional[int] = None
+    engine: str = 'events'
+    batched_traffic: bool = False
+    scheduler: str = 'look'
+    dispatch: str = 'eta'
+    retarget: bool = False
+    optimizer_period: Optional[float] = None
+    optimizer_budget: int = 200
+    buildings: Union[int, tuple] = 1
+    trace: Optional[str] = None
+    seed: int = RANDOM_SEED
+    start_time: float = SIM_INIT_TIME
+
+    def __post_init__(self):
+        object.__setattr__(self, 'floors', floor_tuple(self.floors))
+        if not isinstance(self.buildings, int):
+            # building overrides, see simulation.BUILDING_PARAMETERS
+            object.__setattr__(self, 'buildings', tuple(
+                dict(building, floors=floor_tuple(building['floors']))
+                if 'floors' in building else dict(building)
+                for building in self.buildings))
+
+        if not isinstance(self.floors, tuple) or len(self.floors) < 2:
+            raise ValueError('At least two floors are required')
+        if not isinstance(self.num_elevators, int) or self.num_elevators < 1:
+            raise ValueError('Number of elevators must be integer greater'
+                + ' than equal to 1')
+        for name in ('floor_height', 'max_speed', 'max_acceleration',
+                'dist_lambda'):
+            if getattr(self, name) <= 0:
+                raise ValueError(f'{name} must be positive')
+        if self.sim_time <= self.start_time:
+            raise ValueError('Simulation time must be after start time')
+        if not isinstance(self.seed, int) or self.seed < 0:
+            raise ValueError('Seed must be non negative integer')
+        if self.scheduler == 'cases' and self.capacity is not None:
+            raise ValueError('Capacity needs the look scheduler')
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Method creates config from a dict of its fields, unknown
+        keys are refused"""
+        names = {field.name for field in fields(cls)}
+        for name in data:
+            if name not in names:
+                raise ValueError(f'Unknown config field {name}')
+        return cls(**data)
+
+    @classmethod
+    def load(cls, file_path):
+        """Method reads config from a JSON file"""
+        with open(file_path) as config_file:
+            return cls.from_dict(json.load(config_file))
+
+    def to_dict(self):
+        return asdict(self)
+
+    def simulation_kwargs(self):
+        """Method returns the keyword arguments of simulation.Simulation
+        this config stands for"""
+        kwargs = self.to_dict()
+        del kwargs['sim_time']
+        kwargs['buildings'] = self.buildings if isinstance(self.buildings,
+            int) else [dict(building) for building in self.buildings]
+        kwargs['streams'] = kwargs.pop('seed')
+        return kwargs
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,207 @@
+import numpy as np
+
+
+# added to the ETA of full cars, they still take calls when all are
+FULL_PENALTY = 1e6
+
+
+class Dispatcher:
+    """
+    Class: Keeps the state of all elevators of a controller in NumPy
+    arrays (position, direction, queue length, turnaround floor) and
+    scores every car for a hall call in one vectorized pass using an
+    estimated time to arrival (ETA) cost built from the elevators'
+    travel time tables. Rows are refreshed one car at a time through sync
+    whenever that car changes, so selecting a car never loops over
+    the bank in Python. Full cars are passed over while others have room.
+    """
+    def __init__(self, elevators: dict, schedulers: dict, stop_time=None,
+            retarget=False):
+        """
+        :param elevators: (dict) e_id -> Elevator
+        :param schedulers: (dict) e_id -> LookScheduler of the elevator
+        :param stop_time: (float) cost of every queued stop, defaults to
+            the time an elevator loses accelerating and braking
+        :param retarget: (bool) moving cars can stop for calls they are
+            about to pass, see Elevator.retarget
+        """
+        self.elevators = elevators
+        self.retarget = retarget
+        self.schedulers = schedulers
+        self.e_ids = list(elevators)
+        self.rows = {e_id: row for row, e_id in enumerate(self.e_ids)}
+
+        first = elevators[self.e_ids[0]]
+        self.floors = np.array(first.possible_states)
+        self.floor_index = {floor: index
+            for index, floor in enumerate(first.possible_states)}
+
+        # travel[car, from, to], the elevators' travel time tables, and
+        # braking[car, from, to], when braking for to starts on the way
+        self.travel = np.stack([elevator.travel_time_table
+            for elevator in elevators.values()])
+        self.braking = np.stack([elevator.braking_table
+            for elevator in elevators.values()])
+        self.env = first.env
+
+        if stop_time is None:
+            stop_time = first.speed/first.max_accel
+        self.stop_time = stop_time
+
+        cars = len(self.e_ids)
+        self.cars = np.arange(cars)
+        self.position = np.zeros(cars, dtype=np.int64) # floor index
+        self.direction = np.zeros(cars, dtype=np.int64) # 1, -1, 0 if idle
+        self.queue_length = np.zeros(cars, dtype=np.int64)
+        self.turn = np.zeros(cars, dtype=np.int64) # floor index
+        self.full = np.zeros(cars, dtype=bool)
+        # move in progress, floor indices and departure time
+        self.moving = np.zeros(cars, dtype=bool)
+        self.move_from = np.zeros(cars, dtype=np.int64)
+        self.move_to = np.zeros(cars, dtype=np.int64)
+        self.depart = np.zeros(cars)
+        for e_id in self.e_ids:
+            self.sync(e_id)
+
+    def sync(self, e_id):
+        """Method refreshes the row of one elevator"""
+        elevator = self.elevators[e_id]
+        row = self.rows[e_id]
+        position = self.floor_index[elevator.current_state]
+        direction = elevator.get_current_direction()
+        direction = 1 if direction == 'up' else -1 if direction == 'down' \
+            else 0
+
+        # floor where the elevator reverses, it can reach floors in
+        # its direction of travel on the way there
+        turn = position
+        scheduler = self.schedulers.get(e_id)
+        if direction != 0 and scheduler is not None:
+            scheduler.sync()
+            if scheduler.runs and scheduler.runs[0].direction == direction:
+                turn = self.floor_index[scheduler.runs[0].end]
+
+        self.position[row] = position
+        self.direction[row] = direction
+        self.queue_length[row] = len(elevator.tasks)
+        self.turn[row] = turn
+        self.full[row] = elevator.is_full()
+        self.moving[row] = elevator.moving()
+        if self.moving[row]:
+            floor_from, floor_to, depart, _ = elevator.motion
+            self.move_from[row] = self.floor_index[floor_from]
+            self.move_to[row] = self.floor_index[floor_to]
+            self.depart[row] = depart
+
+    def eta(self, floor_at, floor_to=None):
+        """
+        Method returns estimated time for every elevator to reach
+        floor_at and depart towards floor_to
+
+        :return: (numpy.ndarray) ETA per elevator, in order of e_ids
+        """
+        at = self.floor_index[floor_at]
+        req_dir = 0 if floor_to is None else (1 if floor_to > floor_at else -1)
+
+        # idle cars, and cars passing floor_at in request direction,
+        # go straight there
+        ahead = (self.floors[at] - self.floors[self.position])*self.direction
+        direct = (self.direction == 0) | ((ahead >= 0) &
+            ((req_dir == 0) | (self.direction == req_dir)))
+
+        eta = np.where(direct,
+            self.travel[self.cars, self.position, at],
+            self.travel[self.cars, self.position, self.turn] +
+            self.travel[self.cars, self.turn, at])
+        if self.retarget:
+            eta = np.minimum(eta, self.retarget_eta(np.array([at]),
+                np.array([req_dir]))[:, 0])
+        return eta + self.queue_length*self.stop_time + \
+            self.full*FULL_PENALTY
+
+    def retarget_eta(self, at, req_dir):
+        """
+        Method returns time for every moving elevator to stop on its way
+        at floors it has not passed, as a trip from where its move set
+        off, see Elevator.retarget
+
+        :param at: (numpy.ndarray) floor indices of the calls
+        :param req_dir: (numpy.ndarray) 1 up, -1 down, 0 either way
+        :return: (numpy.ndarray) ETA[car, call], inf where the elevator
+            cannot stop
+        """
+        cars = self.cars[:, None]
+        move_from = self.move_from[:, None]
+        move_to = self.move_to[:, None]
+        direction = np.sign(self.floors[move_to] - self.floors[move_from])
+        at = at[None, :]
+        req_dir = req_dir[None, :]
+
+        elapsed = self.env.now - self.depart[:, None]
+        can = self.moving[:, None] & \
+            ((req_dir == 0) | (req_dir == direction)) & \
+            ((self.floors[at] - self.floors[move_from])*direction > 0) & \
+            ((self.floors[move_to] - self.floors[at])*direction > 0) & \
+            (elapsed <= self.braking[cars, move_from, at])
+        return np.where(can,
+            self.travel[cars, move_from, at] - elapsed, np.inf)
+
+    def eta_matrix(self, floors_at, directions):
+        """
+        Method returns estimated times for every elevator to reach many
+        hall calls at once, same estimate as eta
+
+        :param floors_at: sequence of (int) floors of the calls
+        :param directions: sequence of (int) 1 for up, -1 for down
+        :return: (numpy.ndarray) ETA[car, call], cars in order of e_ids
+        """
+        at = np.array([self.floor_index[floor] for floor in floors_at])
+        req_dir = np.asarray(directions)[None, :]
+        position = self.position[:, None]
+        direction = self.direction[:, None]
+        turn = self.turn[:, None]
+        cars = self.cars[:, None]
+
+        ahead = (self.floors[at][None, :] - self.floors[position])*direction
+        direct = (direction == 0) | ((ahead >= 0) & (direction == req_dir))
+
+        eta = np.where(direct,
+            self.travel[cars, position, at[None, :]],
+            self.travel[cars, position, turn] +
+            self.travel[cars, turn, at[None, :]])
+        if self.retarget:
+            eta = np.minimum(eta, self.retarget_eta(at, req_dir[0]))
+        return eta + (self.queue_length*self.stop_time +
+            self.full*FULL_PENALTY)[:, None]
+
+    def lookahead(self, floor_at, floor_to=None):
+        """
+        Method returns the time every elevator needs to reach floor_at
+        and depart towards floor_to, following its queued tasks, see
+        LookScheduler.eta_to and Elevator.eta_to
+
+        :return: (numpy.ndarray) ETA per elevator, in order of e_ids
+        """
+        directions = (1, -1) if floor_to is None else \
+            ((1 if floor_to > floor_at else -1),)
+        eta = np.empty(len(self.e_ids))
+        for row, e_id in enumerate(self.e_ids):
+            source = self.schedulers.get(e_id) or self.elevators[e_id]
+            eta[row] = min(source.eta_to(floor_at, direction)
+                for direction in directions)
+        if self.retarget:
+            eta = np.minimum(eta, self.retarget_eta(
+                np.array([self.floor_index[floor_at]]),
+                np.array([0 if floor_to is None else directions[0]]))[:, 0])
+        return eta + self.full*FULL_PENALTY
+
+    def select(self, floor_at, floor_to=None, lookahead=False):
+        """Method returns e_id of the elevator with least ETA, by the
+        vectorized estimate or by lookahead"""
+        eta = self.lookahead(floor_at, floor_to) if lookahead \
+            else self.eta(floor_at, floor_to)
+        return self.e_ids[int(np.argmin(eta))]
+
+
+if __name__ == '__main__':
+    pass
@@ -1,11 +1,154 @@
 from __future__ import division
-import simpy
 import random
 import numpy as np
 from contextlib import suppress
 import math
+from collections import deque
+from functools import lru_cache
 
-from printevent import print_event
+from eventsink import StdoutSink
+from taskqueue import TaskQueue
+from engine import EventEngine
+
+
+def compute_travel_time(dist, max_speed, max_accel):
+    """
+    Function calculates time to travel dist meters from stand still to
+    stand still, accelerating and braking at max_accel and cruising at
+    max_speed once reached
+
+    :return: (float) travel time rounded to 0.1
+    """
+    if dist == 0:
+        return 0
+
+    if math.sqrt(dist*max_accel) < max_speed:
+        return round((2*dist)/math.sqrt(dist*max_accel), 1)
+
+    return round(dist/max_speed + max_speed/max_accel, 1)
+
+
+def braking_start(dist, max_speed, max_accel):
+    """
+    Function returns time into a trip of dist meters from stand still at
+    which the elevator starts braking, the latest moment it can still
+    commit to stopping there. Unrounded, see compute_travel_time.
+    """
+    if dist*max_accel < max_speed*max_speed:
+        return math.sqrt(dist/max_accel)
+    return dist/max_speed
+
+
+def stopping_distance(elapsed, max_speed, max_accel):
+    """
+    Function returns the shortest trip, in meters, an elevator that set
+    off elapsed seconds ago can still stop at the end of, the inverse of
+    braking_start
+    """
+    if elapsed <= 0:
+        return 0
+    if elapsed*max_accel < max_speed:
+        return max_accel*elapsed*elapsed
+    return max_speed*elapsed
+
+
+def distance_travelled(elapsed, dist, max_speed, max_accel):
+    """
+    Function returns meters covered elapsed seconds into a trip of dist
+    meters from stand still to stand still, see compute_travel_time
+    """
+    if elapsed <= 0 or dist == 0:
+        return 0
+    if dist*max_accel < max_speed*max_speed:
+        # accelerate half way, then brake
+        half = math.sqrt(dist/max_accel)
+        total = 2*half
+        if elapsed < half:
+            return 0.5*max_accel*elapsed*elapsed
+    else:
+        half = max_speed/max_accel
+        total = dist/max_speed + half
+        if elapsed < half:
+            return 0.5*max_accel*elapsed*elapsed
+        if elapsed < total - half:
+            return 0.5*max_speed*half + max_speed*(elapsed - half)
+    if elapsed >= total:
+        return dist
+    left = total - elapsed
+    return dist - 0.5*max_accel*left*left
+
+
+@lru_cache(maxsize=None)
+def travel_time_table(floors: tuple, floor_height: float,
+        max_speed: float, max_accel: float):
+    """
+    Function builds the matrix of travel times between every pair of
+    floors. Travel time only depends on the number of floors travelled,
+    so it is computed once per distance and spread out. Tables are
+    shared by elevators of same kinematics and must not be modified.
+
+    :return: (numpy.ndarray) table[i, j] is travel time from floors[i]
+        to floors[j]
+    """
+    levels = np.array(floors)
+    distances = np.abs(levels[:, None] - levels[None, :])
+    by_distance = np.array([
+        compute_travel_time(distance*floor_height, max_speed, max_accel)
+        for distance in range(int(distances.max()) + 1)])
+    table = by_distance[distances]
+    table.flags.writeable = False
+    return table
+
+
+@lru_cache(maxsize=None)
+def braking_table(floors: tuple, floor_height: float, max_speed: float,
+        max_accel: float):
+    """
+    Function builds the matrix of braking_start times between every pair
+    of floors, shared like travel_time_table
+
+    :return: (numpy.ndarray) table[i, j] is the time into a trip from
+        floors[i] to floors[j] at which braking for floors[j] starts
+    """
+    levels = np.array(floors)
+    distances = np.abs(levels[:, None] - levels[None, :])
+    by_distance = np.array([
+        braking_start(distance*floor_height, max_speed, max_accel)
+        for distance in range(int(distances.max()) + 1)])
+    table = by_distance[distances]
+    table.flags.writeable = False
+    return table
+
+
+class Retarget:
+    """
+    Class: Cause of the interrupt telling a moving elevator's go_to
+    process that its move now ends at floor, at time arrive
+    """
+    __slots__ = ('floor', 'arrive')
+
+    def __init__(self, floor, arrive):
+        self.floor = floor
+        self.arrive = arrive
+
+
+# task types, Task.type holds the integer code
+HOLD, MOVE, OPEN_DOOR, CLOSE_DOOR = range(4)
+TASK_TYPES = ('hold', 'move', 'open door', 'close door')
+TASK_CODES = {name: code for code, name in enumerate(TASK_TYPES)}
+
+# what happened to a task, reported to a recorder.Recorder
+BEGIN, FINISH = 0, 1
+
+
+def task_code(task_type):
+    """Function returns the integer code of a task type given by name
+    or code"""
+    if task_type in TASK_CODES:
+        return TASK_CODES[task_type]
+    if task_type in (HOLD, MOVE, OPEN_DOOR, CLOSE_DOOR):
+        return task_type
+    raise ValueError(f'Unknown task type {task_type}')
 
 
 class Task:
@@ -13,37 +156,85 @@ class Task:
     Class: Creates a task object for elevators. Elevator object do not have visibility
     to request but their own tasks. ElevatorControl creates such tasks for elevators.
     """
+    __slots__ = ('elevator', 'type', 'prev', 'next', 'rank', 'eta', 'floor',
+        'floor_from', 'floor_to', 'count')
 
     def __init__(self, elevator_object, 
         task_type: ['hold', 'move', 'open door', 'close door'],
         floor=None, floor_from=None, floor_to=None, count=None):
 
         self.elevator = elevator_object
-        self.type = task_type
-
-        if self.type == 'move':
-            if (floor_from not in self.elevator.possible_states) or \
-                (floor_to not in self.elevator.possible_states):
+        self.type = task_code(task_type)
+
+        # links, order and prefix sum maintained by TaskQueue
+        self.prev = None
+        self.next = None
+        self.rank = None
+        self.eta = None
+
+        self.floor = None
+        self.floor_from = None
+        self.floor_to = None
+        self.count = None
+
+        if self.type == MOVE:
+            if (floor_from not in self.elevator.floor_index) or \
+                (floor_to not in self.elevator.floor_index):
                 raise ValueError('Destination floor is outside possible states')
             else:
                 self.floor_from = floor_from
                 self.floor_to = floor_to
 
-        if self.type in ['open door', 'close door', 'hold']:
-            if floor in self.elevator.possible_states:
+        else:
+            if floor in self.elevator.floor_index:
                 self.floor = floor
             else:
-                raise ValueError('Task {}: Floor is outside possible states'.format(self.type))
+                raise ValueError('Task {}: Floor is outside possible states'.format(
+                    TASK_TYPES[self.type]))
 
-        if self.type not in ['open door', 'close door']:
+        if self.type not in (OPEN_DOOR, CLOSE_DOOR):
             if not isinstance(count, int):
                 raise ValueError('People count must be integer')
             if count < 0:
                 raise ValueError('People count cannot be negative number')
             self.count = count
 
+    @property
+    def key(self):
+        """Tuple describing the task, (type, from, to) for 'move' tasks
+        and (type, floor) for the stationary ones"""
+        if self.type == MOVE:
+            return (TASK_TYPES[self.type], self.floor_from, self.floor_to)
+        return (TASK_TYPES[self.type], self.floor)
+
+    def snapshot(self):
+        """Method returns the task as plain data, see Elevator.snapshot"""
+        return (self.type, self.floor, self.floor_from, self.floor_to,
+            self.count)
+
     def update_count(self, count_delta):
         self.count = self.count + count_delta
+        tasks = self.elevator.tasks
+        if self.prev is not None or tasks.first is self:
+            # hold time depends on count
+            tasks.touch(self)
+
+    def duration(self):
+        """Method returns how long executing the task takes"""
+        if self.type == HOLD:
+            return max(2, self.count)
+
+        if self.type in (OPEN_DOOR, CLOSE_DOOR):
+            return 0.5
+
+        travel_time = self.elevator.get_travel_time(self.floor_from,
+            self.floor_to)
+        if self.elevator.capacity is not None:
+            # passenger model, holds at both ends expected from the
+            # requests assigned and on board, see begin
+            travel_time += self.elevator.expected_exchange(self.floor_from,
+                self.floor_to)
+        return travel_time
         
     def timeout(self, time):
         """
@@ -54,110 +245,209 @@ class Task:
             yield self.elevator.env.timeout(time)
             
     def go_to(self, travel_time):
-        """Method executes a 'move' type task and allows for interruption
-        by ElevatorControl"""
-
-        
-
-        # mark the start of execution
-        task_start_time = self.elevator.env.now
-
-        try:
-            self.elevator.current_state = self.floor_to
-            yield self.elevator.env.process(self.timeout(travel_time))
-
-            # Once reached, update current state
-            #self.elevator.current_state = self.floor_to
-
-        except simpy.Interrupt as interrupt:
-            # If interruted, get cause
-            cause = interrupt.cause
-            if 'Go to:' in cause:
-                try:
-                    self.floor_to = int(cause[cause.index(':') + 1:])
-
-                    # Initiate a new process
-                    #yield self.elevator.env.process(self.go_to(new_floor_to))
+        """Method executes a 'move' type task, ElevatorControl may stop
+        it short of floor_to on the way, see Elevator.retarget"""
+        import simpy # only simpy runs get here, see Simulation
+        elevator = self.elevator
+        elevator.current_state = self.floor_to
+        elevator.notify()
+
+        # task_end moves if the elevator is retargeted
+        while True:
+            try:
+                yield elevator.env.process(
+                    self.timeout(elevator.task_end - elevator.env.now))
+                return
+            except simpy.Interrupt as interrupt:
+                if not isinstance(interrupt.cause, Retarget):
+                    raise
+
+    def begin(self):
+        """
+        Method applies the effects of starting the task, shared by both
+        engines, and returns how long the task takes
+        """
+        if self.type != MOVE:
+            duration = self.duration()
+            if self.elevator.recorder is not None:
+                self.elevator.recorder.task(self.elevator, BEGIN, self)
+            return duration
+
+        # get travel time
+        travel_time = self.elevator.get_travel_time(self.floor_from,
+            self.floor_to)
+
+        # pick up requests leaving from here in this direction
+        boarded = self.elevator.board(self.floor_from,
+            1 if self.floor_to > self.floor_from else -1)
+
+        depart = self.elevator.env.now
+        duration = travel_time
+        if self.elevator.capacity is not None:
+            # passenger model, the car holds at both ends of the move
+            # while people get on and off
+            depart += self.elevator.exchange_time(boarded)
+            duration += self.elevator.exchange_time(boarded) + \
+                self.elevator.exchange_time(
+                    self.elevator.riders_to(self.floor_to))
+        self.elevator.motion = (self.floor_from, self.floor_to, depart,
+            depart + travel_time)
+
+        sink = self.elevator.sink
+        if sink.enabled:
+            sink.emit(
+                time=round(self.elevator.env.now,1),
+                event=f'Moving elevator to {self.floor_to}',
+                etc=round(self.elevator.env.now + duration,1)
+            )
+        if self.elevator.recorder is not None:
+            self.elevator.recorder.task(self.elevator, BEGIN, self)
+        return duration
 
-                except IndexError | ValueError:
-                    pass
+    def finish(self):
+        """Method applies the effects of completing the task"""
+        if self.type == MOVE:
+            self.elevator.alight(self.floor_to)
+        if self.elevator.recorder is not None:
+            self.elevator.recorder.task(self.elevator, FINISH, self)
 
     def execute_task(self):
 
-        if self.type == 'hold':
+        duration = self.begin()
+        self.elevator.task_end = self.elevator.env.now + duration
+
+        if self.type == MOVE:
+            self.elevator.last_go_to_process = \
+                self.elevator.env.process(self.go_to(duration))
+            yield self.elevator.last_go_to_process
+        else:
             #print(" "*25 + f'Holding elevator at floor {self.elevator.current_state} at time {round(self.elevator.env.now, 1)}')
-            yield self.elevator.env.process(self.timeout(max(2, self.count)))
+            yield self.elevator.env.process(self.timeout(duration))
 
-        if self.type in ['open door', 'close door']:
-            yield self.elevator.env.process(self.timeout(0.5))
-
-        if self.type == 'move':
-            # get travel time
-            travel_time = self.elevator.get_travel_time(
-                self.floor_from, self.floor_to)
-
-            print_event(
-                time=round(self.elevator.env.now,1),
-                event=f'Moving elevator to {self.floor_to}',
-                etc=round(self.elevator.env.now + travel_time,1)
-            )
-            yield self.elevator.env.process(self.go_to(travel_time))
+        self.finish()
 
 
 class Elevator:
     """Class: Creates an elevator object with properties such as current
     state (floor which elevator is at), speed, possible states (floors).
     Also, handles and acts on various requests"""
+    __slots__ = ('env', 'sink', 'elevator', 'possible_states', 'floor_height',
+        'floor_index', 'current_state', 'speed', 'max_accel', 'current_speed',
+        'current_altitude', 'current_acceleration', 'time_to_max_speed',
+        'travel_time_table', 'last_go_to_process', 'tasks', 'current_task',
+        'state_listener', 'waiting', 'riders', 'kpi', 'task_end',
+        'capacity', 'load', 'overflow', 'hall', 'process', 'recorder',
+        'braking_table', 'motion', 'finish_event', 'scheduler')
+
     def __init__(self, sim_env, floors: tuple, floor_height: float,
-            max_speed: float, max_accel: float):
+            max_speed: float, max_accel: float, sink=None, capacity=None,
+            rng=None):
         self.env = sim_env
-        self.elevator = simpy.Resource(self.env)
+        # event sink receiving trace events of this elevator
+        self.sink = sink if sink is not None else StdoutSink()
+        # simpy resource of the car, unused by the event engine
+        self.elevator = None
+        if not isinstance(sim_env, EventEngine):
+            import simpy
+            self.elevator = simpy.Resource(self.env)
         if type(floors) == tuple:
             self.possible_states = floors
         else:
             raise TypeError('Floors must be tuple!!')
 
         self.floor_height = floor_height
-
-        self.current_state = random.choice(self.possible_states)
+        self.floor_index = {floor: index
+            for index, floor in enumerate(self.possible_states)}
+
+        # start floor, from rng (a numpy.random.Generator, see
+        # streams.RandomStreams) if given
+        if rng is not None:
+            self.current_state = self.possible_states[
+                int(rng.integers(len(self.possible_states)))]
+        else:
+            self.current_state = random.choice(self.possible_states)
+        # kinematics
         self.speed = max_speed
         self.max_accel = max_accel
-        self.kinematics = {'current_speed': 0,
-                           'current_altitude': floor_height*(self.current_state - 1),
-                           'current_acceleration': 0,
-                           'max_speed': max_speed,
-                           'max_acceleration': max_accel,
-                           'time_to_max_speed': max_speed/max_accel}
-
+        self.current_speed = 0.0
+        self.current_altitude = floor_height*(self.current_state - 1)
+        self.current_acceleration = 0.0
+        self.time_to_max_speed = max_speed/max_accel
+
+        # travel times between all floors, indexed through floor_index
+        self.travel_time_table = travel_time_table(self.possible_states,
+            floor_height, max_speed, max_accel)
+
+        # time into a trip at which braking starts, same indexing
+        self.braking_table = braking_table(self.possible_states,
+            floor_height, max_speed, max_accel)
+        # move in progress as (floor_from, floor_to, departure, arrival)
+        self.motion = None
+
+        # go_to process of the move in progress with simpy, finishing
+        # event of the current task with an EventEngine
         self.last_go_to_process = None
-
-        self.tasks = {} # dictionary holding all tasks
-        self.task_keys = []
-        self.current_task_key = None
+        self.finish_event = None
+
+        # pending tasks, in order of execution, with prefix sums of
+        # their durations for look-ahead ETAs
+        self.tasks = TaskQueue(Task.duration)
+        self.current_task = None
+        # scheduler.LookScheduler planning the queue, if any
+        self.scheduler = None
+        # simpy process working through the tasks, or the event that
+        # begins the first of them with an EventEngine
+        self.process = None
+        self.task_end = None # time the current task completes
+
+        # called with the elevator whenever it sets off or goes idle
+        self.state_listener = None
+
+        # requests assigned to this elevator waiting by (floor, direction)
+        # in arrival order, requests on board by destination floor
+        self.waiting = {}
+        self.riders = {}
+        self.kpi = None # KPICollector recording deliveries
+        self.recorder = None # recorder.Recorder of task transitions
+
+        # passenger model: people the car holds, None for no limit and
+        # no time spent boarding, people on board, (floor, direction)
+        # of the last boarding that left people behind or filled the
+        # car, and passengers.HallQueues counting people waiting
+        if capacity is not None and (not isinstance(capacity, int)
+                or capacity < 1):
+            raise ValueError('Capacity must be a positive integer')
+        self.capacity = capacity
+        self.load = 0
+        self.overflow = None
+        self.hall = None
 
 
     def get_travel_time(self, floor_from: int, floor_to: int):
         """
-        Method calculates travel time between two floors depending
+        Method looks up travel time between two floors depending
         on elevator kinematics
 
         :param floor_from: (int)
         :param floor_to: (int)
         :return: (float) travel time
         """
-        if (floor_from not in self.possible_states) or \
-            (floor_to not in self.possible_states):
+        index_from = self.floor_index.get(floor_from)
+        index_to = self.floor_index.get(floor_to)
+        if index_from is None or index_to is None:
             return 0
-        dist = abs(floor_from - floor_to)*self.floor_height
-
-        if math.sqrt(dist*self.max_accel) < self.speed:
-            time = round((2*dist)/math.sqrt(dist*self.max_accel), 1)
+        return self.travel_time_table.item(index_from, index_to)
 
-        else:    
-            time = round((abs(floor_from - floor_to)*self.floor_height)/self.speed + \
-            self.speed/self.max_accel, 1)
+    def get_travel_times(self, floor_from: int, floors_to):
+        """
+        Method looks up travel times from one floor to many at once
 
-        return time
+        :param floor_from: (int)
+        :param floors_to: iterable of (int), all possible states
+        :return: (numpy.ndarray) travel times
+        """
+        indices = [self.floor_index[floor] for floor in floors_to]
+        return self.travel_time_table[self.floor_index[floor_from], indices]
 
     def get_current_direction(self):
         """
@@ -166,38 +456,152 @@ class Elevator:
 
         :return (str or None) 'up'/'down'/None
         """
-        if self.current_task_key is None:
+        if self.current_task is None:
             # if not executing any tasks
             return None
 
+        elif self.current_task.type != MOVE:
+            # look at subsequent tasks to find 'move' type task
+            for task in self.tasks:
+                if task.type == MOVE:
+                    return 'up' if task.floor_to - task.floor_from > 0 \
+                    else 'down'
+
         else:
-            # executing some task
-            key_iterator = iter(self.current_task_key)
-            current_task_type = next(key_iterator, None)
-
-            if current_task_type in ['hold', 'open door', 'close door']:
-                index = 0
-
-                # look at subsequent tasks to find 'move' type task
-                while index < len(self.task_keys):
-                    key_iterator = iter(self.task_keys[index])
-                    next_task_type = next(key_iterator, None)
-                    if next_task_type == 'move':
-                        floor_from = next(key_iterator, None)
-                        floor_to = next(key_iterator, None)
-
-                        return 'up' if floor_to - floor_from > 0 \
-                        else 'down'
-                    index += 1
-
-            elif current_task_type == 'move':
-                floor_from = next(key_iterator, None)
-                floor_to = next(key_iterator, None)
-
-                return 'up' if floor_to - floor_from > 0 \
-                else 'down'
+            return 'up' if self.current_task.floor_to - \
+            self.current_task.floor_from > 0 else 'down'
+
         return None
 
+    def remaining_time(self):
+        """Method returns time left of the task in progress, 0 if idle"""
+        if self.current_task is None or self.task_end is None:
+            return 0
+        return max(0, self.task_end - self.env.now)
+
+    def eta_to(self, floor, direction):
+        """
+        Method returns time until the elevator can stop at floor to
+        leave in direction, following its queue as it is. Time spent on
+        the queue comes from its prefix sums, see TaskQueue.elapsed.
+
+        :param floor: (int)
+        :param direction: (int) 1 for up, -1 for down
+        :return: (float)
+        """
+        eta = self.remaining_time()
+        position = self.current_state
+        for task in self.tasks:
+            if task.type != MOVE:
+                continue
+            if (task.floor_to - task.floor_from)*direction > 0 and \
+            (floor - task.floor_from)*direction >= 0 and \
+            (task.floor_to - floor)*direction >= 0:
+                # stop on the way of this move
+                return eta + self.tasks.elapsed(task.prev) + \
+                    self.departure_time(task) + \
+                    self.get_travel_time(task.floor_from, floor)
+            position = task.floor_to
+        return eta + self.tasks.elapsed(self.tasks.last) + \
+            self.get_travel_time(position, floor)
+
+    def moving(self):
+        """Method checks whether the elevator is on a move, including the
+        stops at both ends of it"""
+        return self.current_task is not None and \
+            self.current_task.type == MOVE and self.motion is not None
+
+    def position(self, time=None):
+        """
+        Method returns where the elevator is at time, now by default,
+        from the kinematics of the move in progress, in O(1)
+
+        :return: (float) floor, fractional between floors
+        """
+        if not self.moving():
+            return float(self.current_state)
+        time = self.env.now if time is None else time
+        floor_from, floor_to, depart, _ = self.motion
+        dist = abs(floor_to - floor_from)*self.floor_height
+        covered = distance_travelled(time - depart, dist, self.speed,
+            self.max_accel)
+        direction = 1 if floor_to > floor_from else -1
+        return floor_from + direction*covered/self.floor_height
+
+    def stoppable_floor(self, time=None):
+        """
+        Method returns the first floor the elevator can still stop at,
+        at time, now by default, braking at max_accel. It is floor_to of
+        the move in progress once the elevator is braking for it, the
+        floor it is at if it is not moving.
+
+        :return: (int)
+        """
+        if not self.moving():
+            return self.current_state
+        time = self.env.now if time is None else time
+        floor_from, floor_to, depart, _ = self.motion
+        floors = math.ceil(stopping_distance(time - depart, self.speed,
+            self.max_accel)/self.floor_height - 1e-9)
+        floors = min(max(1, floors), abs(floor_to - floor_from))
+        return floor_from + (floors if floor_to > floor_from else -floors)
+
+    def can_stop_at(self, floor, time=None):
+        """Method checks whether the elevator can stop at floor before
+        floor_to of the move in progress, at time, now by default"""
+        if not self.moving():
+            return False
+        time = self.env.now if time is None else time
+        floor_from, floor_to, depart, _ = self.motion
+        direction = 1 if floor_to > floor_from else -1
+        if (floor - floor_from)*direction <= 0 or \
+        (floor_to - floor)*direction <= 0 or floor not in self.floor_index:
+            return False
+        return time - depart <= self.braking_table.item(
+            self.floor_index[floor_from], self.floor_index[floor])
+
+    def retarget(self, floor):
+        """
+        Method stops the move in progress at floor, which the elevator
+        has not passed yet, see can_stop_at. The move arrives at floor
+        as a trip from floor_from to floor would, and a move on to the
+        old floor_to is put in front of the queue. The caller reports the
+        change with notify, once its own plans include the new move.
+
+        :return: (Task) the move on to the old floor_to, None if the
+            elevator cannot stop at floor
+        """
+        if not self.can_stop_at(floor):
+            return None
+        if not isinstance(self.env, EventEngine) and (
+                self.last_go_to_process is None or
+                not self.last_go_to_process.is_alive):
+            # move resumed from a checkpoint, it runs to its end
+            return None
+
+        task = self.current_task
+        floor_from, floor_to, depart, _ = self.motion
+        arrive = depart + self.get_travel_time(floor_from, floor)
+        onward = Task(self, MOVE, floor_from=floor, floor_to=floor_to,
+            count=0)
+        if self.tasks.first is None:
+            self.tasks.append(onward)
+        else:
+            self.tasks.insert_before(self.tasks.first, onward)
+
+        task.floor_to = floor
+        self.current_state = floor
+        self.motion = (floor_from, floor, depart, arrive)
+        self.task_end = arrive
+        if isinstance(self.env, EventEngine):
+            self.env.cancel(self.finish_event)
+            self.finish_event = self.env.schedule(arrive - self.env.now,
+                self.finish_task, task)
+        elif self.env.active_process is not self.last_go_to_process:
+            # go_to itself reads task_end once it starts waiting
+            self.last_go_to_process.interrupt(Retarget(floor, arrive))
+        return onward
+
     def process_tasks(self):
         """
         Method executes all the pending tasks for the elevator
@@ -206,20 +610,296 @@ class Elevator:
 
         # while there are pending tasks
         while len(self.tasks) >= 1:
-            # get key to next task
-            self.current_task_key = self.task_keys.pop(0)
-
             # get the next task
-            task = self.tasks[self.current_task_key]
+            self.current_task = self.tasks.popleft()
 
             # execute and yield
-            yield self.env.process(task.execute_task())
-
-            # delete it from tasks
-            del self.tasks[self.current_task_key]
+            yield self.env.process(self.current_task.execute_task())
 
         # after all the tasks are finished 
-        self.current_task_key = None
+        self.current_task = None
+        self.process = None
+        self.notify()
+
+    def assign(self, request, *others):
+        """Method makes elevator responsible for picking up request, and
+        others waiting at the same floor in the same direction"""
+        key = (request.floor_from, request.direction)
+        if key in self.waiting:
+            self.waiting[key].append(request)
+        else:
+            self.waiting[key] = deque((request,))
+        self.waiting[key].extend(others)
+        if self.hall is not None:
+            self.hall.add(request)
+            for other in others:
+                self.hall.add(other)
+        self.exchange_changed(key)
+
+    def unassign(self, request):
+        """Method takes back a request assigned but not picked up"""
+        key = (request.floor_from, request.direction)
+        self.waiting[key].remove(request)
+        if not self.waiting[key]:
+            del self.waiting[key]
+        if self.hall is not None:
+            self.hall.remove(request)
+        self.exchange_changed(key)
+
+    def release(self, key):
+        """
+        Method takes back all requests assigned but not picked up at
+        (floor, direction) key
+        :return: (deque) the requests, in arrival order
+        """
+        requests = self.waiting.pop(key, deque())
+        if self.hall is not None:
+            for request in requests:
+                self.hall.remove(request)
+        self.exchange_changed(key)
+        return requests
+
+    def board(self, floor, direction):
+        """
+        Method picks up requests waiting at floor to go in direction, in
+        order of arrival. With a capacity, groups that do not fit any
+        more stay waiting and later ones that do fit get on, see overflow
+        :return: (int) people boarded
+        """
+        key = (floor, direction)
+        requests = self.waiting.get(key)
+        if not requests:
+            return 0
+
+        if self.capacity is None:
+            del self.waiting[key]
+            boarding = requests
+        else:
+            # take groups off the front while there is room, groups
+            # too big for the room left keep their place
+            room = self.capacity - self.load
+            boarding = []
+            skipped = []
+            while requests and room > 0:
+                request = requests.popleft()
+                if request.count <= room:
+                    room -= request.count
+                    boarding.append(request)
+                else:
+                    skipped.append(request)
+            requests.extendleft(reversed(skipped))
+            if not requests:
+                del self.waiting[key]
+            if requests or room == 0:
+                self.overflow = key
+
+        now = self.env.now
+        people = 0
+        for request in boarding:
+            request.pickup_time = now
+            people += request.count
+            if request.floor_to in self.riders:
+                self.riders[request.floor_to].append(request)
+            else:
+                self.riders[request.floor_to] = [request]
+            if self.hall is not None:
+                self.hall.remove(request)
+        self.load += people
+        self.exchange_changed(key,
+            {request.floor_to for request in boarding})
+        return people
+
+    def alight(self, floor):
+        """
+        Method drops off requests on board going to floor
+        :return: (int) people alighted
+        """
+        requests = self.riders.pop(floor, None)
+        people = 0
+        if requests:
+            now = self.env.now
+            for request in requests:
+                request.dropoff_time = now
+                people += request.count
+                if self.kpi is not None:
+                    self.kpi.record_delivery(request)
+            self.exchange_changed(floors=(floor,))
+        self.load -= people
+        return people
+
+    def riders_to(self, floor):
+        """Method returns number of people on board going to floor"""
+        return sum(request.count for request in self.riders.get(floor, ()))
+
+    def is_full(self):
+        """Method checks whether the car has no room left"""
+        return self.capacity is not None and self.load >= self.capacity
+
+    def exchange_time(self, people):
+        """
+        Method returns how long the car holds at a stop for people to get
+        on or off, as a 'hold' task of that count, 0 for nobody
+        """
+        return max(2, people) if people else 0
+
+    def expected_exchange(self, floor_from, floor_to, alighting=True):
+        """
+        Method returns how long a move from floor_from to floor_to is
+        expected to hold at its ends: people waiting for the car at
+        floor_from in its direction get on, as many as fit, and they
+        and the riders going to floor_to get off there
+        :param alighting: (bool) False for the hold at floor_from only,
+            before the car departs
+        """
+        direction = 1 if floor_to > floor_from else -1
+        boarding = 0
+        leaving = self.riders_to(floor_to)
+        for request in self.waiting.get((floor_from, direction), ()):
+            boarding += request.count
+            if request.floor_to == floor_to:
+                leaving += request.count
+        hold = self.exchange_time(min(boarding, self.capacity))
+        return hold + self.exchange_time(leaving) if alighting else hold
+
+    def departure_time(self, task):
+        """Method returns how long a queued move is expected to hold
+        before the car leaves, 0 without a capacity"""
+        if self.capacity is None:
+            return 0
+        return self.expected_exchange(task.floor_from, task.floor_to, False)
+
+    def exchange_changed(self, key=None, floors=()):
+        """
+        Method marks the durations of queued moves stale once people are
+        assigned, picked up or dropped off, see expected_exchange. Those
+        are the moves leaving a floor people wait at and the moves into
+        a floor riders go to, the scheduler finds the earliest of them
+        and the sums after it are recomputed with it
+
+        :param key: (floor, direction) of the people waiting that changed
+        :param floors: floors whose riders changed
+        """
+        if self.capacity is None or self.tasks.first is None:
+            return
+        if self.scheduler is None:
+            # queue not indexed, any move may have changed
+            self.tasks.touch(self.tasks.first)
+            return
+        task = self.scheduler.exchange_task(key, floors)
+        if task is not None:
+            self.tasks.touch(task)
+
+    def start(self):
+        """
+        Method starts processing tasks of an idle elevator, as a simpy
+        process or as callbacks of an EventEngine
+        """
+        if self.process is not None:
+            # started already if the process has not begun yet
+            return
+        if isinstance(self.env, EventEngine):
+            # like a simpy process, the first task begins after the
+            # current event, requests arriving with it see a car that
+            # has not left yet on both engines
+            self.process = self.env.schedule(0, self.start_tasks)
+        else:
+            self.process = self.env.process(self.process_tasks())
+
+    def start_tasks(self):
+        self.process = None
+        self.run_next_task()
+
+    def run_next_task(self):
+        """
+        Method starts the next pending task on an EventEngine and
+        schedules its completion, the callback version of process_tasks
+        """
+        if len(self.tasks) == 0:
+            # after all the tasks are finished 
+            self.current_task = None
+            self.notify()
+            return
+
+        task = self.current_task = self.tasks.popleft()
+        duration = task.begin()
+        self.task_end = self.env.now + duration
+        if task.type == MOVE:
+            self.current_state = task.floor_to
+            self.notify()
+        self.finish_event = self.env.schedule(duration, self.finish_task,
+            task)
+
+    def finish_task(self, task):
+        task.finish()
+        self.run_next_task()
+
+    def snapshot(self):
+        """
+        Method returns the state of the elevator as plain data, tasks as
+        (type, floor, floor_from, floor_to, count) tuples. Requests are
+        kept as objects, they are shared with the KPICollector.
+        """
+        return {
+            'current_state': self.current_state,
+            'tasks': [task.snapshot() for task in self.tasks],
+            'current_task': None if self.current_task is None
+                else self.current_task.snapshot(),
+            'task_end': self.task_end,
+            'motion': self.motion,
+            'waiting': self.waiting,
+            'riders': self.riders,
+        }
+
+    def restore(self, state):
+        """
+        Method sets the state of an idle elevator from snapshot, the
+        current task is resumed separately, see resume
+        :return: (list) restored pending tasks, in order
+        """
+        self.current_state = state['current_state']
+        self.current_altitude = self.floor_height*(self.current_state - 1)
+        self.tasks.clear()
+        for task_type, floor, floor_from, floor_to, count in state['tasks']:
+            self.tasks.append(Task(self, task_type, floor=floor,
+                floor_from=floor_from, floor_to=floor_to, count=count))
+        self.waiting = state['waiting']
+        self.riders = state['riders']
+        self.load = sum(request.count for requests in self.riders.values()
+            for request in requests)
+        self.overflow = None
+        return list(self.tasks)
+
+    def resume(self, state):
+        """
+        Method continues the task that was in progress at the snapshot,
+        its start effects already applied, then the pending tasks
+        """
+        if state['current_task'] is None:
+            return
+        task_type, floor, floor_from, floor_to, count = state['current_task']
+        task = self.current_task = Task(self, task_type, floor=floor,
+            floor_from=floor_from, floor_to=floor_to, count=count)
+        self.task_end = state['task_end']
+        remaining = max(0, self.task_end - self.env.now)
+
+        self.motion = state.get('motion')
+        if isinstance(self.env, EventEngine):
+            self.finish_event = self.env.schedule(remaining,
+                self.finish_task, task)
+        else:
+            self.process = self.env.process(
+                self.resume_tasks(task, remaining))
+
+    def resume_tasks(self, task, remaining):
+        """simpy process of resume"""
+        yield self.env.timeout(remaining)
+        task.finish()
+        yield from self.process_tasks()
+
+    def notify(self):
+        """Method reports a change of state to the state listener"""
+        if self.state_listener is not None:
+            self.state_listener(self)
 
 
 if __name__ == '__main__':
@@ -1,5 +1,9 @@
-from elevator import Elevator, Task
-from printevent import print_event
+from elevator import Elevator, Task, MOVE, task_code
+from eventsink import StdoutSink
+from scheduler import LookScheduler
+from dispatch import Dispatcher
+from kpi import KPICollector, Request
+from passengers import HallQueues
 
 class ElevatorControl:
 	"""Object of this class have one or more Elevator objects in 
@@ -8,18 +12,23 @@ class ElevatorControl:
 
 	def __init__(self, sim_env, control_id, floors: tuple, 
 		num_elevators: int, floor_height: float, 
-		max_speed: float, max_accel: float):
+		max_speed: float, max_accel: float, sink=None,
+		scheduler='look', dispatch='eta', capacity=None, retarget=False,
+		rng=None):
 
 		self.ec_id = control_id
 		self.env = sim_env
 		self.floors = floors
+		self.sink = sink if sink is not None else StdoutSink()
 
+		# start floors are drawn from rng, a numpy.random.Generator, in
+		# order of e_id, or from the global random if None
 		if isinstance(num_elevators, int):
 			if num_elevators >= 1:
 				self.elevators = {
 					e_id: Elevator(sim_env, floors, 
-						floor_height, max_speed, max_accel
-					) for e_id \
+						floor_height, max_speed, max_accel, self.sink,
+						capacity, rng) for e_id \
 					in range(1, num_elevators + 1)
 				}
 
@@ -29,6 +38,50 @@ class ElevatorControl:
 		else:
 			raise ValueError('Number of elevators must be integer')
 
+		# 'look' merges requests with LookScheduler, 'cases' with the
+		# original case analysis in add_update_tasks
+		if scheduler not in ['look', 'cases']:
+			raise ValueError('Scheduler must be one of look, cases')
+		if scheduler == 'cases' and capacity is not None:
+			# a full car hands calls on and skips their stops, see
+			# bypass, which the case analysis cannot take back out
+			raise ValueError('Capacity needs the look scheduler')
+		self.scheduler = scheduler
+		self.schedulers = {e_id: LookScheduler(elevator)
+			for e_id, elevator in self.elevators.items()}
+
+		# 'eta' selects elevators with the vectorized Dispatcher,
+		# 'lookahead' with the Dispatcher following every queue,
+		# 'nearest' by floor distance only
+		if dispatch not in ['eta', 'lookahead', 'nearest']:
+			raise ValueError('Dispatch must be one of eta, lookahead, nearest')
+		self.dispatch = dispatch
+		# moving elevators stop for calls on their way, see retarget
+		self.retarget_moving = retarget
+		self.dispatcher = Dispatcher(self.elevators,
+			self.schedulers if scheduler == 'look' else {},
+			retarget=retarget)
+		for e_id, elevator in self.elevators.items():
+			elevator.state_listener = \
+				lambda elevator, e_id=e_id: self.update_state(e_id)
+
+		# passenger model, people waiting counted by landing, see
+		# passengers.HallQueues, None without a capacity
+		self.capacity = capacity
+		self.hall = None
+		if capacity is not None:
+			self.hall = HallQueues(floors)
+			for elevator in self.elevators.values():
+				elevator.hall = self.hall
+
+		# wait, ride and total time of requests served by this controller
+		self.kpi = KPICollector()
+		for elevator in self.elevators.values():
+			elevator.kpi = self.kpi
+
+		# recorder.Recorder of arrivals, see Recorder.attach
+		self.recorder = None
+
 
 	def get_current_states(self, e_id=None):
 		"""Method returns states of each elevator that is 
@@ -41,18 +94,22 @@ class ElevatorControl:
 
 		return {}
 
-	def select_elevator(self, floor_at):
+	def select_elevator(self, floor_at, floor_to=None):
 		"""Method selects one elevator from (possibly) multiple"""
 		if len(self.elevators) == 1:	
 			# return only available elevator
 			return next(iter(self.elevators))
 
+		elif self.dispatch in ['eta', 'lookahead']:
+			# least estimated time to arrival, see Dispatcher
+			return self.dispatcher.select(floor_at, floor_to,
+				lookahead=self.dispatch == 'lookahead')
+
 		else:
-			# choose the closest one (change this later to add
-			# direction)
+			# choose the closest one
 			delta = 9999
 			selected_e_id = next(iter(self.elevators))
-			for e_id, state in self.get_current_states():
+			for e_id, state in self.get_current_states().items():
 				if abs(state - floor_at) < delta:
 					delta = abs(state - floor_at)
 					selected_e_id = e_id
@@ -67,39 +124,27 @@ class ElevatorControl:
 		the specified elevator, with an option to add at a particular
 		position.
 		"""
-		# two formats of task keys
-		if task_type in ['hold', 'open door', 'close door']:
-			# stationary tasks
-			key = (task_type, floor, round(self.env.now, 1))
-		else:
-			# move tasks
-			if floor_from == floor_to:
-				raise ValueError("Floor from and to should not be same")
-
-			key = (task_type, floor_from, floor_to, round(self.env.now, 1))
-
-		# add key to list of task keys
-		if specific_index is None:
-			self.elevators[e_id].task_keys.append(key)
-		
-		else:
-			self.elevators[e_id].task_keys.insert(specific_index, key)
+		if task_code(task_type) == MOVE and floor_from == floor_to:
+			raise ValueError("Floor from and to should not be same")
 
-		# add key, Task Object pair to task dictionary
 		try:
-			self.elevators[e_id].tasks[key] = \
-				Task(self.elevators[e_id], task_type, floor, 
-					floor_from, floor_to, count)
+			task = Task(self.elevators[e_id], task_type, floor, 
+				floor_from, floor_to, count)
 		except ValueError as err:
 			print(f'Error occured creating task {task_type},'+\
 			f'floor {floor}, floor_from {floor_from} floor_to {floor_to}')
+			return None
+
+		# add task to the elevator's queue
+		if specific_index is None:
+			return self.elevators[e_id].tasks.append(task)
+		else:
+			return self.elevators[e_id].tasks.insert(specific_index, task)
 
 	def delete_task(self, e_id, task_index):
 		try:
-			task_key = self.get_task_key(e_id,task_index)
-			del self.elevators.get(e_id).tasks[task_key]
-			del self.elevators.get(e_id).task_keys[task_index]
-		except KeyError as err:
+			del self.elevators.get(e_id).tasks[task_index]
+		except IndexError as err:
 			print(f'Arguments: e_id={e_id} and task_index={task_index}')
 			len_ = len(self.elevators.get(e_id).tasks)
 			print(f'Error occured while deleting task with len of tasks {len_}')
@@ -115,15 +160,14 @@ class ElevatorControl:
 
 	def get_task_key(self, e_id, index_):
 		try:
-			return self.elevators.get(e_id).task_keys[index_]
+			return self.elevators.get(e_id).tasks[index_].key
 		except IndexError:
 			print(f"Error occured querying task keys at {index_}")
 			return ()
 
 	def get_task_count(self, e_id, index_):
-		task_key = self.get_task_key(e_id, index_)
 		try:
-			return self.elevators.get(e_id).tasks[task_key].count
+			return self.elevators.get(e_id).tasks[index_].count
 		except IndexError:
 			print(f"Error occured querying tasks with key at {index_}")
 			return 0
@@ -151,24 +195,31 @@ class ElevatorControl:
 		"""Method takes request and converts them into tasks for the 
 		selected elevator. The method then adds them to elevator's list
 		of tasks. The method may also update previously assigned tasks 
-		if multiple requests can be scheduled more efficiently"""
+		if multiple requests can be scheduled more efficiently.
+
+		Used with scheduler='cases' and as the reference for
+		scheduler.compare_with_cases, LookScheduler is the default"""
 		if e_id not in self.elevators:
 			raise KeyError('Invalid elevator id provided')
 
 		current_state = self.get_current_states(e_id)
 		direction = self.elevators.get(e_id).get_current_direction()
-		current_task_key = self.elevators.get(e_id).current_task_key
 		req_dir = 1 if floor_to > floor_from else -1
 
 		flag = 0
 		
+		tasks = self.elevators.get(e_id).tasks
 		try:
 			current_index = start_index
+			# walk the queued tasks themselves, positional access costs
+			# a walk of the queue each. Every case that changes the
+			# queue sets flag, so the walk never continues past a change
+			task = tasks.task_at(start_index) \
+				if start_index < len(tasks) else None
 			non_move_tasks_count = 0
-			while current_index < len(self.elevators.get(e_id).task_keys) \
-			and flag == 0:
+			while task is not None and flag == 0:
 
-				next_task_key = self.get_task_key(e_id, current_index)
+				next_task_key = task.key
 				key_iterator = iter(next_task_key)
 
 				next_task_type = next(key_iterator, None)
@@ -191,7 +242,7 @@ class ElevatorControl:
 							#	|	|
 							#		|
 							if self.strictly_greater(task_from, floor_from, req_dir):
-								print_event(message="Identified Case 1")
+								self.sink.emit(message="Identified Case 1")
 								if current_index == start_index:
 									self.create_move_task(e_id, floor_from, 
 										task_from, current_index)
@@ -222,9 +273,9 @@ class ElevatorControl:
 							#	|	|
 							#	|	|
 							if task_from == floor_from:
-								print_event(message="Identified Case 2")
+								self.sink.emit(message="Identified Case 2")
 								if current_index+1 < \
-								len(self.elevators.get(e_id).task_keys):
+								len(self.elevators.get(e_id).tasks):
 									subsequent_task_key = self.get_task_key(e_id, 
 										current_index+1)
 									if self.get_task_dir(e_id, current_index+1) == req_dir:
@@ -253,7 +304,7 @@ class ElevatorControl:
 							#	|
 							if self.strictly_less(task_from, floor_from, req_dir) and \
 							self.strictly_greater(task_to, floor_from, req_dir):
-								print_event(message="Identified Case 3")
+								self.sink.emit(message="Identified Case 3")
 								
 								self.delete_task(e_id, current_index)
 								self.create_move_task(e_id, task_from, 
@@ -274,7 +325,7 @@ class ElevatorControl:
 							#		|
 							if self.strictly_greater(task_from, floor_from, req_dir) and \
 							self.strictly_less(task_from, floor_to, req_dir):
-								print_event(message="Identified Case 4")
+								self.sink.emit(message="Identified Case 4")
 								if current_index == start_index:
 									self.create_move_task(e_id, floor_from, 
 										task_from, current_index)
@@ -300,7 +351,7 @@ class ElevatorControl:
 							#	|	|
 							#	|	|
 							if task_from == floor_from:
-								print_event(message="Identified Case 5")
+								self.sink.emit(message="Identified Case 5")
 								self.delete_task(e_id, current_index)
 								self.create_move_task(e_id, task_from, 
 									floor_to, current_index)
@@ -316,7 +367,7 @@ class ElevatorControl:
 							#	|	|
 							#	|
 							if self.strictly_less(task_from, floor_from, req_dir):
-								print_event(message="Identified Case 6")
+								self.sink.emit(message="Identified Case 6")
 								self.delete_task(e_id, current_index)
 								self.create_move_task(e_id, task_from,
 									floor_from, current_index)
@@ -337,7 +388,7 @@ class ElevatorControl:
 							# ***First move in this direction otherwise
 							# will fall under case 4***
 							if self.strictly_greater(task_from, floor_from, move_task_dir):
-								print_event(message="Identified Case 7")
+								self.sink.emit(message="Identified Case 7")
 								if current_index == start_index:
 									self.create_move_task(e_id, 
 										floor_from, task_from,
@@ -355,7 +406,7 @@ class ElevatorControl:
 										floor_from, current_index-1)
 									self.create_move_task(e_id, floor_from,
 										task_from, current_index)
-									self.add_update_tasks(e_di, task_from,
+									self.add_update_tasks(e_id, task_from,
 										floor_to, current_index+1)
 								flag = 1
 
@@ -366,7 +417,7 @@ class ElevatorControl:
 							#	|	|
 							#	|	|
 							if task_from == floor_from:
-								print_event(message="Identified Case 8")
+								self.sink.emit(message="Identified Case 8")
 								flag = 1
 
 							# Case 9
@@ -377,7 +428,7 @@ class ElevatorControl:
 							#	|	|
 							#	|
 							if self.strictly_less(task_from, floor_from, move_task_dir):
-								print_event(message="Identified Case 9")
+								self.sink.emit(message="Identified Case 9")
 								self.delete_task(e_id, current_index)
 								self.create_move_task(e_id, task_from,
 									floor_from, current_index)
@@ -389,26 +440,23 @@ class ElevatorControl:
 				else:
 					non_move_tasks_count += 1
 				current_index += 1
+				task = task.next
 
-		except KeyError as err:
+		except IndexError as err:
 			print(err)
-			if err in self.elevators.get(e_id).tasks.keys():
-				print("key was present")
-			else:
-				print("key not in Task.keys()")
-			if err in self.elevators.get(e_id).task_keys:
-				print("key was present in task_keys list")
-			else:
-				print("key not in task_keys either")
-			print(self.elevators.get(e_id).tasks.keys())
+			print([task.key for task in self.elevators.get(e_id).tasks])
 
 		if flag == 1:
-			print_event(message="Added request task in middle")
+			self.sink.emit(message="Added request task in middle")
 
 		if flag == 0:
 			# Request could not accomodated with others
-			if len(self.elevators.get(e_id).task_keys) > 0:
-				last_task_floor = self.elevators.get(e_id).task_keys[-1][2]
+			if len(tasks) > 0:
+				# where the queue leaves the elevator, a stationary task
+				# keeps it at its floor
+				last_task = tasks.last
+				last_task_floor = last_task.floor_to \
+					if last_task.type == MOVE else last_task.floor
 				if last_task_floor != floor_from:
 					self.create_move_task(e_id, last_task_floor, 
 						floor_from)
@@ -420,8 +468,7 @@ class ElevatorControl:
 
 			self.create_move_task(e_id, floor_from, floor_to)
 			
-			print_event(message="Added request task at the end")
-		#print(self.elevators.get(e_id).task_keys)
+			self.sink.emit(message="Added request task at the end")
 
 
 	def request_service(self, floor_at: int, floor_to: int, count: int):
@@ -431,13 +478,164 @@ class ElevatorControl:
 		if (floor_at not in self.floors) or (floor_to not in self.floors):
 			raise ValueError('Request outside service floors')
 
+		if self.capacity is not None and count > self.capacity:
+			# a group larger than a car travels in car loads
+			loads = [self.capacity]*(count//self.capacity)
+			if count % self.capacity:
+				loads.append(count % self.capacity)
+		else:
+			loads = [count]
+
+		requests = [Request(floor_at, floor_to, load, self.env.now)
+			for load in loads]
+		for request in requests:
+			self.kpi.record_request(request)
+			self.dispatch_request(request)
+			if self.recorder is not None:
+				self.recorder.arrival(self.ec_id, request)
+
+		return requests[0]
+
+	def dispatch_request(self, request, *others):
+		"""Method assigns a request waiting for pickup to an elevator and
+		merges it into that elevator's tasks, with others waiting at the
+		same floor in the same direction, as they go to the same car"""
+		floor_at, floor_to = request.floor_from, request.floor_to
+
 		# find an elevator to allocate the request
-		selected_e_id = self.select_elevator(floor_at)
+		selected_e_id = self.select_elevator(floor_at, floor_to)
+		elevator = self.elevators[selected_e_id]
+		requests = (request,) + others
+		destinations = {}
+		for request in requests:
+			request.e_id = selected_e_id
+			destinations[request.floor_to] = \
+				destinations.get(request.floor_to, 0) + request.count
+		elevator.assign(*requests)
+
+		if self.retarget_moving:
+			self.retarget(selected_e_id, floor_at, request.direction)
 
 		# Convert request into tasks for selected elevator to process
-		self.add_update_tasks(selected_e_id, floor_at, floor_to, count)
+		for floor_to, count in destinations.items():
+			if self.scheduler == 'look':
+				if self.schedulers[selected_e_id].add_request(floor_at,
+						floor_to):
+					self.sink.emit(message="Added request task in middle")
+				else:
+					self.sink.emit(message="Added request task at the end")
+			else:
+				self.add_update_tasks(selected_e_id, floor_at, floor_to, count)
+		self.dispatcher.sync(selected_e_id)
 
 		# If elevator was idle, call to start processing tasks
-		if self.elevators.get(selected_e_id).current_task_key is None:
-			self.env.process(self.elevators.get(selected_e_id).process_tasks())
-			#pass
\ No newline at end of file
+		if elevator.current_task is None:
+			elevator.start()
+
+	def retarget(self, e_id, floor: int, direction: int = None):
+		"""
+		Method stops a moving elevator at floor, which it is about to
+		pass, instead of the floor its move heads for, e.g. to pick up
+		a call there. The elevator goes on to the old floor afterwards.
+
+		:param direction: (int) 1 or -1, only stop if the elevator moves
+			that way
+		:return: (bool) True if the elevator stops at floor
+		"""
+		elevator = self.elevators[e_id]
+		if not elevator.moving():
+			return False
+		floor_from, floor_to = elevator.motion[:2]
+		if direction is not None and \
+		(floor_to - floor_from)*direction <= 0:
+			return False
+
+		if self.scheduler == 'look':
+			stopped = self.schedulers[e_id].retarget(floor)
+		else:
+			stopped = elevator.retarget(floor) is not None
+		if stopped:
+			elevator.notify()
+			self.sink.emit(message=f"Elevator {e_id} stops at {floor}"
+				+ " on its way")
+		return stopped
+
+	def update_state(self, e_id):
+		"""Method reacts to an elevator setting off or going idle"""
+		if self.elevators[e_id].overflow is not None:
+			self.bypass(e_id)
+		self.dispatcher.sync(e_id)
+
+	def bypass(self, e_id):
+		"""
+		Method hands the calls an elevator cannot take on to the others,
+		called once it left people behind or filled up on boarding. The
+		calls left behind go and, while the car is full, the calls up
+		to the next floor a rider gets off at, whose stops it then skips.
+		Whoever is dispatched may be the same elevator, when every car
+		is full.
+		"""
+		elevator = self.elevators[e_id]
+		key, elevator.overflow = elevator.overflow, None
+		keys = [key] if key in elevator.waiting else []
+
+		direction = key[1]
+		here = elevator.current_state
+		if elevator.is_full():
+			# nobody gets on before someone gets off
+			drops = [floor for floor in elevator.riders
+				if (floor - here)*direction >= 0]
+			if drops:
+				stop = min(drops, key=lambda floor: abs(floor - here))
+			else:
+				stop = max(self.floors) + 1 if direction > 0 \
+					else min(self.floors) - 1
+			keys.extend((floor, direction) for floor in self.floors
+				if (floor - here)*direction >= 0 and
+				(stop - floor)*direction > 0 and
+				(floor, direction) in elevator.waiting)
+			if self.scheduler == 'look':
+				scheduler = self.schedulers[e_id]
+				scheduler.sync()
+				if scheduler.runs and scheduler.runs[0].direction == direction:
+					scheduler.skip_stops(stop)
+		if keys:
+			self.sink.emit(message=f"Elevator {e_id} passing on"
+				+ f" requests at {len(keys)} landings")
+
+		groups = [elevator.release(key) for key in dict.fromkeys(keys)]
+		self.dispatcher.sync(e_id)
+		for requests in groups:
+			if requests:
+				self.dispatch_request(*requests)
+
+	def snapshot(self):
+		"""Method returns the state of the controller, its elevators and
+		schedulers as plain data"""
+		return {
+			'elevators': {e_id: elevator.snapshot()
+				for e_id, elevator in self.elevators.items()},
+			'schedulers': {e_id: scheduler.snapshot()
+				for e_id, scheduler in self.schedulers.items()},
+			'kpi': self.kpi,
+			'hall_peak': None if self.hall is None else self.hall.peak,
+		}
+
+	def restore(self, state):
+		"""Method sets the state of a fresh controller from snapshot and
+		resumes the tasks elevators were executing"""
+		if set(state['elevators']) != set(self.elevators):
+			raise ValueError('Snapshot has a different number of elevators')
+
+		self.kpi = state['kpi']
+		for e_id, elevator in self.elevators.items():
+			elevator.kpi = self.kpi
+			tasks = elevator.restore(state['elevators'][e_id])
+			self.schedulers[e_id].restore(state['schedulers'][e_id], tasks)
+		if self.hall is not None:
+			self.hall.rebuild(self.elevators.values())
+			self.hall.peak = state.get('hall_peak') or 0
+
+		for e_id, elevator in self.elevators.items():
+			elevator.resume(state['elevators'][e_id])
+			self.dispatcher.sync(e_id)
@@ -0,0 +1,67 @@
+import heapq
+import itertools
+
+
+class EventEngine:
+    """
+    Class: Minimal discrete event engine for offline runs, an alternative
+    to simpy.Environment. Events are plain callbacks kept in a heap by
+    (time, insertion order); there are no generator processes. Offers
+    `now` like simpy, so simulation objects can read the clock either
+    way, and stops before events at the `until` time like simpy does.
+    """
+    def __init__(self, initial_time=0):
+        self.now = initial_time
+        self.queue = []
+        self.counter = itertools.count()
+
+    def schedule(self, delay, callback, *args):
+        """
+        Method schedules callback(*args) delay time units from now
+        :return: (list) event, which can be passed to cancel
+        """
+        if delay < 0:
+            raise ValueError(f'Negative delay {delay}')
+        event = [self.now + delay, next(self.counter), callback, args]
+        heapq.heappush(self.queue, event)
+        return event
+
+    @staticmethod
+    def cancel(event):
+        """Method cancels a scheduled event, it stays in the heap inert"""
+        event[2] = None
+
+    def peek(self):
+        """Method returns time of the next event, inf if there is none"""
+        while self.queue and self.queue[0][2] is None:
+            heapq.heappop(self.queue)
+        return self.queue[0][0] if self.queue else float('inf')
+
+    def run(self, until=None):
+        """
+        Method processes events in order until the queue is empty or the
+        next event is at or after until, then moves the clock to until
+        """
+        if until is not None:
+            until = float(until)
+            if until <= self.now:
+                raise ValueError(f'until (={until}) must be > the current'
+                    + f' simulation time')
+
+        queue = self.queue
+        pop = heapq.heappop
+        while queue:
+            if until is not None and queue[0][0] >= until:
+                break
+            time, _, callback, args = pop(queue)
+            if callback is None:
+                continue
+            self.now = time
+            callback(*args)
+
+        if until is not None:
+            self.now = until
+
+
+if __name__ == '__main__':
+    pass
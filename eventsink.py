@@ -0,0 +1,104 @@
+from abc import ABC, abstractmethod
+from collections import deque
+
+from printevent import format_event, print_event
+
+
+class EventSink(ABC):
+    """
+    Class: Base of all event sinks. Simulation objects report events
+    (time, system, event, message, etc) to a sink instead of printing
+    them. Callers building formatted fields should check `enabled`
+    first so that a disabled sink costs no formatting at all.
+    """
+    enabled = True
+
+    @abstractmethod
+    def emit(self, time="-", system="-", event="-", message="-", etc="-"):
+        """Method reports one event"""
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class NullSink(EventSink):
+    """Sink that drops every event, used for headless batch runs"""
+    enabled = False
+
+    def emit(self, time="-", system="-", event="-", message="-", etc="-"):
+        pass
+
+
+class StdoutSink(EventSink):
+    """Sink that prints every event as a fixed width line (default)"""
+
+    def emit(self, time="-", system="-", event="-", message="-", etc="-"):
+        print_event(time, system, event, message, etc)
+
+
+class RingSink(EventSink):
+    """
+    Sink that keeps the last `capacity` events in memory as raw tuples.
+    Nothing is formatted until `lines` is called.
+    """
+    def __init__(self, capacity=10000):
+        if not isinstance(capacity, int) or capacity < 1:
+            raise ValueError('Capacity must be positive integer')
+        self.events = deque(maxlen=capacity)
+
+    def emit(self, time="-", system="-", event="-", message="-", etc="-"):
+        self.events.append((time, system, event, message, etc))
+
+    def lines(self):
+        """
+        Method returns the buffered events as formatted lines
+        :return: (list) of str
+        """
+        return [format_event(*event) for event in self.events]
+
+    def clear(self):
+        self.events.clear()
+
+
+class FileSink(EventSink):
+    """
+    Sink that appends events to a text file in batches. Events are
+    buffered as raw tuples and formatted and written `batch_size`
+    at a time.
+    """
+    def __init__(self, file_path, batch_size=4096, mode='a'):
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError('Batch size must be positive integer')
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.buffer = []
+        self.log = open(file_path, mode)
+
+    def emit(self, time="-", system="-", event="-", message="-", etc="-"):
+        self.buffer.append((time, system, event, message, etc))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def write(self, text):
+        """Method writes raw text, e.g. a header, after pending events"""
+        self.flush()
+        self.log.write(text)
+
+    def flush(self):
+        if self.buffer:
+            self.log.write('\n'.join(
+                format_event(*event) for event in self.buffer) + '\n')
+            self.buffer = []
+        self.log.flush()
+
+    def close(self):
+        if not self.log.closed:
+            self.flush()
+            self.log.close()
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,285 @@
+import math
+import time
+
+import numpy as np
+
+from engine import EventEngine
+from kpi import Metric
+
+
+def auction(benefit, epsilon, max_rounds=None, scaling=4):
+    """
+    Function assigns rows (bidders) to columns (objects) maximizing
+    total benefit with the Jacobi auction algorithm, all free bidders
+    bid at once in vectorized rounds. Bid increments start large and
+    shrink by scaling down to epsilon, keeping prices between phases,
+    which avoids long price wars between near equal objects. Needs no
+    more rows than columns. The result is within columns*epsilon of
+    the optimum.
+
+    :param benefit: (numpy.ndarray) rows x columns
+    :param epsilon: (float) least bid increment of the last phase
+    :param max_rounds: (int) bidding rounds to give up after, over all
+        phases, bidders still free then are left unassigned
+    :return: (numpy.ndarray) column of every row, -1 if unassigned
+    """
+    rows, columns = benefit.shape
+    if rows > columns:
+        raise ValueError('Auction needs at least as many columns as rows')
+    if rows < columns:
+        # dummy rows indifferent to all columns make it square, which
+        # keeps prices valid across phases
+        benefit = np.vstack([benefit, np.zeros((columns - rows, columns))])
+
+    prices = np.zeros(columns)
+    step = max(epsilon, float(np.ptp(benefit))/scaling)
+    rounds_left = max_rounds
+    while True:
+        owner = np.full(columns, -1)
+        assigned = np.full(columns, -1)
+        rounds = bid(benefit, prices, owner, assigned, step, rounds_left)
+        if rounds is None or step <= epsilon:
+            return assigned[:rows]
+        if rounds_left is not None:
+            rounds_left -= rounds
+        step = max(epsilon, step/scaling)
+
+
+def bid(benefit, prices, owner, assigned, step, max_rounds=None):
+    """
+    Function runs auction rounds until every row is assigned, see
+    auction
+    :return: (int) rounds run, None if stopped after max_rounds
+    """
+    rounds = 0
+    while True:
+        free = np.flatnonzero(assigned < 0)
+        if free.size == 0:
+            return rounds
+        if max_rounds is not None and rounds >= max_rounds:
+            return None
+        rounds += 1
+
+        values = benefit[free] - prices
+        best = np.argmax(values, axis=1)
+        best_value = values[np.arange(free.size), best]
+        if values.shape[1] > 1:
+            values[np.arange(free.size), best] = -np.inf
+            second_value = values.max(axis=1)
+        else:
+            second_value = best_value
+        bids = prices[best] + best_value - second_value + step
+
+        # highest bid per object wins it
+        order = np.lexsort((bids, best))
+        ordered = best[order]
+        last = np.ones(free.size, dtype=bool)
+        last[:-1] = ordered[1:] != ordered[:-1]
+        winners = free[order[last]]
+        objects = ordered[last]
+
+        outbid = owner[objects]
+        assigned[outbid[outbid >= 0]] = -1
+        owner[objects] = winners
+        assigned[winners] = objects
+        prices[objects] = bids[order[last]]
+
+
+class GroupOptimizer:
+    """
+    Class: Periodically reassigns the hall calls of an ElevatorControl
+    that no car has picked up yet. Calls waiting at the same floor in
+    the same direction move together. Every car is scored for every
+    call in one vectorized pass (Dispatcher.eta_matrix). Cars get
+    call slots whose cost rises with each extra call, and calls are
+    matched to slots by auction. Cars losing calls replan their route,
+    cars gaining calls merge them. The auction stops after the per tick
+    budget of bidding rounds, calls it has not settled stay with their
+    car. Ticks do a bounded amount of work that does not depend on the
+    machine, so runs are repeatable, wall clock time is only measured.
+    """
+    def __init__(self, control, period=5, budget=200, max_calls=64,
+            hysteresis=None, epsilon=0.1):
+        """
+        :param control: (ElevatorControl) with the 'look' scheduler
+        :param period: simulation time between ticks
+        :param budget: (int) auction bidding rounds a tick may run
+        :param max_calls: most calls reconsidered per tick, oldest first
+        :param hysteresis: ETA gain needed to move a call, defaults to
+            two of the dispatcher's stop times
+        :param epsilon: auction bid increment, in time units
+        """
+        if control.scheduler != 'look':
+            raise ValueError('Group optimizer needs the look scheduler')
+        if period <= 0:
+            raise ValueError('Period must be positive')
+        if not isinstance(budget, int) or budget < 1:
+            raise ValueError('Budget must be integer greater than equal to 1')
+
+        self.control = control
+        self.env = control.env
+        self.period = period
+        self.budget = budget
+        self.max_calls = max_calls
+        self.hysteresis = 2*control.dispatcher.stop_time \
+            if hysteresis is None else hysteresis
+        self.epsilon = epsilon
+
+        self.next_tick = None # simulation time of the next tick
+        self.ticks = 0
+        self.reassigned = 0
+        self.over_budget = 0 # ticks whose auction ran out of rounds
+        self.tick_time = Metric() # wall clock per tick, milliseconds
+
+    def calls(self):
+        """
+        Method gathers requests assigned but not picked up
+        :return: (dict) (floor, direction) -> list of (e_id, request)
+        """
+        calls = {}
+        for e_id, elevator in self.control.elevators.items():
+            for key, requests in elevator.waiting.items():
+                if key in calls:
+                    calls[key].extend((e_id, request) for request in requests)
+                else:
+                    calls[key] = [(e_id, request) for request in requests]
+        return calls
+
+    def assign(self, cost, holders):
+        """
+        Method solves the car to call assignment
+        :param cost: (numpy.ndarray) ETA[car, call]
+        :param holders: (numpy.ndarray) row of the car holding each call
+        :return: (numpy.ndarray) row of the car for each call, -1 to
+            leave a call where it is
+        """
+        dispatcher = self.control.dispatcher
+        cars, count = cost.shape
+        cost = cost.copy()
+        cost[holders, np.arange(count)] -= self.hysteresis
+        if (cost.argmin(axis=0) == holders).all():
+            # no call has a better car, keep them all
+            return np.full(count, -1)
+
+        # slot k of a car costs k stops more, a car can take every call
+        slots = math.ceil(count/cars)
+        slot_cost = np.arange(slots)*dispatcher.stop_time
+        expanded = cost[:, None, :] + slot_cost[None, :, None]
+        benefit = -expanded.reshape(cars*slots, count).T
+
+        won = auction(benefit, self.epsilon, self.budget)
+        if (won < 0).any():
+            self.over_budget += 1
+        return np.where(won >= 0, won//slots, -1)
+
+    def tick(self):
+        """Method reassigns pending calls once"""
+        started = time.perf_counter()
+        self.ticks += 1
+        control = self.control
+        dispatcher = control.dispatcher
+
+        calls = self.calls()
+        if len(calls) >= 2 and len(control.elevators) >= 2:
+            keys = sorted(calls, key=lambda key: min(request.arrival_time
+                for _, request in calls[key]))[:self.max_calls]
+            # a call may be split among cars, the first one holds it
+            holders = np.array([dispatcher.rows[calls[key][0][0]]
+                for key in keys])
+            cost = dispatcher.eta_matrix([key[0] for key in keys],
+                [key[1] for key in keys])
+            rows = self.assign(cost, holders)
+
+            # moves grouped by the car losing the calls, biggest gain
+            # first, as replanning is the costly part
+            moves = {}
+            for index, (key, row) in enumerate(zip(keys, rows)):
+                if row < 0:
+                    continue
+                e_id = dispatcher.e_ids[row]
+                for holder_id, request in calls[key]:
+                    if holder_id != e_id:
+                        gain = cost[dispatcher.rows[holder_id], index] - \
+                            cost[row, index]
+                        moves.setdefault(holder_id, []).append(
+                            (gain, key, request, e_id))
+            order = sorted(moves, key=lambda holder_id:
+                -sum(move[0] for move in moves[holder_id]))
+
+            touched = set()
+            gaining = {}
+            for holder_id in order:
+                holder = control.elevators[holder_id]
+                for _, key, request, e_id in moves[holder_id]:
+                    holder.unassign(request)
+                    request.e_id = e_id
+                    control.elevators[e_id].assign(request)
+                    gaining.setdefault(e_id, []).append(request)
+                    self.reassigned += 1
+
+                requests = sorted((request for requests in
+                    holder.waiting.values() for request in requests),
+                    key=lambda request: request.arrival_time)
+                control.schedulers[holder_id].replan([(request.floor_from,
+                    request.floor_to) for request in requests])
+                dispatcher.sync(holder_id)
+                touched.add(holder_id)
+                # calls it gained so far are part of the new plan
+                gaining.pop(holder_id, None)
+
+            for e_id, requests in gaining.items():
+                for request in requests:
+                    control.schedulers[e_id].add_request(request.floor_from,
+                        request.floor_to)
+                dispatcher.sync(e_id)
+                touched.add(e_id)
+            for e_id in touched:
+                elevator = control.elevators[e_id]
+                if elevator.current_task is None and len(elevator.tasks):
+                    elevator.start()
+
+        # diagnostic only, the work done never depends on it
+        self.tick_time.add((time.perf_counter() - started)*1000)
+
+    def start(self, next_tick=None):
+        """
+        Method starts ticking every period, on simpy or EventEngine
+        :param next_tick: time of the first tick, a period from now by
+            default
+        """
+        if next_tick is None:
+            next_tick = self.env.now + self.period
+        delay = max(0, next_tick - self.env.now)
+        self.next_tick = self.env.now + delay
+        if isinstance(self.env, EventEngine):
+            self.env.schedule(delay, self.run_tick)
+        else:
+            self.env.process(self.process(delay))
+
+    def run_tick(self):
+        self.tick()
+        self.next_tick = self.env.now + self.period
+        self.env.schedule(self.period, self.run_tick)
+
+    def process(self, delay):
+        """simpy process of start"""
+        yield self.env.timeout(delay)
+        while True:
+            self.tick()
+            self.next_tick = self.env.now + self.period
+            yield self.env.timeout(self.period)
+
+    def summary(self):
+        """
+        Method summarizes the optimizer's work
+        :return: (dict) ticks, calls reassigned, ticks over budget and
+            tick time in milliseconds
+        """
+        summary = {'ticks': self.ticks, 'reassigned': self.reassigned,
+            'over_budget': self.over_budget}
+        summary.update(self.tick_time.summary('tick_ms'))
+        return summary
+
+
+if __name__ == '__main__':
+    pass
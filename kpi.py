@@ -0,0 +1,206 @@
+import math
+
+
+class RunningStats:
+    """
+    Class: Streaming count, mean, variance, min and max in constant
+    memory (Welford's algorithm). Two instances can be merged.
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta/self.count
+        self.m2 += delta*(value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def variance(self):
+        """Sample variance, 0 with less than two values"""
+        return self.m2/(self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def merge(self, other):
+        """Method folds other RunningStats into self"""
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta*other.count/count
+        self.m2 += other.m2 + delta*delta*self.count*other.count/count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+
+class QuantileSketch:
+    """
+    Class: Streaming quantile estimator in bounded memory. Values are
+    counted in logarithmic buckets (as in DDSketch), so every quantile is
+    within relative_accuracy of a true sample value. Unlike P-square
+    estimators, sketches merge exactly, which combining runs and workers
+    relies on. Values under min_value count as 0.
+    """
+    def __init__(self, relative_accuracy=0.01, min_value=1e-3):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('Relative accuracy must be between 0 and 1')
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy)/(1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.buckets = {} # bucket index -> count
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value < self.min_value:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value)/self.log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def quantile(self, q):
+        """
+        Method estimates the q quantile
+        :param q: (float) between 0 and 1
+        :return: (float) estimate, None if nothing was added
+        """
+        if self.count == 0:
+            return None
+        rank = q*(self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # middle of the bucket in relative terms
+                return 2*self.gamma**index/(self.gamma + 1)
+        return 2*self.gamma**max(self.buckets)/(self.gamma + 1)
+
+    def merge(self, other):
+        """Method folds other QuantileSketch of same accuracy into self"""
+        if other.gamma != self.gamma or other.min_value != self.min_value:
+            raise ValueError('Sketches of different accuracy cannot merge')
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+
+class Metric:
+    """Class: Running stats plus quantile sketch of one KPI"""
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch()
+
+    def add(self, value):
+        self.stats.add(value)
+        self.sketch.add(value)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def summary(self, name):
+        summary = {f'{name}_mean': self.stats.mean if self.stats.count
+            else None, f'{name}_max': self.stats.max if self.stats.count
+            else None}
+        for q in self.QUANTILES:
+            summary[f'{name}_p{round(q*100)}'] = self.sketch.quantile(q)
+        return summary
+
+
+class Request:
+    """
+    Class: One request for service, followed from arrival at
+    ElevatorControl.request_service to delivery at its destination
+    """
+    __slots__ = ('floor_from', 'floor_to', 'direction', 'count',
+        'arrival_time', 'pickup_time', 'dropoff_time', 'e_id')
+
+    def __init__(self, floor_from, floor_to, count, arrival_time):
+        self.floor_from = floor_from
+        self.floor_to = floor_to
+        self.direction = 1 if floor_to > floor_from else -1
+        self.count = count
+        self.arrival_time = arrival_time
+        self.pickup_time = None
+        self.dropoff_time = None
+        self.e_id = None
+
+    @property
+    def wait_time(self):
+        return self.pickup_time - self.arrival_time
+
+    @property
+    def ride_time(self):
+        return self.dropoff_time - self.pickup_time
+
+    @property
+    def total_time(self):
+        return self.dropoff_time - self.arrival_time
+
+
+class KPICollector:
+    """
+    Class: Collects wait (arrival to pickup), ride (pickup to dropoff)
+    and total time of delivered requests with streaming estimators, so
+    memory does not grow with the length of the run
+    """
+    METRICS = ('wait', 'ride', 'total')
+
+    def __init__(self):
+        self.requested = 0
+        self.delivered = 0
+        self.metrics = {name: Metric() for name in self.METRICS}
+
+    def record_request(self, request):
+        self.requested += 1
+
+    def record_delivery(self, request):
+        self.delivered += 1
+        self.metrics['wait'].add(request.wait_time)
+        self.metrics['ride'].add(request.ride_time)
+        self.metrics['total'].add(request.total_time)
+
+    def merge(self, other):
+        """Method folds other KPICollector into self"""
+        self.requested += other.requested
+        self.delivered += other.delivered
+        for name in self.METRICS:
+            self.metrics[name].merge(other.metrics[name])
+        return self
+
+    def summary(self):
+        """
+        Method summarizes collected KPIs
+        :return: (dict) requested, delivered and, for wait, ride and
+            total, mean, max, p50, p95 and p99 (None until a delivery)
+        """
+        summary = {'requested': self.requested, 'delivered': self.delivered}
+        for name in self.METRICS:
+            summary.update(self.metrics[name].summary(name))
+        return summary
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,107 @@
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from kpi import RunningStats
+from replication import t_quantile
+import simulation
+import sweep
+
+
+# result columns compared by default
+PAIRED_METRICS = ('wait_mean', 'total_mean')
+
+
+def compare_policies(policies, sim_time, replications=10, params=None,
+        metrics=PAIRED_METRICS, confidence=0.95, workers=None,
+        base_seed=simulation.RANDOM_SEED):
+    """
+    Function compares policies with common random numbers. Replication r
+    runs every policy with the same streams seed, see
+    streams.RandomStreams, so all of them serve identical arrivals from
+    identical start floors, and each policy is judged by its paired
+    differences to the first one. Noise the policies share cancels out
+    of the differences, which then need far fewer replications than
+    comparing independent runs.
+
+    :param policies: (dict) name -> Simulation parameters of the policy,
+        e.g. {'eta': {'dispatch': 'eta'}, 'lookahead': {'dispatch':
+        'lookahead'}}, the first is the baseline
+    :param params: (dict) Simulation parameters shared by all policies
+    :param metrics: result columns to compare, see Simulation.results
+    :return: (dict) policy name -> metric -> mean, baseline mean,
+        difference, its confidence half-width, and variance_ratio, the
+        variance of independent differences over that of paired ones,
+        about the factor of replications saved
+    """
+    if len(policies) < 2:
+        raise ValueError('Give at least two policies to compare')
+    if replications < 2:
+        raise ValueError('Replications must be at least 2')
+    params = params or {}
+    names = list(policies)
+    grid = [dict(params, **policies[name]) for name in names]
+
+    # one stream seed per replication, shared by the policies
+    root = np.random.SeedSequence(base_seed)
+    seeds = [int(seed.generate_state(1)[0])
+        for seed in root.spawn(replications)]
+    jobs = [(dict(policy, streams=seed), sim_time, replication,
+        np.random.SeedSequence(seed), None)
+        for replication, seed in enumerate(seeds) for policy in grid]
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(sweep.run_one, jobs,
+                chunksize=max(1, len(jobs)//(workers*4))))
+    else:
+        rows = [sweep.run_one(job) for job in jobs]
+
+    # rows[replication*len(names) + policy]
+    results = {}
+    half = t_quantile((1 + confidence)/2, replications - 1)
+    for index, name in enumerate(names[1:], 1):
+        results[name] = {}
+        for metric in metrics:
+            baseline, policy, difference = (RunningStats() for _ in range(3))
+            for replication in range(replications):
+                base_value = rows[replication*len(names)][metric]
+                value = rows[replication*len(names) + index][metric]
+                if base_value is None or value is None:
+                    continue
+                baseline.add(base_value)
+                policy.add(value)
+                difference.add(value - base_value)
+            independent = baseline.variance + policy.variance
+            results[name][metric] = {
+                'mean': policy.mean,
+                'baseline_mean': baseline.mean,
+                'difference': difference.mean,
+                'half_width': half*difference.std/math.sqrt(difference.count)
+                    if difference.count > 1 else math.inf,
+                'variance_ratio': independent/difference.variance
+                    if difference.variance > 0 else math.inf,
+            }
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) in (2, 3):
+        policies = {'eta': {'dispatch': 'eta'},
+            'lookahead': {'dispatch': 'lookahead'}}
+        replications = int(sys.argv[2]) if len(sys.argv) == 3 else 10
+        results = compare_policies(policies, float(sys.argv[1]),
+            replications, params={'num_elevators': 3, 'dist_lambda': 4})
+        for name, metrics in results.items():
+            for metric, comparison in metrics.items():
+                print(f'{name} vs eta {metric}: '
+                    + f'{comparison["difference"]:+.3f}'
+                    + f' +- {comparison["half_width"]:.3f}'
+                    + f' (variance ratio {comparison["variance_ratio"]:.1f})')
+    else:
+        print("Provide simulation time in format"+\
+        ": python paired.py SIM_TIME [REPLICATIONS]")
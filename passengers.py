@@ -0,0 +1,81 @@
+import numpy as np
+
+
+class HallQueues:
+    """
+    Class: Counts people and groups waiting at the landings of one
+    controller, by floor and direction, in NumPy arrays. The requests
+    themselves queue in arrival order in the deques of the elevator they
+    are assigned to, see Elevator.waiting, the counters are updated as
+    they are assigned and picked up, so queue lengths over the building
+    are read without walking thousands of waiting requests.
+    """
+    def __init__(self, floors: tuple):
+        self.floors = np.array(floors)
+        self.floor_index = {floor: index for index, floor in enumerate(floors)}
+
+        # [0] going up, [1] going down, columns in order of floors
+        self.people = np.zeros((2, len(floors)), dtype=np.int64)
+        self.groups = np.zeros((2, len(floors)), dtype=np.int64)
+        self.peak = 0 # most people seen waiting at one landing
+
+    def cell(self, request):
+        """Method returns (row, column) of the landing request waits at"""
+        return (0 if request.direction == 1 else 1,
+            self.floor_index[request.floor_from])
+
+    def add(self, request):
+        cell = self.cell(request)
+        self.groups[cell] += 1
+        people = self.people[cell] + request.count
+        self.people[cell] = people
+        if people > self.peak:
+            self.peak = int(people)
+
+    def remove(self, request):
+        cell = self.cell(request)
+        self.groups[cell] -= 1
+        self.people[cell] -= request.count
+
+    def rebuild(self, elevators):
+        """
+        Method recounts from the requests waiting for elevators, e.g.
+        after restoring them from a checkpoint
+        :param elevators: iterable of Elevator
+        """
+        self.people[:] = 0
+        self.groups[:] = 0
+        for elevator in elevators:
+            for requests in elevator.waiting.values():
+                for request in requests:
+                    cell = self.cell(request)
+                    self.groups[cell] += 1
+                    self.people[cell] += request.count
+
+    def waiting(self, floor=None, direction=None):
+        """
+        Method returns number of people waiting
+        :param floor: (int) only at this floor, all floors if None
+        :param direction: (int) 1 for up, -1 for down, both if None
+        """
+        rows = slice(None) if direction is None else \
+            (0 if direction == 1 else 1)
+        columns = slice(None) if floor is None else self.floor_index[floor]
+        return int(self.people[rows, columns].sum())
+
+    def summary(self):
+        """
+        Method summarizes the landings
+        :return: (dict) people and groups waiting now, peak at one
+            landing and the floor with most people waiting
+        """
+        by_floor = self.people.sum(axis=0)
+        return {'waiting': int(by_floor.sum()),
+            'waiting_groups': int(self.groups.sum()),
+            'waiting_peak': self.peak,
+            'busiest_floor': int(self.floors[by_floor.argmax()])
+                if by_floor.any() else None}
+
+
+if __name__ == '__main__':
+    pass
@@ -1,6 +1,13 @@
+EVENT_FORMAT = "%-8s%-8s%-35s%-35s%-15s"
+
+
+def format_event(time="-", system="-", event="-", message="-", etc="-"):
+    return EVENT_FORMAT % (str(time), str(system),
+    	str(event), str(message), str(etc))
+
+
 def print_event(time="-", system="-", event="-", message="-", etc="-"):
-    print("%-8s%-8s%-35s%-35s%-15s" % (str(time), str(system),
-    	str(event), str(message), str(etc)))
+    print(format_event(time, system, event, message, etc))
 
 if __name__ == '__main__':
 	pass
@@ -0,0 +1,287 @@
+import cProfile
+import io
+import pstats
+import signal
+import time
+from collections import Counter
+from time import perf_counter_ns
+
+from engine import EventEngine
+
+
+PROFILER_MODES = ('counters', 'cprofile', 'sampling')
+
+
+class Section:
+    """
+    Class: Timing of one instrumented entry point. Keeps the number of
+    calls, total time including and excluding the instrumented calls
+    made from inside it, the longest call, and a histogram of call times
+    in power of 2 nanosecond buckets, cheap enough to add to every call.
+    """
+    __slots__ = ('name', 'count', 'total_ns', 'self_ns', 'max_ns',
+        'buckets', 'active')
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_ns = 0
+        self.self_ns = 0
+        self.max_ns = 0
+        self.buckets = [0]*64 # [i] counts calls under 2**i ns
+        self.active = False # inside a call, recursive calls not timed
+
+    def add(self, elapsed, self_time):
+        self.count += 1
+        self.total_ns += elapsed
+        self.self_ns += self_time
+        if elapsed > self.max_ns:
+            self.max_ns = elapsed
+        self.buckets[elapsed.bit_length()] += 1
+
+    def quantile(self, q):
+        """Method returns upper bound of the q quantile of call times in
+        microseconds, within a factor of 2"""
+        if self.count == 0:
+            return None
+        rank = q*(self.count - 1)
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen > rank:
+                return min(2**index, self.max_ns)/1000
+        return self.max_ns/1000
+
+    def summary(self):
+        return {'count': self.count, 'total_s': self.total_ns/1e9,
+            'self_s': self.self_ns/1e9,
+            'us_mean': self.total_ns/self.count/1000 if self.count else None,
+            'us_max': self.max_ns/1000, 'us_p50': self.quantile(0.5),
+            'us_p99': self.quantile(0.99)}
+
+
+class Sampler:
+    """
+    Class: Statistical profiler. A profiling timer interrupts the main
+    thread every interval seconds of CPU time and the signal handler
+    counts the functions on its stack. Unix only, as it needs
+    signal.setitimer.
+    """
+    def __init__(self, interval=0.001):
+        if interval <= 0:
+            raise ValueError('Sampling interval must be positive')
+        if not hasattr(signal, 'setitimer'):
+            raise ValueError('Sampling needs signal.setitimer, not'
+                + ' available on this platform')
+        self.interval = interval
+        self.samples = 0
+        self.leaf = Counter() # function running when sampled
+        self.inclusive = Counter() # function anywhere on the stack
+        self.previous = None # handler replaced while sampling
+
+    def start(self):
+        self.previous = signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self.previous or signal.SIG_DFL)
+
+    def sample(self, signum, frame):
+        if frame is None:
+            return
+        self.samples += 1
+        self.leaf[self.label(frame)] += 1
+        seen = set()
+        while frame is not None:
+            label = self.label(frame)
+            if label not in seen:
+                seen.add(label)
+                self.inclusive[label] += 1
+            frame = frame.f_back
+
+    @staticmethod
+    def label(frame):
+        code = frame.f_code
+        return f'{code.co_filename.rsplit("/", 1)[-1]}:{code.co_name}'
+
+    def report(self, top=20):
+        """Method returns the functions seen most as text lines"""
+        lines = [f'{self.samples} samples every {self.interval*1000:g} ms',
+            f'{"function":<45}{"running":>10}{"on stack":>10}']
+        for label, count in self.inclusive.most_common(top):
+            lines.append(f'{label:<45}'
+                + f'{100*self.leaf[label]/self.samples:>9.1f}%'
+                + f'{100*count/self.samples:>9.1f}%')
+        return '\n'.join(lines)
+
+
+class Profiler:
+    """
+    Class: Instrumentation of a Simulation. Entry points worth watching,
+    request handling, elevator selection, task merging, traffic
+    generation, event sink I/O and the engine's event dispatch, are
+    wrapped on the instances of one simulation, so a simulation built
+    without a profiler runs the plain methods at no cost at all. Each
+    wrapped call is timed with the monotonic clock into a Section.
+    Optionally the run is also captured with cProfile or the Sampler.
+    """
+    def __init__(self, mode='counters', interval=0.001):
+        """
+        :param mode: 'counters' for sections only, 'cprofile' or
+            'sampling' to capture a profile of the run as well
+        :param interval: (float) seconds between samples when sampling
+        """
+        if mode not in PROFILER_MODES:
+            raise ValueError('Profiler mode must be one of '
+                + ', '.join(PROFILER_MODES))
+        self.mode = mode
+        self.sections = {}
+        self.child_ns = 0 # time in sections called from the current one
+        self.wall_ns = 0 # time spent running the simulation
+        self.started = None
+        self.cprofile = cProfile.Profile() if mode == 'cprofile' else None
+        self.sampler = Sampler(interval) if mode == 'sampling' else None
+
+    def section(self, name):
+        if name not in self.sections:
+            self.sections[name] = Section(name)
+        return self.sections[name]
+
+    def wrap(self, owner, method, name):
+        """
+        Method replaces owner.method by a timed version on the instance,
+        counted in section name
+        """
+        func = getattr(owner, method)
+        section = self.section(name)
+        call = self.call
+
+        def timed(*args, **kwargs):
+            return call(section, func, *args, **kwargs)
+
+        setattr(owner, method, timed)
+
+    def call(self, section, func, *args, **kwargs):
+        """
+        Method calls func timed into section. Calls made while the
+        section is already running, e.g. recursion, count as part of
+        the outer call.
+        """
+        if section.active:
+            return func(*args, **kwargs)
+        section.active = True
+        outer = self.child_ns
+        self.child_ns = 0
+        start = perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = perf_counter_ns() - start
+            section.add(elapsed, elapsed - self.child_ns)
+            self.child_ns = outer + elapsed
+            section.active = False
+
+    def instrument(self, sim):
+        """
+        Method wraps the entry points of a simulation's components
+        :return: (Profiler) self
+        """
+        env = sim.env
+        if isinstance(env, EventEngine):
+            # time every callback, under the name of its function
+            schedule = env.schedule
+
+            def timed_schedule(delay, callback, *args):
+                section = self.section('event.'
+                    + getattr(callback, '__name__', 'callback'))
+                return schedule(delay, self.call, section, callback, *args)
+
+            env.schedule = timed_schedule
+        else:
+            # simpy event dispatch, processes resumed by the event
+            self.wrap(env, 'step', 'engine.step')
+
+        sink = sim.sink
+        self.wrap(sink, 'emit', 'sink.emit')
+        self.wrap(sink, 'flush', 'sink.flush')
+
+        for control in sim.controls:
+            self.wrap(control, 'request_service', 'request_service')
+            self.wrap(control, 'select_elevator', 'select_elevator')
+            self.wrap(control, 'add_update_tasks', 'add_update_tasks')
+            for scheduler in control.schedulers.values():
+                self.wrap(scheduler, 'add_request', 'add_request')
+
+        for traffic in sim.traffics:
+            for method in ('generate_time', 'draw_request', 'generate_chunk'):
+                if hasattr(traffic, method):
+                    self.wrap(traffic, method, 'traffic')
+
+        for optimizer in sim.optimizers:
+            self.wrap(optimizer, 'tick', 'optimizer.tick')
+        return self
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        if self.sampler is not None:
+            self.sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.sampler is not None:
+            self.sampler.stop()
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        self.wall_ns += time.perf_counter_ns() - self.started
+        self.started = None
+        return False
+
+    def summary(self):
+        """
+        Method summarizes the sections
+        :return: (dict) section name -> count, total_s, self_s and
+            us_mean, us_max, us_p50, us_p99 per call
+        """
+        return {name: section.summary()
+            for name, section in self.sections.items() if section.count}
+
+    def report(self, top=20):
+        """
+        Method returns the sections as a text table, busiest first, with
+        their share of the wall time of the run, then the captured
+        profile if any
+        """
+        wall = self.wall_ns/1e9
+        lines = [f'wall time {wall:.3f} s',
+            f'{"section":<28}{"calls":>10}{"total s":>10}{"self s":>10}'
+            + f'{"self %":>8}{"p50 us<":>10}{"p99 us<":>10}']
+        sections = sorted(self.summary().items(),
+            key=lambda item: -item[1]['self_s'])
+        for name, summary in sections:
+            share = 100*summary['self_s']/wall if wall else 0
+            lines.append(f'{name:<28}{summary["count"]:>10}'
+                + f'{summary["total_s"]:>10.3f}{summary["self_s"]:>10.3f}'
+                + f'{share:>7.1f}%{summary["us_p50"]:>10.1f}'
+                + f'{summary["us_p99"]:>10.1f}')
+
+        if self.cprofile is not None:
+            stream = io.StringIO()
+            pstats.Stats(self.cprofile, stream=stream) \
+                .sort_stats('cumulative').print_stats(top)
+            lines.append(stream.getvalue())
+        if self.sampler is not None and self.sampler.samples:
+            lines.append(self.sampler.report(top))
+        return '\n'.join(lines)
+
+    def dump(self, file_path):
+        """Method saves the cProfile capture for pstats or snakeviz"""
+        if self.cprofile is None:
+            raise ValueError('Nothing captured, profiler mode is not cprofile')
+        self.cprofile.dump_stats(file_path)
+
+
+if __name__ == '__main__':
+    pass
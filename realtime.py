@@ -0,0 +1,266 @@
+import asyncio
+import json
+import math
+import sys
+import time
+
+from kpi import Metric
+from simulation import Simulation
+
+
+class HallCall:
+    """
+    Class: One live request waiting to be forwarded to the simulation,
+    stamped with the wall clock time it was injected at
+    """
+    __slots__ = ('origin', 'destination', 'count', 'building',
+        'injected_at', 'reply')
+
+    def __init__(self, origin, destination, count=1, building=0, reply=None):
+        self.origin = origin
+        self.destination = destination
+        self.count = count
+        self.building = building
+        self.injected_at = time.perf_counter()
+        # asyncio.Future receiving the Request once dispatched
+        self.reply = reply
+
+
+class RealtimeDriver:
+    """
+    Class: Paces a simulation against the wall clock from asyncio and
+    feeds it live hall calls, from any number of producers through an
+    asyncio.Queue or from a local socket (see serve). The simulation
+    itself runs on a plain simpy.Environment or EventEngine, the driver
+    maps wall clock to simulation time and runs the events in between.
+    While every elevator is idle the simulation time runs idle_speedup
+    times faster. The time from injecting a call to the dispatch
+    decision is collected as latency.
+    """
+    def __init__(self, sim: Simulation, factor=0.05, idle_speedup=10,
+            traffic=False):
+        """
+        :param sim: (Simulation) not realtime, its env is driven here
+        :param factor: wall clock seconds per unit of simulation time
+        :param idle_speedup: how much faster simulation time runs while
+            no elevator has anything to do, 1 to keep the pace
+        :param traffic: (bool) also run the simulation's own traffic
+        """
+        if sim.config['realtime']:
+            raise ValueError('Simulation must not be realtime, the driver'
+                + ' paces it')
+        if factor <= 0:
+            raise ValueError('Factor must be positive')
+        if idle_speedup < 1:
+            raise ValueError('Idle speedup must be at least 1')
+
+        self.sim = sim
+        self.env = sim.env
+        self.factor = factor
+        self.idle_speedup = idle_speedup
+        self.traffic = traffic
+
+        self.calls = None # asyncio.Queue of HallCall, made in the loop
+        self.running = False
+
+        # wall clock and simulation time the current pace counts from
+        self.anchor_wall = None
+        self.anchor_sim = None
+        self.speed = None # simulation time per wall clock second
+        self.paced_idle = None # idle state the current pace is for
+
+        self.dispatched = 0
+        self.rejected = 0
+        self.latency = Metric() # injection to dispatch, in milliseconds
+
+    def idle(self):
+        """Method checks whether every elevator has nothing to do"""
+        return all(elevator.current_task is None
+            for control in self.sim.controls
+            for elevator in control.elevators.values())
+
+    def pace(self):
+        """Method anchors the mapping to the wall clock at the current
+        simulation time, with the speed of the current state"""
+        speed = 1/self.factor
+        self.paced_idle = self.idle()
+        if self.paced_idle:
+            speed *= self.idle_speedup
+        self.anchor_wall = time.perf_counter()
+        self.anchor_sim = self.env.now
+        self.speed = speed
+
+    def clock(self):
+        """Method returns simulation time the wall clock maps to"""
+        return self.anchor_sim + \
+            (time.perf_counter() - self.anchor_wall)*self.speed
+
+    def advance(self, until):
+        """Method runs simulation events up to and including until"""
+        if until > self.env.now:
+            self.env.run(until)
+        # simpy and EventEngine leave events at until, run those too
+        while self.env.peek() <= until:
+            self.env.run(math.nextafter(until, math.inf))
+
+    def inject(self, origin, destination, count=1, building=0):
+        """
+        Method queues a hall call, from coroutines or callbacks on the
+        driver's event loop, use inject_threadsafe from other threads
+        :return: (asyncio.Future) resolved with the dispatched Request
+        """
+        reply = asyncio.get_running_loop().create_future()
+        self.calls.put_nowait(HallCall(origin, destination, count, building,
+            reply))
+        return reply
+
+    def inject_threadsafe(self, loop, origin, destination, count=1,
+            building=0):
+        """Method queues a hall call from another thread"""
+        call = HallCall(origin, destination, count, building)
+        loop.call_soon_threadsafe(self.calls.put_nowait, call)
+
+    def dispatch(self, call):
+        """Method forwards a hall call to its building's controller"""
+        try:
+            if call.origin == call.destination:
+                raise ValueError('Origin and destination are the same floor')
+            if not 0 <= call.building < len(self.sim.controls):
+                raise ValueError(f'Unknown building {call.building}')
+            self.sim.requests += 1
+            request = self.sim.controls[call.building].request_service(
+                call.origin, call.destination, call.count)
+        except ValueError as err:
+            self.rejected += 1
+            if call.reply is not None and not call.reply.done():
+                call.reply.set_exception(err)
+            return
+
+        self.dispatched += 1
+        self.latency.add((time.perf_counter() - call.injected_at)*1000)
+        if call.reply is not None and not call.reply.done():
+            call.reply.set_result(request)
+
+    async def run(self, until=None):
+        """
+        Coroutine running the simulation in step with the wall clock
+        and dispatching hall calls as they come, until simulation time
+        until or until stop is called
+        """
+        self.calls = self.calls or asyncio.Queue()
+        self.running = True
+        if self.traffic:
+            self.sim.start()
+        self.pace()
+
+        while self.running and (until is None or self.env.now < until):
+            target = self.env.peek()
+            if until is not None:
+                target = min(target, until)
+            timeout = None if target == math.inf \
+                else max(0, (target - self.clock())/self.speed)
+
+            calls = []
+            if self.calls.empty() and timeout != 0:
+                try:
+                    calls.append(
+                        await asyncio.wait_for(self.calls.get(), timeout))
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                # behind the wall clock, only let producers run
+                await asyncio.sleep(0)
+            # take everything that queued up meanwhile at once
+            while not self.calls.empty():
+                calls.append(self.calls.get_nowait())
+            now = self.clock() if calls else max(self.clock(), target)
+
+            # run what happened up to now, then the calls
+            self.advance(now if until is None else min(now, until))
+            for call in calls:
+                if call is not None: # None only wakes the loop up
+                    self.dispatch(call)
+
+            if self.paced_idle != self.idle():
+                self.pace()
+        self.running = False
+
+    def stop(self):
+        """Method makes run return after the current step"""
+        self.running = False
+        if self.calls is not None:
+            # wake the loop up
+            self.calls.put_nowait(None)
+
+    async def handle_client(self, reader, writer):
+        """
+        Coroutine serving one socket client. Each line is a JSON object
+        with origin, destination and optionally count and building, each
+        is answered with a JSON line of the assigned elevator, the
+        simulation time and the latency, or the error.
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                    reply = self.inject(int(row['origin']),
+                        int(row['destination']), int(row.get('count', 1)),
+                        int(row.get('building', 0)))
+                    request = await reply
+                    answer = {'e_id': request.e_id,
+                        'time': request.arrival_time}
+                except (KeyError, TypeError, ValueError) as err:
+                    answer = {'error': str(err)}
+                writer.write((json.dumps(answer) + '\n').encode())
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=0):
+        """
+        Coroutine opening a local socket for hall calls, see
+        handle_client
+        :return: (asyncio.Server) serving, port 0 picks a free one
+        """
+        self.calls = self.calls or asyncio.Queue()
+        return await asyncio.start_server(self.handle_client, host, port)
+
+    def summary(self):
+        """
+        Method summarizes the live session
+        :return: (dict) dispatched and rejected calls, latency in ms
+        """
+        summary = {'sim_time': self.env.now, 'dispatched': self.dispatched,
+            'rejected': self.rejected}
+        summary.update(self.latency.summary('latency_ms'))
+        return summary
+
+
+async def serve_forever(port, factor):
+    """Coroutine serving hall calls on a local port until interrupted"""
+    driver = RealtimeDriver(Simulation(), factor=factor)
+    server = await driver.serve(port=port)
+    print(f"Accepting hall calls on port"
+        + f" {server.sockets[0].getsockname()[1]}")
+    async with server:
+        try:
+            await driver.run()
+        finally:
+            print(driver.summary())
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 2:
+        try:
+            asyncio.run(serve_forever(int(sys.argv[1]),
+                float(sys.argv[2]) if len(sys.argv) == 3 else 0.05))
+        except KeyboardInterrupt:
+            pass
+    else:
+        print("Provide port in format"+\
+        ": python realtime.py PORT [FACTOR]")
@@ -0,0 +1,292 @@
+import json
+import mmap
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+# what happened to a task, recorded in the 'event' column. Defined with
+# the tasks, so runs without a recorder never load this module
+from elevator import BEGIN, FINISH
+
+
+# file header and trailer, bumped whenever the layout changes
+MAGIC = b'ELVREC\x00\x01'
+FOOTER = struct.Struct('<Q') # length of the JSON index before the trailer
+
+TABLES = {
+    # task transitions of every elevator, position is the floor the
+    # elevator is at or leaves from, target the floor it heads for or
+    # holds at, load the people on board
+    'tasks': np.dtype([('time', 'f8'), ('building', 'u2'),
+        ('elevator', 'u2'), ('event', 'u1'), ('task', 'u1'),
+        ('position', 'i2'), ('target', 'i2'), ('direction', 'i1'),
+        ('load', 'i2')]),
+    # requests arriving, with the elevator they were assigned to
+    'arrivals': np.dtype([('time', 'f8'), ('building', 'u2'),
+        ('origin', 'i2'), ('destination', 'i2'), ('count', 'i2'),
+        ('elevator', 'u2')]),
+}
+
+
+class Table:
+    """
+    Class: Rows of one table buffered as tuples, cheap to append, and
+    turned into typed column arrays a chunk at a time
+    """
+    def __init__(self, name, dtype, chunk_rows):
+        self.name = name
+        self.dtype = dtype
+        self.chunk_rows = chunk_rows
+        self.rows = []
+        self.chunks = [] # index entries of chunks written
+
+    def columns(self):
+        """Method returns the buffered rows as column arrays and empties
+        the buffer"""
+        block = np.array(self.rows, dtype=self.dtype)
+        self.rows = []
+        return {name: np.ascontiguousarray(block[name])
+            for name in self.dtype.names}
+
+
+class Recorder:
+    """
+    Class: Records elevator trajectories and request arrivals of a
+    simulation into a compact binary file. Task transitions (their
+    begin and finish, with position, direction and load) and arrivals
+    are buffered, turned into typed columns chunk_rows at a time and
+    each column of a chunk is written zlib compressed. A JSON index of
+    the chunks closes the file, read it back with Recording. Elevators
+    and controllers call the recorder only when one is attached, see
+    attach, so unrecorded runs pay one attribute check per task.
+    """
+    def __init__(self, file_path, chunk_rows=65536, decimate=1, level=6):
+        """
+        :param file_path: file to write, replaced if it exists
+        :param chunk_rows: (int) rows per chunk of a table
+        :param decimate: (int) keep 1 in decimate rows, for task
+            transitions 1 in decimate tasks of each elevator, with both
+            its begin and finish, 1 keeps everything
+        :param level: (int) zlib compression level, 0 stores columns
+            raw, which Recording then maps without copying
+        """
+        if not isinstance(chunk_rows, int) or chunk_rows < 1:
+            raise ValueError('Chunk rows must be positive integer')
+        if not isinstance(decimate, int) or decimate < 1:
+            raise ValueError('Decimate must be positive integer')
+        if level not in range(10):
+            raise ValueError('Compression level must be 0 to 9')
+        self.file_path = file_path
+        self.decimate = decimate
+        self.level = level
+
+        self.tables = {name: Table(name, dtype, chunk_rows)
+            for name, dtype in TABLES.items()}
+        self.ids = {} # Elevator -> (building, elevator)
+        self.seen = {} # Elevator -> tasks begun, for decimation
+        self.kept = {} # Elevator -> task begun and recorded, if any
+        self.arrivals_seen = 0
+
+        self.file = open(file_path, 'wb')
+        self.file.write(MAGIC)
+        self.offset = len(MAGIC)
+
+    def attach(self, sim):
+        """
+        Method hooks the recorder into the elevators and controllers of
+        a simulation
+        :return: (Recorder) self
+        """
+        for control in sim.controls:
+            control.recorder = self
+            for e_id, elevator in control.elevators.items():
+                elevator.recorder = self
+                self.ids[elevator] = (control.ec_id, e_id)
+                self.seen[elevator] = 0
+                self.kept[elevator] = None
+        return self
+
+    def task(self, elevator, event, task):
+        """Method records a task of elevator beginning or finishing"""
+        if event == BEGIN:
+            seen = self.seen[elevator]
+            self.seen[elevator] = seen + 1
+            if seen % self.decimate:
+                return
+            self.kept[elevator] = task
+        elif self.kept[elevator] is task:
+            # finish goes with its begin, kept or dropped as a pair
+            self.kept[elevator] = None
+        else:
+            return
+
+        building, e_id = self.ids[elevator]
+        if task.floor_to is not None:
+            position = task.floor_from if event == BEGIN else task.floor_to
+            target = task.floor_to
+            direction = 1 if task.floor_to > task.floor_from else -1
+        else:
+            position = target = task.floor
+            direction = 0
+        self.append('tasks', (elevator.env.now, building, e_id, event,
+            task.type, position, target, direction, elevator.load))
+
+    def arrival(self, building, request):
+        """Method records a request assigned to an elevator"""
+        seen = self.arrivals_seen
+        self.arrivals_seen = seen + 1
+        if seen % self.decimate:
+            return
+        self.append('arrivals', (request.arrival_time, building,
+            request.floor_from, request.floor_to, request.count,
+            request.e_id))
+
+    def append(self, table, row):
+        table = self.tables[table]
+        table.rows.append(row)
+        if len(table.rows) >= table.chunk_rows:
+            self.write_chunk(table)
+
+    def write_chunk(self, table):
+        """Method writes the buffered rows of table as one chunk"""
+        rows = len(table.rows)
+        if rows == 0:
+            return
+        entry = {'rows': rows, 'columns': {}}
+        for name, column in table.columns().items():
+            data = column.tobytes()
+            if self.level:
+                data = zlib.compress(data, self.level)
+            self.file.write(data)
+            entry['columns'][name] = [self.offset, len(data)]
+            self.offset += len(data)
+        table.chunks.append(entry)
+
+    def flush(self):
+        """Method writes every buffered row out"""
+        for table in self.tables.values():
+            self.write_chunk(table)
+        self.file.flush()
+
+    def close(self):
+        """Method writes the remaining rows and the index, the file is
+        only readable once closed"""
+        if self.file.closed:
+            return
+        self.flush()
+        index = json.dumps({
+            'level': self.level,
+            'decimate': self.decimate,
+            'tables': {name: {
+                'dtype': [(field, table.dtype[field].str)
+                    for field in table.dtype.names],
+                'chunks': table.chunks,
+            } for name, table in self.tables.items()},
+        }).encode()
+        self.file.write(index)
+        self.file.write(FOOTER.pack(len(index)))
+        self.file.write(MAGIC)
+        self.file.close()
+
+
+class Recording:
+    """
+    Class: Reads a file written by Recorder. The file is memory-mapped
+    and only the chunks of the columns asked for are decompressed, raw
+    columns (level 0) are returned as views into the map.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, 'rb') as recording:
+            self.map = mmap.mmap(recording.fileno(), 0,
+                access=mmap.ACCESS_READ)
+
+        tail = len(MAGIC) + FOOTER.size
+        if len(self.map) < len(MAGIC) + tail or \
+        self.map[:len(MAGIC)] != MAGIC or self.map[-len(MAGIC):] != MAGIC:
+            raise ValueError(f'{file_path} is not a closed recording, or of'
+                + ' another version')
+        length, = FOOTER.unpack(self.map[-tail:-len(MAGIC)])
+        self.index = json.loads(self.map[-tail - length:-tail])
+        self.level = self.index['level']
+        self.tables = {name: np.dtype([tuple(field)
+            for field in table['dtype']])
+            for name, table in self.index['tables'].items()}
+
+    def rows(self, table):
+        """Method returns number of rows recorded in table"""
+        return sum(chunk['rows']
+            for chunk in self.index['tables'][table]['chunks'])
+
+    def chunk_column(self, table, name, chunk):
+        offset, length = chunk['columns'][name]
+        dtype = self.tables[table][name]
+        if self.level:
+            return np.frombuffer(
+                zlib.decompress(self.map[offset:offset + length]), dtype)
+        return np.frombuffer(self.map, dtype, chunk['rows'], offset)
+
+    def chunks(self, table, names=None):
+        """
+        Generator of the chunks of table, one at a time
+        :param names: columns to read, all by default
+        :return: yields (dict) column name -> numpy.ndarray
+        """
+        names = names or self.tables[table].names
+        for chunk in self.index['tables'][table]['chunks']:
+            yield {name: self.chunk_column(table, name, chunk)
+                for name in names}
+
+    def column(self, table, name):
+        """Method returns a whole column of table as one array"""
+        parts = [self.chunk_column(table, name, chunk)
+            for chunk in self.index['tables'][table]['chunks']]
+        if not parts:
+            return np.empty(0, self.tables[table][name])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def table(self, table):
+        """Method returns table as a structured array"""
+        block = np.empty(self.rows(table), self.tables[table])
+        for name in self.tables[table].names:
+            block[name] = self.column(table, name)
+        return block
+
+    def trajectory(self, building, elevator):
+        """
+        Method returns the floors an elevator was at over time, from
+        its task transitions
+        :return: (times, positions) numpy.ndarrays
+        """
+        tasks = self.table('tasks')
+        mine = tasks[(tasks['building'] == building) &
+            (tasks['elevator'] == elevator)]
+        return mine['time'], mine['position']
+
+    def summary(self):
+        """
+        Method describes the file
+        :return: (dict) table name -> rows, chunks and bytes on disk
+        """
+        summary = {}
+        for name, table in self.index['tables'].items():
+            summary[name] = {'rows': self.rows(name),
+                'chunks': len(table['chunks']),
+                'bytes': sum(length for chunk in table['chunks']
+                    for _, length in chunk['columns'].values())}
+        return summary
+
+    def close(self):
+        self.map.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 2:
+        recording = Recording(sys.argv[1])
+        for name, summary in recording.summary().items():
+            print(f'{name}: {summary}')
+    else:
+        print("Provide a recording in format"+\
+        ": python recorder.py RECORDING")
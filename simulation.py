@@ -1,6 +1,8 @@
 from __future__ import division
-import simpy
+import json
 import sys
+import random
+import numpy as np
 from datetime import datetime as dt
 from os import path
 
@@ -8,47 +10,429 @@ from elevator import Elevator
 from elevatorcontrol import ElevatorControl
 from trafficgenerator import TrafficGenerator
 from printevent import print_event
+from eventsink import StdoutSink, FileSink, NullSink
+from engine import EventEngine
+from kpi import KPICollector
+from streams import RandomStreams
+from config import SimConfig, RANDOM_SEED, SIM_INIT_TIME, FLOORS, \
+    FLOOR_HEIGHT, MAX_ACCELERATION, MAX_SPEED, EXP_DIST_LAMBDA
+# simpy, and the modules of optional features (trace replay, arrival
+# profiles, group optimizer, profiler, recorder), are imported when a
+# simulation uses them, short event engine runs start without them
 
-
-RANDOM_SEED = 42
-SIM_INIT_TIME = 0 # Initial simulation time
-# SIM_TIME = 10  # units of time for which simulation should run
-FLOORS = tuple(range(1, 10))
-FLOOR_HEIGHT = 4  # in meters
-MAX_ACCELERATION = 1  # in meters per second square, same deceleration
-MAX_SPEED = 4  # in meters per second
-EXP_DIST_LAMBDA = 10 # Generating interarrival time
+# parameters a building of a multi-building Simulation may override
+BUILDING_PARAMETERS = ('floors', 'num_elevators', 'floor_height',
+    'max_speed', 'max_acceleration', 'dist_lambda', 'capacity')
 
 
 class Simulation:
-    def __init__(self, realtime=False):
+    def __init__(self, realtime=False, sink=None, batched_traffic=False,
+            trace=None, floors=FLOORS, num_elevators=1,
+            floor_height=FLOOR_HEIGHT, max_speed=MAX_SPEED,
+            max_acceleration=MAX_ACCELERATION, dist_lambda=EXP_DIST_LAMBDA,
+            seed=None, engine='simpy', buildings=1, profile=None,
+            start_time=SIM_INIT_TIME, scheduler='look', dispatch='eta',
+            factor=0.05, optimizer_period=None, optimizer_budget=200,
+            capacity=None, instrument=None, record=None, retarget=False,
+            streams=None, first_building=1):
+        # seeds global random and np.random, which all components use
+        # unless streams is given
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
+
+        # streams seeds independent generators per building for arrival
+        # times, origins/destinations, counts and start floors, see
+        # streams.RandomStreams, so runs of different policies with the
+        # same streams see the same demand
+        self.streams = None if streams is None else RandomStreams(streams)
+
+        # construction parameters, a checkpoint rebuilds from them
+        self.config = {'realtime': realtime, 'batched_traffic':
+            batched_traffic, 'trace': trace, 'floors': floors,
+            'num_elevators': num_elevators, 'floor_height': floor_height,
+            'max_speed': max_speed, 'max_acceleration': max_acceleration,
+            'dist_lambda': dist_lambda, 'engine': engine,
+            'buildings': buildings, 'scheduler': scheduler,
+            'dispatch': dispatch, 'factor': factor,
+            'optimizer_period': optimizer_period,
+            'optimizer_budget': optimizer_budget, 'capacity': capacity,
+            'instrument': instrument, 'retarget': retarget,
+            'streams': streams, 'first_building': first_building}
+
+        self.floors = floors
+        self.requests = 0 # number of requests arrived
+
+        # sink receiving all trace events, printed to stdout by default.
+        # Pass eventsink.NullSink() for headless runs
+        self.sink = sink if sink is not None else StdoutSink()
+
+        # 'simpy' runs elevators and traffic as simpy processes, 'events'
+        # as callbacks on an EventEngine. Both draw the same arrivals,
+        # batched or one at a time, so seeded runs agree
+        if engine not in ['simpy', 'events']:
+            raise ValueError('Engine must be one of simpy, events')
+        self.engine = engine
+        self.started = False
+
         # create a simpy environment
-        if realtime:
+        if engine == 'events':
+            if realtime:
+                raise ValueError('Realtime runs need the simpy engine')
+            self.env = EventEngine(start_time)
+        elif realtime:
+            # factor is wall clock seconds per unit of simulation time,
+            # see realtime.RealtimeDriver for live inputs
+            import simpy.rt
             self.env = simpy.rt.RealtimeEnvironment(
-                initial_time=0, factor=0.05,
+                initial_time=start_time, factor=factor,
                 strict=False)
         else:
-            self.env = simpy.Environment()
+            import simpy
+            self.env = simpy.Environment(start_time)
+
+        # one elevator controller and traffic source per building.
+        # buildings is a count of identical buildings or a list of
+        # dicts overriding parameters of BUILDING_PARAMETERS. They are
+        # numbered from first_building, which also keys their streams,
+        # so a campus shard draws what its buildings would in one run
+        if isinstance(buildings, int):
+            if buildings < 1:
+                raise ValueError('Number of buildings must be at least 1')
+            buildings = [{}]*buildings
+        if trace is not None and len(buildings) > 1:
+            raise ValueError('Trace replay supports a single building')
+        if trace is not None and profile is not None:
+            raise ValueError('Trace replay and arrival profile exclude each other')
+        if isinstance(profile, list) and len(profile) != len(buildings):
+            raise ValueError('Give one arrival profile per building')
+        profiles = []
+
+        self.controls = []
+        self.traffics = []
+        for control_id, building in enumerate(buildings, first_building):
+            params = {'floors': floors, 'num_elevators': num_elevators,
+                'floor_height': floor_height, 'max_speed': max_speed,
+                'max_acceleration': max_acceleration,
+                'dist_lambda': dist_lambda, 'capacity': capacity}
+            rngs = None if self.streams is None \
+                else self.streams.building(control_id)
+            for name in building:
+                if name not in BUILDING_PARAMETERS:
+                    raise ValueError(f'Unknown building parameter {name}')
+            params.update(building)
+
+            self.controls.append(ElevatorControl(
+            	self.env, control_id, params['floors'],
+                params['num_elevators'], params['floor_height'],
+                params['max_speed'], params['max_acceleration'], self.sink,
+                scheduler, dispatch, params['capacity'], retarget,
+                None if rngs is None else rngs['positions']))
 
-        # create an elevator controller
-        self.elevatorcontrol = ElevatorControl(
-        	self.env, 1, FLOORS, 1, 
-            FLOOR_HEIGHT, MAX_SPEED, MAX_ACCELERATION)
+            # object to generate traffic, drawing arrivals in chunks
+            # if batched_traffic, or replaying a recorded trace file.
+            # profile is a trafficprofile.ArrivalProfile, or a function
+            # of the floors returning one, e.g. trafficprofile.office_day,
+            # or a list of one per building
+            if trace is not None:
+                from tracereplay import TraceReplay
+                self.traffics.append(TraceReplay(trace, params['floors']))
+                batched_traffic = True
+            elif profile is not None:
+                if isinstance(profile, list):
+                    arrival_profile = profile[control_id - first_building]
+                elif callable(profile):
+                    arrival_profile = profile(params['floors'])
+                else:
+                    arrival_profile = profile
+                profiles.append(arrival_profile)
+                from trafficprofile import ProfileTrafficGenerator
+                self.traffics.append(ProfileTrafficGenerator(
+                	self.env, arrival_profile, params['floors'],
+                    streams=rngs))
+                batched_traffic = True
+            else:
+                self.traffics.append(TrafficGenerator(
+                	self.env, params['dist_lambda'], params['floors'],
+                    streams=rngs))
+        self.batched_traffic = batched_traffic
+        self.config['profile'] = profiles or None
 
-        # object to generate traffic
-        self.traffic = TrafficGenerator(
-        	self.env, EXP_DIST_LAMBDA, FLOORS)
+        # next arrival of each building while waiting for it, as
+        # (time, count, origin, destination), count and floors None
+        # until drawn
+        self.pending = [None]*len(self.traffics)
+
+        # optional batch reassignment of pending calls every
+        # optimizer_period, see groupcontrol.GroupOptimizer
+        self.optimizers = []
+        if optimizer_period is not None:
+            from groupcontrol import GroupOptimizer
+            self.optimizers = [GroupOptimizer(control, optimizer_period,
+                optimizer_budget) for control in self.controls]
+
+        # first building, the only one by default
+        self.elevatorcontrol = self.controls[0]
+        self.traffic = self.traffics[0]
+
+        # optional timing of the components, True or 'counters' for
+        # timing counters, 'cprofile' or 'sampling' to profile runs as
+        # well, see profiling.Profiler. None leaves everything unwrapped
+        self.profiler = None
+        if instrument:
+            from profiling import Profiler
+            self.profiler = Profiler('counters' if instrument is True
+                else instrument).instrument(self)
+
+        # optional recording of trajectories and arrivals, a file path
+        # or a recorder.Recorder, closed by close. Like the sink it is
+        # not part of config, a restored simulation records elsewhere
+        self.recorder = None
+        if record is not None:
+            from recorder import Recorder
+            self.recorder = (record if isinstance(record, Recorder)
+                else Recorder(record)).attach(self)
+
+    @classmethod
+    def from_config(cls, config: SimConfig, sink=None):
+        """
+        Method creates the simulation described by config
+        :param sink: event sink, NullSink by default
+        :return: (Simulation)
+        """
+        return cls(sink=sink if sink is not None else NullSink(),
+            **config.simulation_kwargs())
+
+    def run_service(self, building=0, pending=None):
+        traffic = self.traffics[building]
+        if pending is not None:
+            # arrival restored from a checkpoint
+            self.pending[building] = pending
+            yield self.env.timeout(max(0, pending[0] - self.env.now))
+            self.pending[building] = None
+            _, count, origin, destination = pending
+            if count is None:
+                count, origin, destination = traffic.draw_request()
+            self.serve_request(origin, destination, count, building)
+
+        if self.batched_traffic:
+            for arrival in traffic.arrivals(self.env.now):
+                time, count, origin, destination = arrival
+                self.pending[building] = (self.env.now + time, count,
+                    origin, destination)
+                yield self.env.timeout(time)
+                self.pending[building] = None
+                self.serve_request(origin, destination, count, building)
+            # trace exhausted
+            return
 
-    def run_service(self):
         while True:
             # wait until next arrival
             count, origin, destination, = \
-                yield self.env.process(self.traffic.next_traffic())
+                yield self.env.process(traffic.next_traffic())
+
+            self.serve_request(origin, destination, count, building)
 
-            print_event(time=round(self.env.now, 1),
+    def serve_request(self, origin, destination, count, building=0):
+        self.requests += 1
+        control = self.controls[building]
+        if self.sink.enabled:
+            self.sink.emit(time=round(self.env.now, 1),
+                system=control.ec_id if len(self.controls) > 1 else '-',
                 event=f'Request arrived: {origin} to {destination}')
-            
-            self.elevatorcontrol.request_service(origin, destination, count)
+
+        control.request_service(origin, destination, count)
+
+    def schedule_arrival(self, arrivals, building=0):
+        """Method schedules the next arrival on the EventEngine"""
+        arrival = next(arrivals, None)
+        if arrival is not None:
+            time, count, origin, destination = arrival
+            self.pending[building] = (self.env.now + time, count, origin,
+                destination)
+            self.env.schedule(time, self.arrive, arrivals,
+                origin, destination, count, building)
+
+    def arrive(self, arrivals, origin, destination, count, building):
+        self.pending[building] = None
+        self.serve_request(origin, destination, count, building)
+        self.schedule_arrival(arrivals, building)
+
+    def schedule_traffic(self, building=0, delay=None):
+        """
+        Method schedules the next arrival of unbatched traffic on the
+        EventEngine, drawn in the order TrafficGenerator.next_traffic
+        draws it on simpy: the time now, the request on arrival
+        :param delay: time until the arrival, drawn by default
+        """
+        traffic = self.traffics[building]
+        if delay is None:
+            delay = traffic.generate_time()
+        traffic.next_time = self.env.now + delay
+        self.env.schedule(delay, self.traffic_arrive, building)
+
+    def traffic_arrive(self, building):
+        traffic = self.traffics[building]
+        traffic.next_time = None
+        count, origin, destination = traffic.draw_request()
+        self.serve_request(origin, destination, count, building)
+        self.schedule_traffic(building)
+
+    def start(self, pending=None, next_ticks=None):
+        """
+        Method starts the traffic of every building, once
+        :param pending: (list) next arrival of every building, when
+            resuming from a checkpoint
+        :param next_ticks: (list) next tick of every optimizer, when
+            resuming from a checkpoint
+        """
+        if self.started:
+            return
+        self.started = True
+        for index, optimizer in enumerate(self.optimizers):
+            optimizer.start(next_ticks[index] if next_ticks else None)
+        pending = pending or [None]*len(self.traffics)
+        for building, traffic in enumerate(self.traffics):
+            if self.engine == 'simpy':
+                self.env.process(self.run_service(building,
+                    pending[building]))
+                continue
+            if not self.batched_traffic:
+                self.schedule_traffic(building, None
+                    if pending[building] is None
+                    else max(0, pending[building][0] - self.env.now))
+                continue
+            if pending[building] is not None:
+                time, count, origin, destination = pending[building]
+                self.pending[building] = pending[building]
+                self.env.schedule(max(0, time - self.env.now), self.arrive,
+                    traffic.arrivals(self.env.now), origin, destination,
+                    count, building)
+            else:
+                # traces and profiles start at the current time, not 0
+                self.schedule_arrival(traffic.arrivals(self.env.now),
+                    building)
+
+    def run(self, until):
+        """Method starts the traffic and runs simulation until given time"""
+        self.start()
+        if self.profiler is None:
+            self.env.run(until)
+        else:
+            with self.profiler:
+                self.env.run(until)
+
+    def kpi(self):
+        """Method returns KPIs of all buildings merged in a KPICollector"""
+        merged = KPICollector()
+        for control in self.controls:
+            merged.merge(control.kpi)
+        return merged
+
+    def results(self):
+        """
+        Method summarizes the run so far, over all buildings
+        :return: (dict) metric name -> value
+        """
+        results = {'sim_time': self.env.now, 'requests': self.requests}
+        results.update(self.kpi().summary())
+        halls = [control.hall for control in self.controls
+            if control.hall is not None]
+        if halls:
+            # passenger model, people waiting at the landings
+            results['waiting'] = sum(hall.waiting() for hall in halls)
+            results['waiting_peak'] = max(hall.peak for hall in halls)
+        return results
+
+    def building_results(self):
+        """
+        Method summarizes KPIs of each building
+        :return: (list) of dict, with the control_id as 'building'
+        """
+        return [dict(building=control.ec_id, **control.kpi.summary())
+            for control in self.controls]
+
+    def close(self):
+        """Method flushes and closes the event sink and the recorder"""
+        self.sink.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def snapshot(self):
+        """
+        Method captures the complete state of the simulation as plain
+        data: clock, construction parameters, elevators with their
+        queues and current tasks, schedulers, KPIs, traffic sources with
+        their pending arrivals and the states of random, np.random and
+        the streams.
+        See checkpoint for saving it to a file.
+        :return: (dict)
+        """
+        pending = list(self.pending)
+        if self.started and not self.batched_traffic:
+            # next_traffic draws count and floors only on arrival
+            pending = [(traffic.next_time, None, None, None)
+                if traffic.next_time is not None else None
+                for traffic in self.traffics]
+        return {
+            'now': self.env.now,
+            'config': self.config,
+            'requests': self.requests,
+            'started': self.started,
+            'pending': pending,
+            'next_ticks': [optimizer.next_tick
+                for optimizer in self.optimizers],
+            'controls': [control.snapshot() for control in self.controls],
+            'traffics': [traffic.snapshot() for traffic in self.traffics],
+            'random': random.getstate(),
+            'np_random': np.random.get_state(),
+            'streams': None if self.streams is None
+                else self.streams.snapshot(),
+        }
+
+    @classmethod
+    def restore(cls, state, sink=None):
+        """
+        Method rebuilds a simulation from snapshot, it continues exactly
+        as the captured one would have
+        :param sink: event sink of the restored simulation
+        :return: (Simulation)
+        """
+        sim = cls(sink=sink, start_time=state['now'], **state['config'])
+        sim.requests = state['requests']
+        for control, control_state in zip(sim.controls, state['controls']):
+            control.restore(control_state)
+        for traffic, traffic_state in zip(sim.traffics, state['traffics']):
+            traffic.restore(traffic_state)
+        if state['started']:
+            sim.start(state['pending'], state['next_ticks'])
+
+        # last, building the simulation draws random numbers
+        random.setstate(state['random'])
+        np.random.set_state(state['np_random'])
+        if state.get('streams') is not None:
+            sim.streams.restore(state['streams'])
+        return sim
+
+def run(config, sink=None):
+    """
+    Function runs a simulation described by config to its end, the
+    entry point for embedding the simulator: nothing is printed and the
+    global random state is left alone
+
+    :param config: (SimConfig) or (dict) of its fields
+    :param sink: event sink, NullSink by default
+    :return: (dict) see Simulation.results
+    """
+    if isinstance(config, dict):
+        config = SimConfig.from_dict(config)
+    sim = Simulation.from_config(config, sink)
+    try:
+        sim.run(config.sim_time)
+    finally:
+        sim.close()
+    return sim.results()
+
 
 class Logger(object):
     def __init__(self):
@@ -67,26 +451,46 @@ class Logger(object):
         pass
 
 if __name__ == '__main__':
-	if len(sys.argv) >= 2:
-		sys.stdout = Logger()
-		print("\n\nSIMULATION started logging at" \
-			+ f" {dt.strftime(dt.now(), '%m/%d/%Y %H:%M')}")
-		print_event("TIME", "SYSTEM", "EVENT", "MESSAGE", "ETC")
-
-		if len(sys.argv) == 3 and sys.argv[2].upper() == "REAL":
-			sim = Simulation(realtime=True)
+	if len(sys.argv) == 2 and sys.argv[1].endswith('.json'):
+		# headless run of a config file, results as JSON
+		print(json.dumps(run(SimConfig.load(sys.argv[1])), indent=2))
+	elif len(sys.argv) >= 2:
+		mode = sys.argv[2].upper() if len(sys.argv) == 3 else None
+
+		if mode in ["HEADLESS", "PROFILE"]:
+			# skip the terminal, write events to log file in batches
+			sink = FileSink('outputlog.txt')
+			sink.write("\n\nSIMULATION started logging at" \
+				+ f" {dt.strftime(dt.now(), '%m/%d/%Y %H:%M')}\n")
+			sink.emit("TIME", "SYSTEM", "EVENT", "MESSAGE", "ETC")
+		else:
+			sys.stdout = Logger()
+			print("\n\nSIMULATION started logging at" \
+				+ f" {dt.strftime(dt.now(), '%m/%d/%Y %H:%M')}")
+			print_event("TIME", "SYSTEM", "EVENT", "MESSAGE", "ETC")
+			sink = None
+
+		if mode == "REAL":
+			sim = Simulation(realtime=True, sink=sink)
+		elif mode == "PROFILE":
+			sim = Simulation(sink=sink, instrument='sampling')
 		else:
-			sim = Simulation()
+			sim = Simulation(sink=sink)
 
-		sim.env.process(sim.run_service())
+		sim.start()
 
 		try:
-			sim.env.run(sys.argv[1])
+			sim.run(float(sys.argv[1]))
+			if sim.profiler is not None:
+				print(sim.profiler.report())
 		except ValueError as err:
 			print("Error occured due to provided SIM_TIME")
 			print("SIM_TIME must be > Simulation "\
 			+ f"Initial time = {SIM_INIT_TIME}")
 			print(err)
+		finally:
+			sim.close()
 	else:
 		print("Provide at least simulation time in format"+\
-		": python simulation.py SIM_TIME")
\ No newline at end of file
+		": python simulation.py SIM_TIME [REAL|HEADLESS|PROFILE]"+\
+		" or a config in format: python simulation.py CONFIG.json")
\ No newline at end of file
@@ -0,0 +1,67 @@
+import numpy as np
+
+
+# components drawing random numbers, each gets a stream of its own per
+# building: inter-arrival times, origin/destination floors, people
+# counts and the floors elevators start at
+STREAMS = ('arrivals', 'od', 'counts', 'positions')
+
+
+class RandomStreams:
+    """
+    Class: Independent random number generators per component and
+    building, all derived from one seed. A generator is keyed by
+    (building, component) through SeedSequence spawn keys, so its draws
+    do not depend on which other generators exist or in which order
+    they are used. Two simulations with the same seed see the same
+    demand whatever their elevators do with it, the common random
+    numbers paired comparisons rely on, see paired.
+    """
+    def __init__(self, seed):
+        if not isinstance(seed, int) or seed < 0:
+            raise ValueError('Stream seed must be non negative integer')
+        self.seed = seed
+        self.generators = {} # (building, name) -> numpy.random.Generator
+
+    def sequence(self, building, name):
+        return np.random.SeedSequence(self.seed,
+            spawn_key=(building, STREAMS.index(name)))
+
+    def get(self, name, building=1):
+        """Method returns the generator of component name in building"""
+        if name not in STREAMS:
+            raise ValueError('Stream must be one of ' + ', '.join(STREAMS))
+        key = (building, name)
+        if key not in self.generators:
+            self.generators[key] = np.random.default_rng(
+                self.sequence(building, name))
+        return self.generators[key]
+
+    def building(self, building):
+        """Method returns (dict) name -> generator of every component
+        of building"""
+        return {name: self.get(name, building) for name in STREAMS}
+
+    def reseed(self, seed):
+        """Method restarts every generator from seed, in place, so the
+        components keep using the same objects"""
+        self.seed = seed
+        for (building, name), generator in self.generators.items():
+            generator.bit_generator.state = np.random.PCG64(
+                self.sequence(building, name)).state
+
+    def snapshot(self):
+        """Method returns the states of the generators as plain data"""
+        return {'seed': self.seed, 'states': {key:
+            generator.bit_generator.state
+            for key, generator in self.generators.items()}}
+
+    def restore(self, state):
+        """Method sets the states of the generators from snapshot"""
+        self.seed = state['seed']
+        for (building, name), generator_state in state['states'].items():
+            self.get(name, building).bit_generator.state = generator_state
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,171 @@
+import csv
+import itertools
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from eventsink import NullSink
+import simulation
+import checkpoint
+
+
+# parameters of simulation.Simulation a sweep can vary
+SWEEP_PARAMETERS = ('floors', 'num_elevators', 'floor_height', 'max_speed',
+    'max_acceleration', 'dist_lambda', 'batched_traffic', 'scheduler',
+    'dispatch', 'optimizer_period', 'capacity', 'retarget', 'streams')
+
+
+def parameter_grid(**axes):
+    """
+    Function expands axes into the list of all combinations, e.g.
+    parameter_grid(num_elevators=[1, 2], max_speed=[2, 4]) gives 4 dicts
+
+    :param axes: parameter name -> list of values, floors may be given as
+        a count of floors numbered from 1
+    :return: (list) of dict
+    """
+    for name in axes:
+        if name not in SWEEP_PARAMETERS:
+            raise ValueError(f'Unknown sweep parameter {name}')
+    names = list(axes)
+    return [dict(zip(names, values))
+        for values in itertools.product(*axes.values())]
+
+
+def seed_state(seed_sequence):
+    """Function returns seeds for random and np.random from one
+    spawned numpy.random.SeedSequence"""
+    state = seed_sequence.generate_state(4)
+    return int(state[0]), state
+
+
+def build(params):
+    """Function creates the headless simulation of a parameter set"""
+    sim_params = dict(params)
+    if isinstance(sim_params.get('floors'), int):
+        sim_params['floors'] = tuple(range(1, sim_params['floors'] + 1))
+    return simulation.Simulation(sink=NullSink(), **sim_params)
+
+
+def warm_up(job):
+    """
+    Function runs the warm-up of a parameter set, in a worker process
+    :param job: (tuple) params dict, warm-up time and
+        numpy.random.SeedSequence of the warm-up
+    :return: (bytes) checkpoint at the end of the warm-up
+    """
+    params, warmup, seed_sequence = job
+    python_seed, numpy_seed = seed_state(seed_sequence)
+    random.seed(python_seed)
+    np.random.seed(numpy_seed)
+
+    sim = build(params)
+    sim.run(warmup)
+    return checkpoint.dumps(sim)
+
+
+def run_one(job):
+    """
+    Function runs one simulation of a sweep, in a worker process
+
+    :param job: (tuple) params dict, simulation time, replication
+        number, numpy.random.SeedSequence of this run and the warm-up
+        checkpoint to fork from, or None to start cold
+    :return: (dict) row with params, replication and results
+    """
+    params, sim_time, replication, seed_sequence, warm_start = job
+
+    # independent stream per run, whatever worker it lands on
+    python_seed, numpy_seed = seed_state(seed_sequence)
+
+    start = time.perf_counter()
+    if warm_start is None:
+        random.seed(python_seed)
+        np.random.seed(numpy_seed)
+        sim = build(params)
+    else:
+        sim = checkpoint.fork(warm_start, sink=NullSink(), reset_kpi=True)
+        random.seed(python_seed)
+        np.random.seed(numpy_seed)
+        if sim.streams is not None:
+            sim.streams.reseed(python_seed)
+        for traffic in sim.traffics:
+            traffic.discard_buffer()
+    sim.run(sim.env.now + sim_time)
+    sim.close()
+
+    row = dict(params)
+    row['replication'] = replication
+    row.update(sim.results())
+    row['wall_time'] = time.perf_counter() - start
+    return row
+
+
+def run_sweep(grid, sim_time, replications=1, workers=None,
+        base_seed=simulation.RANDOM_SEED, warmup=0):
+    """
+    Function runs every parameter set of grid replications times across
+    a process pool. Every run gets its own seed spawned from base_seed,
+    so results do not depend on the number of workers.
+
+    :param grid: (list) of parameter dicts, see parameter_grid
+    :param sim_time: simulated time of each run, after the warm-up
+    :param workers: (int) number of processes, all cores by default
+    :param warmup: simulated time to warm up each parameter set. It
+        runs once per parameter set, its replications fork from its
+        checkpoint and only measure the following sim_time
+    :return: (list) of result rows, in grid order
+    """
+    root = np.random.SeedSequence(base_seed)
+    seeds = root.spawn(len(grid)*replications)
+
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) \
+        if workers > 1 else None
+    try:
+        def run_all(function, jobs):
+            if executor is None:
+                return [function(job) for job in jobs]
+            # several jobs per message keeps IPC out of the way
+            chunksize = max(1, len(jobs)//(workers*4))
+            return list(executor.map(function, jobs, chunksize=chunksize))
+
+        warm_starts = [None]*len(grid)
+        if warmup > 0:
+            warm_starts = run_all(warm_up, [(params, warmup, seed)
+                for params, seed in zip(grid, root.spawn(len(grid)))])
+
+        return run_all(run_one, [(params, sim_time, replication,
+            seeds[index*replications + replication], warm_starts[index])
+            for index, params in enumerate(grid)
+            for replication in range(replications)])
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def write_table(rows, file_path):
+    """Function writes result rows as a CSV table"""
+    columns = []
+    for row in rows:
+        columns.extend(column for column in row if column not in columns)
+    with open(file_path, 'w', newline='') as table:
+        writer = csv.DictWriter(table, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 2:
+        grid = parameter_grid(num_elevators=[1, 2, 4],
+            dist_lambda=[2, 5, 10], max_speed=[2, 4])
+        rows = run_sweep(grid, float(sys.argv[1]), replications=3)
+        write_table(rows, sys.argv[2] if len(sys.argv) == 3 else 'sweep.csv')
+        print(f'Wrote {len(rows)} runs')
+    else:
+        print("Provide at least simulation time in format"+\
+        ": python sweep.py SIM_TIME [TABLE.csv]")
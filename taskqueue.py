@@ -0,0 +1,196 @@
+class TaskQueue:
+    """
+    Class: Doubly linked queue of Task objects held by an Elevator.
+    Task objects are their own handles (prev/next links live on the
+    task), so popping the front and splicing before or after a known
+    task are O(1). Positional access walks from the nearer end.
+
+    Given a duration function, the queue also keeps the cumulative time
+    from its front to the end of every task (task.eta). Splices only
+    mark the earliest changed task, in order of task.rank, the prefix
+    sums from there on are recomputed lazily, up to the task queried.
+    """
+    def __init__(self, duration=None):
+        self.first = None
+        self.last = None
+        self.length = 0
+
+        # prefix sums of task durations, see elapsed
+        self.duration = duration
+        self.base = 0 # time at the front of the queue, in eta terms
+        self.dirty = None # earliest task whose eta is stale, if any
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        task = self.first
+        while task is not None:
+            # read link before yielding so caller may remove task
+            next_task = task.next
+            yield task
+            task = next_task
+
+    def __getitem__(self, index):
+        return self.task_at(index)
+
+    def __delitem__(self, index):
+        self.remove(self.task_at(index))
+
+    def task_at(self, index):
+        """
+        Method returns the task at given position
+        :param index: (int) position, negative counts from the end
+        :return: Task object
+        """
+        if index < 0:
+            index += self.length
+        if index < 0 or index >= self.length:
+            raise IndexError('Task queue index out of range')
+
+        if index <= self.length // 2:
+            task = self.first
+            for _ in range(index):
+                task = task.next
+        else:
+            task = self.last
+            for _ in range(self.length - 1 - index):
+                task = task.prev
+        return task
+
+    def append(self, task):
+        task.prev = self.last
+        task.next = None
+        if self.last is None:
+            self.first = task
+        else:
+            self.last.next = task
+        self.last = task
+        self.length += 1
+        if self.duration is not None:
+            task.rank = 0.0 if task.prev is None else task.prev.rank + 1
+            self.touch(task)
+        return task
+
+    def appendleft(self, task):
+        if self.first is None:
+            return self.append(task)
+        return self.insert_before(self.first, task)
+
+    def insert_after(self, handle, task):
+        """Method splices task right after handle (a queued task)"""
+        if handle is self.last:
+            return self.append(task)
+        task.prev = handle
+        task.next = handle.next
+        handle.next.prev = task
+        handle.next = task
+        self.length += 1
+        if self.duration is not None:
+            self.rank_between(task)
+            self.touch(task)
+        return task
+
+    def insert_before(self, handle, task):
+        """Method splices task right before handle (a queued task)"""
+        if handle is self.first:
+            task.prev = None
+            task.next = handle
+            handle.prev = task
+            self.first = task
+            self.length += 1
+            if self.duration is not None:
+                task.rank = handle.rank - 1
+                self.touch(task)
+            return task
+        return self.insert_after(handle.prev, task)
+
+    def insert(self, index, task):
+        """Method inserts task at position, list.insert semantics"""
+        if index < 0:
+            index = max(0, index + self.length)
+        if index >= self.length:
+            return self.append(task)
+        return self.insert_before(self.task_at(index), task)
+
+    def remove(self, task):
+        """Method unlinks a queued task in O(1)"""
+        if self.duration is not None:
+            if task is self.dirty:
+                # stale sums start right after it now
+                self.dirty = task.next
+            elif task.prev is None:
+                # later sums stay valid, measured from the new front
+                self.base = task.eta
+            elif task.next is not None:
+                self.touch(task.next)
+        if task.prev is None:
+            self.first = task.next
+        else:
+            task.prev.next = task.next
+        if task.next is None:
+            self.last = task.prev
+        else:
+            task.next.prev = task.prev
+        task.prev = task.next = None
+        self.length -= 1
+        return task
+
+    def popleft(self):
+        if self.first is None:
+            raise IndexError('Pop from empty task queue')
+        return self.remove(self.first)
+
+    def clear(self):
+        for task in self:
+            task.prev = task.next = None
+        self.first = self.last = None
+        self.length = 0
+        self.base = 0
+        self.dirty = None
+
+    def rank_between(self, task):
+        """Method gives a spliced task a rank between its neighbours,
+        renumbering the queue once floats cannot split the gap"""
+        rank = (task.prev.rank + task.next.rank)/2
+        if task.prev.rank < rank < task.next.rank:
+            task.rank = rank
+            return
+        for rank, queued in enumerate(self):
+            queued.rank = float(rank)
+
+    def touch(self, task):
+        """
+        Method marks the duration of a queued task changed, eta of the
+        task and all later ones is recomputed when next needed
+        """
+        if self.dirty is None or task.rank < self.dirty.rank:
+            self.dirty = task
+
+    def elapsed(self, task):
+        """
+        Method returns time from the start of the first queued task to
+        the end of task, through prefix sums
+        :param task: a queued task, None for the time before the first
+        :return: (float)
+        """
+        if task is None:
+            return 0
+        dirty = self.dirty
+        if dirty is not None and dirty.rank <= task.rank:
+            # recompute stale sums up to task
+            eta = self.base if dirty.prev is None else dirty.prev.eta
+            duration = self.duration
+            current = dirty
+            while True:
+                eta += duration(current)
+                current.eta = eta
+                if current is task:
+                    break
+                current = current.next
+            self.dirty = task.next
+        return task.eta - self.base
+
+
+if __name__ == '__main__':
+    pass
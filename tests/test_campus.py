@@ -0,0 +1,20 @@
+from campus import partition, run_campus
+
+
+def test_partition_keeps_buildings_in_order():
+    buildings = [{'num_elevators': n} for n in (1, 3, 1, 1, 2)]
+    shards = partition(buildings, 3)
+    assert len(shards) <= 3
+    assert [index for shard in shards for index, _ in shard] == \
+        list(range(len(buildings)))
+
+
+def test_results_do_not_depend_on_workers():
+    buildings = [{}, {'num_elevators': 2}, {}, {'dist_lambda': 10}]
+    runs = [run_campus(buildings, 500, workers=workers, engine='events')
+        for workers in (1, 2)]
+    assert runs[0]['results']['requests'] > 0
+    assert runs[0]['results'] == runs[1]['results']
+    assert runs[0]['buildings'] == runs[1]['buildings']
+    # buildings draw from their own streams
+    assert len({result['requested'] for result in runs[0]['buildings']}) > 1
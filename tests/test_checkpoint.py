@@ -0,0 +1,41 @@
+import pytest
+
+import checkpoint
+from eventsink import NullSink
+from simulation import Simulation
+
+
+@pytest.mark.parametrize('params', [
+    {'engine': 'simpy', 'seed': 3},
+    {'engine': 'simpy', 'seed': 3, 'batched_traffic': True},
+    {'engine': 'events', 'seed': 3},
+    {'engine': 'events', 'streams': 3, 'num_elevators': 3, 'capacity': 4,
+        'dist_lambda': 4, 'retarget': True},
+    {'engine': 'simpy', 'streams': 3, 'num_elevators': 3, 'buildings': 2},
+    {'engine': 'events', 'streams': 3, 'num_elevators': 3,
+        'optimizer_period': 20, 'dist_lambda': 3},
+])
+def test_restored_run_continues_identically(params):
+    sim = Simulation(sink=NullSink(), **params)
+    sim.run(1500)
+    data = checkpoint.dumps(sim)
+    sim.run(4000)
+
+    restored = checkpoint.loads(data, NullSink())
+    assert restored.env.now == 1500
+    restored.run(4000)
+    assert restored.results() == sim.results()
+
+
+def test_forks_with_a_seed_differ():
+    sim = Simulation(sink=NullSink(), engine='events', streams=3,
+        num_elevators=2)
+    sim.run(1000)
+    data = checkpoint.dumps(sim)
+    forks = []
+    for seed in (1, 1, 2):
+        fork = checkpoint.fork(data, seed, NullSink(), reset_kpi=True)
+        fork.run(3000)
+        forks.append(fork.results())
+    assert forks[0] == forks[1]
+    assert forks[0] != forks[2]
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+from config import SimConfig
+import simulation
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_leaves_optional_modules_unloaded():
+    # a fresh interpreter, this one has loaded everything already
+    code = ('import sys, simulation; print(" ".join(sorted(name for name'
+        + ' in ("recorder", "zlib", "mmap", "simpy", "groupcontrol",'
+        + ' "profiling") if name in sys.modules)))')
+    loaded = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+        capture_output=True, text=True, check=True).stdout.split()
+    assert loaded == []
+
+
+def test_run_is_repeatable():
+    config = SimConfig(sim_time=2000, num_elevators=2, seed=7)
+    first = simulation.run(config)
+    assert first['requests'] > 0
+    assert simulation.run(config.to_dict()) == first
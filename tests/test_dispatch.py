@@ -0,0 +1,137 @@
+import math
+
+import numpy as np
+import pytest
+
+from dispatch import FULL_PENALTY
+from eventsink import NullSink
+from simulation import Simulation
+
+
+def request_direction(floor_at, floor_to):
+    return 0 if floor_to is None else (1 if floor_to > floor_at else -1)
+
+
+def scalar_retarget(control, e_id, floor_at, req_dir):
+    """Time for a moving car to stop at floor_at on its way, inf if it
+    cannot"""
+    elevator = control.elevators[e_id]
+    if not control.dispatcher.retarget or not elevator.moving():
+        return math.inf
+    floor_from, floor_to, depart, _ = elevator.motion
+    direction = 1 if floor_to > floor_from else -1
+    elapsed = control.env.now - depart
+    index = elevator.floor_index
+    if req_dir in (0, direction) and \
+            (floor_at - floor_from)*direction > 0 and \
+            (floor_to - floor_at)*direction > 0 and elapsed <= \
+            elevator.braking_table[index[floor_from], index[floor_at]]:
+        return elevator.get_travel_time(floor_from, floor_at) - elapsed
+    return math.inf
+
+
+def scalar_eta(control, e_id, floor_at, floor_to):
+    """ETA of one car computed from the elevator itself, as the
+    Dispatcher estimates it"""
+    elevator = control.elevators[e_id]
+    travel = elevator.get_travel_time
+    here = elevator.current_state
+    direction = {'up': 1, 'down': -1, None: 0}[
+        elevator.get_current_direction()]
+    req_dir = request_direction(floor_at, floor_to)
+
+    turn = here
+    runs = control.schedulers[e_id].runs
+    if direction and runs and runs[0].direction == direction:
+        turn = runs[0].end
+    if direction == 0 or ((floor_at - here)*direction >= 0 and
+            req_dir in (0, direction)):
+        eta = travel(here, floor_at)
+    else:
+        eta = travel(here, turn) + travel(turn, floor_at)
+    eta = min(eta, scalar_retarget(control, e_id, floor_at, req_dir))
+
+    eta += len(elevator.tasks)*control.dispatcher.stop_time
+    if elevator.is_full():
+        eta += FULL_PENALTY
+    return eta
+
+
+def scalar_lookahead(control, e_id, floor_at, floor_to):
+    """ETA of one car following its queue"""
+    req_dir = request_direction(floor_at, floor_to)
+    eta = min(control.schedulers[e_id].eta_to(floor_at, direction)
+        for direction in ((1, -1) if req_dir == 0 else (req_dir,)))
+    eta = min(eta, scalar_retarget(control, e_id, floor_at, req_dir))
+    if control.elevators[e_id].is_full():
+        eta += FULL_PENALTY
+    return eta
+
+
+def states(retarget):
+    """Yields a busy controller at a few points of a run, small cars
+    filling up now and then"""
+    sim = Simulation(sink=NullSink(), engine='events', streams=3,
+        num_elevators=4, dist_lambda=1.5, capacity=6, retarget=retarget)
+    sim.start()
+    for time in range(100, 2100, 100):
+        sim.env.run(time)
+        yield sim.elevatorcontrol
+
+
+@pytest.mark.parametrize('retarget', [False, True])
+def test_vectorized_eta_matches_scalar(retarget):
+    calls = [(floor_at, floor_to) for floor_at in range(1, 10)
+        for floor_to in (None, 1, 9) if floor_at != floor_to]
+    full = moving = 0
+    for control in states(retarget):
+        dispatcher = control.dispatcher
+        e_ids = dispatcher.e_ids
+        full += sum(elevator.is_full()
+            for elevator in control.elevators.values())
+        moving += sum(elevator.moving()
+            for elevator in control.elevators.values())
+        for floor_at, floor_to in calls:
+            expected = [scalar_eta(control, e_id, floor_at, floor_to)
+                for e_id in e_ids]
+            assert dispatcher.eta(floor_at, floor_to) == \
+                pytest.approx(expected)
+            assert dispatcher.select(floor_at, floor_to) == \
+                e_ids[int(np.argmin(expected))]
+
+            expected = [scalar_lookahead(control, e_id, floor_at, floor_to)
+                for e_id in e_ids]
+            assert dispatcher.lookahead(floor_at, floor_to) == \
+                pytest.approx(expected)
+            assert dispatcher.select(floor_at, floor_to, True) == \
+                e_ids[int(np.argmin(expected))]
+
+        # the matrix holds the same estimates for calls with a direction
+        directed = [call for call in calls if call[1] is not None]
+        matrix = dispatcher.eta_matrix([floor_at for floor_at, _ in directed],
+            [request_direction(*call) for call in directed])
+        for column, (floor_at, floor_to) in enumerate(directed):
+            assert matrix[:, column] == pytest.approx(
+                dispatcher.eta(floor_at, floor_to))
+    # the states cover full and moving cars
+    assert full > 0 and moving > 0
+
+
+def test_full_car_is_passed_over():
+    control = next(states(False))
+    dispatcher = control.dispatcher
+    e_ids = dispatcher.e_ids
+    best = dispatcher.select(5, 9)
+    elevator = control.elevators[best]
+    elevator.load, capacity = elevator.capacity, elevator.load
+    dispatcher.sync(best)
+    assert dispatcher.select(5, 9) != best
+    eta = dispatcher.eta(5, 9)
+    assert eta[e_ids.index(best)] >= FULL_PENALTY
+    # with every car full the nearest is still chosen
+    for e_id in e_ids:
+        other = control.elevators[e_id]
+        other.load = other.capacity
+        dispatcher.sync(e_id)
+    assert dispatcher.select(5, 9) == best
+    assert (dispatcher.eta(5, 9) >= FULL_PENALTY).all()
@@ -0,0 +1,62 @@
+import math
+
+import numpy as np
+import pytest
+
+from elevator import braking_start, braking_table, compute_travel_time, \
+    travel_time_table
+
+FLOORS = (1, 2, 3, 5, 8, 13, 21)
+HEIGHT, SPEED, ACCEL = 4, 4, 1
+
+
+def closed_form(dist):
+    """Time for dist meters from stand still to stand still, and when
+    braking starts: a triangle profile short of top speed, else a
+    trapezoid cruising at it"""
+    if dist < SPEED*SPEED/ACCEL:
+        half = math.sqrt(dist/ACCEL)
+        return 2*half, half
+    return dist/SPEED + SPEED/ACCEL, dist/SPEED
+
+
+@pytest.mark.parametrize('dist', [4, 8, 12, 15.9, 16, 16.1, 40, 80])
+def test_trip_matches_closed_form(dist):
+    travel, braking = closed_form(dist)
+    assert compute_travel_time(dist, SPEED, ACCEL) == round(travel, 1)
+    assert braking_start(dist, SPEED, ACCEL) == pytest.approx(braking)
+    # braking from the speed reached takes the rest of the trip
+    speed = min(SPEED, ACCEL*braking)
+    assert braking + speed/ACCEL == pytest.approx(travel)
+
+
+def test_tables_match_closed_form():
+    travel = travel_time_table(FLOORS, HEIGHT, SPEED, ACCEL)
+    braking = braking_table(FLOORS, HEIGHT, SPEED, ACCEL)
+    assert travel.shape == braking.shape == (len(FLOORS), len(FLOORS))
+    short = long = 0
+    for i, floor_from in enumerate(FLOORS):
+        for j, floor_to in enumerate(FLOORS):
+            dist = abs(floor_to - floor_from)*HEIGHT
+            if dist == 0:
+                assert travel[i, j] == braking[i, j] == 0
+                continue
+            expected_travel, expected_braking = closed_form(dist)
+            assert travel[i, j] == round(expected_travel, 1)
+            assert braking[i, j] == pytest.approx(expected_braking)
+            if dist < SPEED*SPEED/ACCEL:
+                short += 1
+            else:
+                long += 1
+    assert short and long
+    assert (travel == travel.T).all()
+
+
+def test_tables_are_shared_and_read_only():
+    table = travel_time_table(FLOORS, HEIGHT, SPEED, ACCEL)
+    assert travel_time_table(FLOORS, HEIGHT, SPEED, ACCEL) is table
+    assert braking_table(FLOORS, HEIGHT, SPEED, ACCEL) is \
+        braking_table(FLOORS, HEIGHT, SPEED, ACCEL)
+    with pytest.raises(ValueError):
+        table[0, 1] = 0
+    assert np.all(np.diff(table[0]) > 0)
@@ -0,0 +1,16 @@
+import numpy as np
+
+from elevatorcontrol import ElevatorControl
+from engine import EventEngine
+from eventsink import NullSink
+
+
+def test_cases_request_after_a_hold_task():
+    control = ElevatorControl(EventEngine(), 1, tuple(range(1, 10)), 1, 4, 4,
+        1, NullSink(), 'cases', rng=np.random.default_rng(0))
+    control.create_move_task(1, 2, 5)
+    control.create_non_move_task(1, 'hold', 5, 3)
+
+    control.add_update_tasks(1, 3, 1)
+    assert [task.key for task in control.elevators[1].tasks] == [
+        ('move', 2, 5), ('hold', 5), ('move', 5, 3), ('move', 3, 1)]
@@ -0,0 +1,29 @@
+import pytest
+
+from eventsink import NullSink
+from simulation import Simulation
+
+
+def results(engine, sim_time=3000, **params):
+    sim = Simulation(sink=NullSink(), engine=engine, **params)
+    sim.run(sim_time)
+    return sim.results()
+
+
+@pytest.mark.parametrize('params', [
+    {'seed': 1},
+    {'seed': 1, 'batched_traffic': True},
+    {'seed': 2, 'num_elevators': 3, 'dist_lambda': 2},
+    {'seed': 4, 'scheduler': 'cases'},
+    {'seed': 3, 'buildings': 2, 'num_elevators': 2},
+    {'streams': 5, 'num_elevators': 2, 'capacity': 4},
+    {'streams': 7, 'num_elevators': 3, 'dispatch': 'lookahead'},
+])
+def test_engines_agree(params):
+    assert results('simpy', **params) == results('events', **params)
+
+
+def test_default_seeded_run_agrees():
+    simpy_results = results('simpy', seed=1)
+    assert simpy_results['requests'] > 0
+    assert simpy_results == results('events', seed=1)
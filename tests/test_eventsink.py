@@ -0,0 +1,28 @@
+import pytest
+
+from eventsink import EventSink, FileSink, NullSink, RingSink, StdoutSink
+
+
+def test_sink_needs_emit():
+    with pytest.raises(TypeError):
+        EventSink()
+
+    class Silent(EventSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Silent()
+
+
+def test_sinks_emit(tmp_path, capsys):
+    ring = RingSink(2)
+    for sink in (NullSink(), StdoutSink(), ring,
+            FileSink(tmp_path / 'events.log', batch_size=2)):
+        for second in range(3):
+            sink.emit(time=second, event='Request arrived')
+        sink.close()
+    assert capsys.readouterr().out.count('Request arrived') == 3
+    # the ring keeps the last events only
+    assert len(ring.lines()) == 2
+    with open(tmp_path / 'events.log') as log:
+        assert log.read().count('Request arrived') == 3
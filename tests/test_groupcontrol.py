@@ -0,0 +1,27 @@
+import numpy as np
+
+from eventsink import NullSink
+from groupcontrol import auction
+from simulation import Simulation
+
+
+def optimized_run(engine):
+    sim = Simulation(sink=NullSink(), engine=engine, streams=3,
+        num_elevators=3, dist_lambda=3, optimizer_period=30)
+    sim.run(2000)
+    return sim.results(), [optimizer.reassigned
+        for optimizer in sim.optimizers]
+
+
+def test_optimized_runs_repeat():
+    for engine in ('simpy', 'events'):
+        first = optimized_run(engine)
+        assert first[1][0] > 0
+        for _ in range(2):
+            assert optimized_run(engine) == first
+
+
+def test_auction_gives_up_after_max_rounds():
+    benefit = np.array([[3.0, 2.0, 1.0], [3.0, 2.0, 1.0], [3.0, 2.0, 1.0]])
+    assert sorted(auction(benefit, 0.01)) == [0, 1, 2]
+    assert (auction(benefit, 0.01, max_rounds=1) < 0).any()
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from kpi import KPICollector, QuantileSketch, Request, RunningStats
+
+QUANTILES = (0, 0.01, 0.25, 0.5, 0.9, 0.95, 0.99, 1)
+
+
+def samples(seed=0, size=5000):
+    rng = np.random.default_rng(seed)
+    return np.concatenate([rng.exponential(20, size),
+        rng.lognormal(3, 1, size)])
+
+
+@pytest.mark.parametrize('accuracy', [0.01, 0.05])
+def test_sketch_quantiles_within_relative_accuracy(accuracy):
+    values = samples()
+    sketch = QuantileSketch(accuracy)
+    for value in values:
+        sketch.add(value)
+    for q in QUANTILES:
+        # the sketch ranks like numpy's 'lower' method
+        exact = np.percentile(values, q*100, method='lower')
+        assert abs(sketch.quantile(q) - exact) <= accuracy*exact
+
+
+def test_sketch_counts_small_values_as_zero():
+    sketch = QuantileSketch(min_value=1e-3)
+    for value in [0, 1e-4, 5, 6]:
+        sketch.add(value)
+    assert sketch.quantile(0.3) == 0
+    assert sketch.quantile(1) == pytest.approx(6, rel=0.01)
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_sketch_merge_equals_single_pass():
+    values = samples(1)
+    single = QuantileSketch()
+    parts = [QuantileSketch() for _ in range(3)]
+    for index, value in enumerate(values):
+        single.add(value)
+        parts[index % 3].add(value)
+    merged = parts[0].merge(parts[1]).merge(parts[2])
+    assert merged.count == single.count
+    assert merged.buckets == single.buckets
+    for q in QUANTILES:
+        assert merged.quantile(q) == single.quantile(q)
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketch(0.05))
+
+
+def test_running_stats_match_numpy_and_merge():
+    values = samples(2)
+    single = RunningStats()
+    first, second, empty = RunningStats(), RunningStats(), RunningStats()
+    for value in values:
+        single.add(value)
+    for value in values[:1234]:
+        first.add(value)
+    for value in values[1234:]:
+        second.add(value)
+    first.merge(empty).merge(second)
+    for stats in (single, first):
+        assert stats.count == len(values)
+        assert stats.mean == pytest.approx(np.mean(values), rel=1e-12)
+        assert stats.variance == pytest.approx(np.var(values, ddof=1),
+            rel=1e-9)
+        assert stats.min == values.min()
+        assert stats.max == values.max()
+    # merging into an empty one copies
+    copy = empty.merge(single)
+    assert copy.count == single.count
+    assert copy.mean == pytest.approx(single.mean, rel=1e-12)
+    assert copy.m2 == pytest.approx(single.m2, rel=1e-12)
+
+
+def test_collector_merge_equals_single_pass():
+    rng = np.random.default_rng(3)
+    single = KPICollector()
+    parts = [KPICollector(), KPICollector()]
+    for index in range(500):
+        request = Request(1, 5, 1, rng.uniform(0, 100))
+        request.pickup_time = request.arrival_time + rng.exponential(20)
+        request.dropoff_time = request.pickup_time + rng.uniform(5, 30)
+        for collector in (single, parts[index % 2]):
+            collector.record_request(request)
+            collector.record_delivery(request)
+    merged = parts[0].merge(parts[1])
+    summary = merged.summary()
+    assert summary.keys() == single.summary().keys()
+    for name, value in single.summary().items():
+        assert summary[name] == pytest.approx(value, rel=1e-9)
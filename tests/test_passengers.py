@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from config import SimConfig
+from elevatorcontrol import ElevatorControl
+from engine import EventEngine
+from eventsink import NullSink
+from kpi import Request
+from simulation import Simulation
+
+
+def idle_control(scheduler='look', capacity=8):
+    env = EventEngine()
+    control = ElevatorControl(env, 1, tuple(range(1, 10)), 1, 4, 4, 1,
+        NullSink(), scheduler, capacity=capacity,
+        rng=np.random.default_rng(0))
+    elevator = control.elevators[1]
+    elevator.current_state = 1
+    elevator.current_altitude = 0
+    return env, control, elevator
+
+
+@pytest.mark.parametrize('engine', ['simpy', 'events'])
+@pytest.mark.parametrize('scheduler, capacity', [('look', 20),
+    ('cases', None)])
+def test_people_are_conserved(engine, scheduler, capacity):
+    sim = Simulation(sink=NullSink(), engine=engine, streams=2,
+        num_elevators=3, dist_lambda=4, scheduler=scheduler,
+        capacity=capacity, retarget=True)
+    sim.run(3000)
+    control = sim.elevatorcontrol
+    elevators = control.elevators.values()
+    for elevator in elevators:
+        if capacity is not None:
+            assert elevator.load <= capacity
+        assert elevator.load == sum(request.count
+            for requests in elevator.riders.values() for request in requests)
+    results = sim.results()
+    if capacity is not None:
+        waiting = sum(request.count for elevator in elevators
+            for requests in elevator.waiting.values() for request in requests)
+        assert waiting == control.hall.waiting() == results['waiting']
+
+    # every request is delivered, on board or waiting
+    assert results['delivered'] > 0.9*results['requested']
+    assert results['requested'] == results['delivered'] + sum(
+        len(requests) for elevator in elevators
+        for groups in (elevator.riders, elevator.waiting)
+        for requests in groups.values())
+
+
+def test_capacity_needs_the_look_scheduler():
+    with pytest.raises(ValueError):
+        Simulation(sink=NullSink(), scheduler='cases', capacity=8)
+    with pytest.raises(ValueError):
+        SimConfig(sim_time=100, scheduler='cases', capacity=8)
+
+
+def test_queued_eta_includes_exchange():
+    env, control, elevator = idle_control()
+    control.request_service(3, 7, 4)
+    # both moves are queued, the car has not started yet
+    predicted = elevator.eta_to(7, 1)
+    assert control.schedulers[1].eta_to(7, 1) == pytest.approx(predicted)
+    assert predicted == pytest.approx(elevator.get_travel_time(1, 3) +
+        elevator.exchange_time(4) + elevator.get_travel_time(3, 7))
+
+    while elevator.motion is None or elevator.motion[:2] != (3, 7):
+        env.run(env.now + 0.5)
+    assert elevator.motion[3] == pytest.approx(predicted)
+    # riders get off before the car is free again
+    assert elevator.eta_to(1, -1) == pytest.approx(elevator.task_end -
+        env.now + elevator.get_travel_time(7, 1))
+
+
+def test_counts_to_one_destination_are_summed():
+    _, control, _ = idle_control('cases', None)
+    counts = []
+    control.add_update_tasks = lambda e_id, floor_from, floor_to, count: \
+        counts.append((floor_to, count))
+    control.dispatch_request(Request(3, 7, 2, 0), Request(3, 7, 3, 0),
+        Request(3, 8, 1, 0))
+    assert counts == [(7, 5), (8, 1)]
+
+
+def test_exchange_changes_touch_only_affected_moves():
+    env, control, elevator = idle_control()
+    scheduler = control.schedulers[1]
+    # route 1, 3, 6, 8, 4
+    for floor_from, floor_to in [(3, 6), (8, 4)]:
+        scheduler.add_request(floor_from, floor_to)
+    tasks = elevator.tasks
+    moves = {(task.floor_from, task.floor_to): task for task in tasks}
+    assert list(moves) == [(1, 3), (3, 6), (6, 8), (8, 4)]
+    tasks.elapsed(tasks.last)
+
+    # people waiting at 6 going up change the move leaving 6 only
+    elevator.assign(Request(6, 9, 3, env.now))
+    assert tasks.dirty is moves[(6, 8)]
+    tasks.elapsed(tasks.last)
+    # nobody leaves 6 going down, riders to 8 change the move into it
+    elevator.exchange_changed((6, -1), (8,))
+    assert tasks.dirty is moves[(6, 8)]
+    tasks.elapsed(tasks.last)
+    elevator.exchange_changed((8, -1))
+    assert tasks.dirty is moves[(8, 4)]
+    total = 0
+    for task in tasks:
+        total += task.duration()
+        assert tasks.elapsed(task) == total
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+import realtime
+from eventsink import NullSink
+from realtime import RealtimeDriver
+from simulation import Simulation
+
+
+class FakeClock:
+    """Wall clock of the driver, moved by the test only"""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(realtime.time, 'perf_counter', clock)
+    return clock
+
+
+def driver(engine='events'):
+    sim = Simulation(sink=NullSink(), engine=engine, streams=1,
+        num_elevators=2)
+    # 10 units of simulation time per wall clock second
+    return RealtimeDriver(sim, factor=0.1, idle_speedup=1)
+
+
+@pytest.mark.parametrize('engine', ['simpy', 'events'])
+def test_injected_calls_are_dispatched_at_wall_clock_time(clock, engine):
+    live = driver(engine)
+
+    async def session():
+        running = asyncio.create_task(live.run())
+        await asyncio.sleep(0)
+
+        clock.now += 0.5
+        request = await live.inject(2, 7)
+        assert request.arrival_time == pytest.approx(5)
+        assert request.e_id in live.sim.elevatorcontrol.elevators
+        assert live.sim.requests == 1
+
+        # a minute later the car is long done with it
+        clock.now += 6
+        await live.inject(7, 1)
+        assert live.env.now == pytest.approx(65)
+        assert request.dropoff_time is not None
+        assert live.sim.results()['delivered'] == 1
+
+        live.stop()
+        await running
+
+    asyncio.run(session())
+    summary = live.summary()
+    assert summary['dispatched'] == 2
+    assert summary['rejected'] == 0
+    # the fake clock stands still between injection and dispatch
+    assert summary['latency_ms_max'] == 0
+
+
+def test_invalid_calls_are_rejected(clock):
+    live = driver()
+
+    async def session():
+        running = asyncio.create_task(live.run())
+        await asyncio.sleep(0)
+        with pytest.raises(ValueError, match='same floor'):
+            await live.inject(3, 3)
+        with pytest.raises(ValueError, match='Unknown building'):
+            await live.inject(3, 4, building=1)
+        # the driver goes on taking calls
+        await live.inject(3, 4)
+        live.stop()
+        await running
+
+    asyncio.run(session())
+    assert live.rejected == 2
+    assert live.dispatched == 1
+    assert live.sim.requests == 1
+
+
+def test_driver_refuses_realtime_simulation():
+    with pytest.raises(ValueError):
+        RealtimeDriver(Simulation(sink=NullSink(), realtime=True))
+    with pytest.raises(ValueError):
+        RealtimeDriver(Simulation(sink=NullSink()), factor=0)
@@ -0,0 +1,36 @@
+import numpy as np
+
+from eventsink import NullSink
+from recorder import BEGIN, FINISH, Recorder, Recording
+from simulation import Simulation
+
+
+def record(file_path, decimate):
+    sim = Simulation(sink=NullSink(), engine='events', streams=3,
+        num_elevators=2, dist_lambda=5,
+        record=Recorder(str(file_path), decimate=decimate))
+    sim.run(3000)
+    sim.close()
+    return Recording(str(file_path))
+
+
+def test_decimated_recording_keeps_task_pairs(tmp_path):
+    full = record(tmp_path/'full.rec', 1).table('tasks')
+    recording = record(tmp_path/'decimated.rec', 2)
+    tasks = recording.table('tasks')
+    recording.close()
+
+    assert set(tasks.tolist()) <= set(full.tolist())
+    for elevator in (1, 2):
+        mine = tasks[tasks['elevator'] == elevator]
+        begins = np.flatnonzero(mine['event'] == BEGIN)
+        finishes = np.flatnonzero(mine['event'] == FINISH)
+        assert len(finishes) > 0
+        # every finish follows the begin of its task
+        assert len(begins) - len(finishes) in (0, 1)
+        assert (finishes == begins[:len(finishes)] + 1).all()
+        assert (mine['target'][finishes] ==
+            mine['target'][begins[:len(finishes)]]).all()
+
+    full_begins = (full['event'] == BEGIN).sum()
+    assert abs((tasks['event'] == BEGIN).sum() - full_begins/2) <= 2
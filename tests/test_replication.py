@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from replication import ReplicationRunner, WindowedKPI, mser, t_cdf, \
+    t_quantile
+
+# (p, df, quantile) from printed t tables
+T_TABLE = [(0.975, 1, 12.7062), (0.975, 2, 4.3027), (0.975, 3, 3.1824),
+    (0.995, 3, 5.8409), (0.995, 4, 4.6041), (0.95, 5, 2.0150),
+    (0.975, 10, 2.2281), (0.975, 30, 2.0423), (0.995, 1, 63.6567),
+    (0.975, 200, 1.9719)]
+
+
+@pytest.mark.parametrize('p, df, quantile', T_TABLE)
+def test_t_quantile_matches_tables(p, df, quantile):
+    assert t_quantile(p, df) == pytest.approx(quantile, abs=1e-4)
+    assert t_quantile(1 - p, df) == pytest.approx(-quantile, abs=1e-4)
+    assert t_cdf(t_quantile(p, df), df) == pytest.approx(p, abs=1e-12)
+
+
+def test_mser_drops_known_transient():
+    rng = np.random.default_rng(1)
+    # 100 values decaying from 20 to the steady mean 5, then 400 more
+    transient = 5 + 15*np.linspace(1, 0, 100)**2
+    values = np.concatenate([transient, np.full(400, 5.0)]) + \
+        rng.normal(0, 0.5, 500)
+    truncation = mser(values)
+    assert truncation % 5 == 0
+    assert 60 <= truncation <= 110
+    assert mser(rng.normal(5, 0.5, 500)) <= 50
+
+
+def test_mser_ignores_empty_windows():
+    values = np.array([50.0]*10 + [5.0, 0.0]*45)
+    weights = np.array([1]*10 + [1, 0]*45)
+    assert mser(values, weights) == 10
+
+
+def delivered(dropoff_time, wait_time, ride_time=10):
+    return SimpleNamespace(dropoff_time=dropoff_time, wait_time=wait_time,
+        ride_time=ride_time, total_time=wait_time + ride_time)
+
+
+def test_windowed_kpi_sums_by_window():
+    first = WindowedKPI(60, 250)
+    second = WindowedKPI(60, 250)
+    first.record_delivery(delivered(10, 4))
+    first.record_delivery(delivered(70, 6))
+    # past the last window, counted in it
+    second.record_delivery(delivered(300, 8))
+    first.merge(second)
+    assert list(first.counts) == [1, 1, 0, 0, 1]
+    assert list(first.sums['wait']) == [4, 6, 0, 0, 8]
+    assert list(first.sums['total']) == [14, 16, 0, 0, 18]
+    assert first.delivered == 3
+
+
+def test_runner_truncates_and_estimates():
+    runner = ReplicationRunner({'num_elevators': 2}, 2400, 0.1, window=60,
+        workers=1, min_replications=3)
+    rng = np.random.default_rng(2)
+    means = []
+    for _ in range(4):
+        counts = np.full(40, 20)
+        mean = rng.normal(30, 1)
+        means.append(mean)
+        wait = np.full(40, mean)
+        # a warm-up of 5 windows, much shorter waits
+        wait[:5] = 5
+        runner.add(counts, {'wait': wait*counts, 'total': (wait + 10)*counts})
+    runner.update()
+    # the warm-up goes, past it each replica's mean is the same
+    assert 5 <= runner.truncation <= 20
+    assert runner.stats['wait'].mean == pytest.approx(np.mean(means))
+    half = t_quantile(0.975, 3)*np.std(means, ddof=1)/2
+    assert runner.half_width('wait') == pytest.approx(half)
+    assert runner.converged()
+    assert runner.summary()['warmup'] == 60*runner.truncation
+
+
+def test_runner_is_repeatable():
+    params = {'num_elevators': 2, 'dist_lambda': 5}
+    summaries = [ReplicationRunner(params, 600, rel_width=0.5, workers=1,
+        min_replications=3, max_replications=3).run() for _ in range(2)]
+    assert summaries[0] == summaries[1]
+    assert summaries[0]['replications'] == 3
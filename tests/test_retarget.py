@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+import elevatorcontrol
+from elevatorcontrol import ElevatorControl
+from engine import EventEngine
+from eventsink import NullSink
+from simulation import Simulation
+
+FLOORS = tuple(range(1, 16))
+
+
+def moving_car(floor_to=9):
+    """A car on EventEngine that has just left floor 1 for floor_to"""
+    env = EventEngine()
+    control = ElevatorControl(env, 1, FLOORS, 1, 4, 4, 1, NullSink(),
+        rng=np.random.default_rng(0))
+    elevator = control.elevators[1]
+    elevator.current_state = 1
+    elevator.current_altitude = 0
+    control.request_service(1, floor_to, 1)
+    env.run(0.5)
+    assert elevator.moving()
+    return env, control, elevator
+
+
+def test_position_follows_the_move():
+    env, _, elevator = moving_car()
+    depart = elevator.motion[2]
+    positions = []
+    for time in np.linspace(depart, elevator.motion[3], 20):
+        positions.append(elevator.position(time))
+    assert positions[0] == pytest.approx(1)
+    assert positions[-1] == pytest.approx(9)
+    assert all(np.diff(positions) >= 0)
+
+    # a car can stop further on than where it is, never behind it
+    assert elevator.stoppable_floor() >= elevator.position()
+    assert elevator.can_stop_at(5)
+    assert not elevator.can_stop_at(1)
+    assert not elevator.can_stop_at(9)
+    # braking for floor_to, no floor before it is left
+    late = elevator.motion[3] - 0.1
+    assert elevator.stoppable_floor(late) == 9
+    assert not elevator.can_stop_at(8, late)
+
+
+def test_retarget_stops_on_the_way():
+    env, control, elevator = moving_car()
+    depart = elevator.motion[2]
+    assert control.retarget(1, 5)
+    assert elevator.motion[:2] == (1, 5)
+    assert elevator.motion[3] == pytest.approx(depart +
+        elevator.get_travel_time(1, 5))
+    assert elevator.tasks.first.key == ('move', 5, 9)
+
+    arrive = elevator.motion[3]
+    env.run(arrive - 0.01)
+    assert elevator.motion[:2] == (1, 5)
+    # stops at 5, then moves on to 9 right away
+    env.run(arrive + 0.01)
+    assert elevator.motion[:3] == (5, 9, pytest.approx(arrive))
+    env.run(100)
+    assert elevator.current_state == 9
+    assert control.kpi.delivered == 1
+
+
+def test_too_late_to_retarget():
+    env, control, elevator = moving_car(3)
+    env.run(elevator.motion[3] - 0.1)
+    assert not control.retarget(1, 2)
+    assert elevator.motion[:2] == (1, 3)
+
+
+@pytest.mark.parametrize('engine', ['simpy', 'events'])
+def test_retargeted_routes_stay_connected(engine, monkeypatch):
+    retarget = ElevatorControl.retarget
+    counts = {'retargeted': 0}
+
+    def checked(self, e_id, floor, direction=None):
+        elevator = self.elevators[e_id]
+        done = retarget(self, e_id, floor, direction)
+        if done:
+            counts['retargeted'] += 1
+            previous = elevator.current_state
+            for task in elevator.tasks:
+                assert task.floor_from == previous
+                previous = task.floor_to
+        return done
+
+    monkeypatch.setattr(elevatorcontrol.ElevatorControl, 'retarget', checked)
+    sim = Simulation(sink=NullSink(), engine=engine, streams=3,
+        num_elevators=3, floors=FLOORS, dist_lambda=4, retarget=True)
+    sim.run(3000)
+    assert counts['retargeted'] > 0
+    # nobody is lost on a shortened move
+    results = sim.results()
+    assert results['requested'] == results['delivered'] + sum(
+        len(requests) for elevator in sim.elevatorcontrol.elevators.values()
+        for groups in (elevator.riders, elevator.waiting)
+        for requests in groups.values())
+
+
+def test_retargeting_cuts_waits():
+    waits = []
+    for retarget in (False, True):
+        sim = Simulation(sink=NullSink(), engine='events', streams=3,
+            num_elevators=3, floors=FLOORS, dist_lambda=4, retarget=retarget)
+        sim.run(5000)
+        waits.append(sim.results()['wait_mean'])
+    assert waits[1] < waits[0]
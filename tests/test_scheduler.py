@@ -0,0 +1,66 @@
+import simpy
+
+from elevatorcontrol import ElevatorControl
+from eventsink import NullSink
+from scheduler import compare_with_cases, is_served, route_of
+
+
+FLOORS = tuple(range(1, 10))
+
+
+def look_route(start, requests):
+    """Returns the route LookScheduler plans for requests, from start"""
+    control = ElevatorControl(simpy.Environment(), 1, FLOORS, 1, 4, 4, 1,
+        sink=NullSink(), scheduler='look')
+    elevator = control.elevators[1]
+    elevator.current_state = start
+    for floor_from, floor_to in requests:
+        control.schedulers[1].add_request(floor_from, floor_to)
+    return route_of(elevator, [start])
+
+
+def test_moved_turnaround_is_still_a_stop():
+    # 7 -> 2 moves the turnaround from 4 out to 7, the car must still
+    # stop at 4 on its way down for 4 -> 2
+    route = look_route(2, [(4, 2), (7, 2)])
+    assert route == [2, 7, 4, 2]
+    assert is_served(route, 0, 4, 2)
+    assert is_served(route, 0, 7, 2)
+
+
+def test_look_matches_or_beats_cases():
+    for advance_prob in (0, 0.3, 1):
+        stats = compare_with_cases(trials=300, advance_prob=advance_prob)
+        assert stats['look_failed'] == 0
+        # every trial the legacy scheduler got through is compared
+        compared = stats['identical'] + stats['shorter'] + \
+            stats['longer'] + stats['same_length']
+        assert compared + stats['cases_failed'] == stats['trials']
+        # LOOK is longer now and then as it never defers riders to a
+        # later sweep, e.g. from 9 with 6 -> 7, 9 -> 8 and then 7 -> 1 it
+        # goes down to 1 before taking 6 -> 7, see LookScheduler, but
+        # it has to win overall
+        assert stats['longer'] < stats['shorter']
+        assert stats['look_length'] <= stats['cases_length']
+
+
+def test_turnaround_without_riders_off_is_passed():
+    # 9 -> 3 moves the turnaround out from 8 to 9. People only get off
+    # at 8, so the car stops there on the way up but not on the way down
+    route = look_route(2, [(4, 8), (6, 1), (9, 3)])
+    assert route == [2, 4, 8, 9, 6, 3, 1]
+    assert is_served(route, 0, 4, 8)
+    assert is_served(route, 0, 6, 1)
+    assert is_served(route, 0, 9, 3)
+
+
+def test_look_exception_counts_as_look_failure(monkeypatch):
+    from scheduler import LookScheduler
+
+    def broken(self, floor_from, floor_to):
+        raise RuntimeError('broken')
+
+    monkeypatch.setattr(LookScheduler, 'add_request', broken)
+    stats = compare_with_cases(trials=20)
+    assert stats['look_failed'] == 20
+    assert stats['cases_failed'] < 20
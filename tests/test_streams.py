@@ -0,0 +1,91 @@
+import random
+
+import numpy as np
+import pytest
+
+import elevatorcontrol
+from eventsink import NullSink
+from paired import compare_policies
+from simulation import Simulation
+from streams import STREAMS, RandomStreams
+
+REQUEST_SERVICE = elevatorcontrol.ElevatorControl.request_service
+
+POLICIES = [
+    {'num_elevators': 2},
+    {'num_elevators': 4, 'dispatch': 'lookahead'},
+    {'num_elevators': 2, 'scheduler': 'cases', 'retarget': True},
+    {'num_elevators': 3, 'optimizer_period': 20},
+]
+
+
+def demand(monkeypatch, **params):
+    """Requests a run serves, as (time, building, origin, destination,
+    count), and the floors its first building's cars start at"""
+    arrivals = []
+
+    def logged(self, floor_at, floor_to, count):
+        arrivals.append((self.env.now, self.ec_id, floor_at, floor_to, count))
+        return REQUEST_SERVICE(self, floor_at, floor_to, count)
+
+    monkeypatch.setattr(elevatorcontrol.ElevatorControl, 'request_service',
+        logged)
+    sim = Simulation(sink=NullSink(), streams=7, **params)
+    starts = [elevator.current_state
+        for elevator in sim.elevatorcontrol.elevators.values()]
+    sim.run(2000)
+    return arrivals, starts
+
+
+def test_generators_do_not_depend_on_each_other():
+    alone = RandomStreams(5).get('od', 2).integers(100, size=10)
+    streams = RandomStreams(5)
+    for name in STREAMS:
+        streams.get(name).random(1000)
+    assert (streams.get('od', 2).integers(100, size=10) == alone).all()
+    assert not (RandomStreams(5).get('od', 1).integers(100, size=10)
+        == alone).all()
+
+
+@pytest.mark.parametrize('traffic', [
+    {'engine': 'simpy'},
+    {'engine': 'events'},
+    {'engine': 'events', 'batched_traffic': True},
+])
+def test_policies_see_the_same_demand(traffic, monkeypatch):
+    first = None
+    for policy in POLICIES:
+        arrivals, starts = demand(monkeypatch, **traffic, **policy)
+        # cars added by a policy do not move the others
+        if first is None:
+            first = arrivals, starts[:2]
+            assert len(arrivals) > 100
+        else:
+            assert (arrivals, starts[:2]) == first
+
+
+def test_buildings_keep_their_demand(monkeypatch):
+    base, _ = demand(monkeypatch, buildings=2)
+    changed, _ = demand(monkeypatch,
+        buildings=[{}, {'num_elevators': 3, 'capacity': 4}])
+    assert [arrival for arrival in changed if arrival[1] == 1] == \
+        [arrival for arrival in base if arrival[1] == 1]
+    assert [arrival[2:] for arrival in changed if arrival[1] == 2] == \
+        [arrival[2:] for arrival in base if arrival[1] == 2]
+
+
+def test_global_random_state_is_left_alone():
+    python_state = random.getstate()
+    numpy_state = np.random.get_state()
+    Simulation(sink=NullSink(), streams=7, num_elevators=2).run(1000)
+    assert random.getstate() == python_state
+    after = np.random.get_state()
+    assert after[0] == numpy_state[0] and (after[1] == numpy_state[1]).all()
+
+
+def test_paired_differences_beat_independent_ones():
+    results = compare_policies({'eta': {}, 'lookahead':
+        {'dispatch': 'lookahead'}}, 1500, replications=6,
+        params={'num_elevators': 3, 'dist_lambda': 4}, workers=1)
+    for comparison in results['lookahead'].values():
+        assert comparison['variance_ratio'] > 1
@@ -0,0 +1,131 @@
+import random
+
+import pytest
+
+from taskqueue import TaskQueue
+
+
+class Item:
+    """Stand-in for a Task: links, rank and eta kept by the queue, and a
+    duration of its own"""
+    def __init__(self, duration):
+        self.duration = duration
+        self.prev = self.next = None
+        self.rank = self.eta = None
+
+
+def queue():
+    return TaskQueue(duration=lambda item: item.duration)
+
+
+def expected(tasks, item):
+    """Elapsed time by summing durations from the front"""
+    total = 0
+    for queued in tasks:
+        total += queued.duration
+        if queued is item:
+            return total
+    raise AssertionError('item not queued')
+
+
+def test_elapsed_sums_durations_and_follows_splices():
+    tasks = queue()
+    a, b, c = Item(1), Item(2), Item(4)
+    for item in (a, b, c):
+        tasks.append(item)
+    assert tasks.elapsed(None) == 0
+    assert [tasks.elapsed(item) for item in (a, b, c)] == [1, 3, 7]
+
+    d = tasks.insert_after(a, Item(8))
+    assert list(tasks) == [a, d, b, c]
+    assert tasks.elapsed(c) == 15
+    e = tasks.insert_before(a, Item(16))
+    assert tasks.first is e
+    assert [tasks.elapsed(item) for item in tasks] == [16, 17, 25, 27, 31]
+
+    tasks.remove(d)
+    assert tasks.elapsed(c) == 23
+    assert len(tasks) == 4
+
+
+def test_popleft_shifts_base():
+    tasks = queue()
+    items = [tasks.append(Item(duration)) for duration in (1, 2, 4, 8)]
+    assert tasks.elapsed(items[-1]) == 15
+    assert tasks.popleft() is items[0]
+    # later sums stay valid, measured from the new front
+    assert tasks.base == 1
+    assert tasks.dirty is None
+    assert [tasks.elapsed(item) for item in items[1:]] == [2, 6, 14]
+    tasks.popleft()
+    tasks.append(Item(16))
+    assert tasks.elapsed(tasks.last) == 28
+
+
+def test_touch_recomputes_from_changed_task_only():
+    tasks = queue()
+    items = [tasks.append(Item(1)) for _ in range(5)]
+    assert tasks.elapsed(items[-1]) == 5
+    items[2].duration = 10
+    tasks.touch(items[3])
+    tasks.touch(items[2])
+    # the earliest touched task is the one recomputed from
+    assert tasks.dirty is items[2]
+    assert tasks.elapsed(items[1]) == 2
+    assert tasks.dirty is items[2]
+    assert tasks.elapsed(items[3]) == 13
+    assert tasks.dirty is items[4]
+    assert tasks.elapsed(items[4]) == 14
+
+
+def test_rank_between_renumbers_once_gaps_run_out():
+    tasks = queue()
+    first = tasks.append(Item(1))
+    last = tasks.append(Item(1))
+    # halving the gap between 0 and the next rank runs out of floats
+    for _ in range(80):
+        tasks.insert_after(first, Item(1))
+    ranks = [item.rank for item in tasks]
+    assert ranks == sorted(ranks)
+    assert len(set(ranks)) == len(ranks)
+    assert tasks.elapsed(last) == 82
+
+
+def test_matches_sums_under_random_operations():
+    rng = random.Random(0)
+    tasks = queue()
+    for _ in range(5000):
+        operation = rng.random()
+        if operation < 0.4 or not len(tasks):
+            item = Item(rng.randint(1, 9))
+            if not len(tasks) or operation < 0.1:
+                tasks.append(item)
+            elif operation < 0.25:
+                tasks.insert_before(tasks[rng.randrange(len(tasks))], item)
+            else:
+                tasks.insert_after(tasks[rng.randrange(len(tasks))], item)
+        elif operation < 0.55:
+            tasks.popleft()
+        elif operation < 0.7:
+            tasks.remove(tasks[rng.randrange(len(tasks))])
+        else:
+            item = tasks[rng.randrange(len(tasks))]
+            item.duration = rng.randint(1, 9)
+            tasks.touch(item)
+        if len(tasks):
+            item = tasks[rng.randrange(len(tasks))]
+            assert tasks.elapsed(item) == expected(tasks, item)
+
+
+def test_positional_access():
+    tasks = TaskQueue()
+    items = [tasks.append(Item(1)) for _ in range(5)]
+    assert tasks[0] is items[0] and tasks[-1] is items[-1]
+    assert tasks[3] is items[3]
+    del tasks[1]
+    assert list(tasks) == [items[0]] + items[2:]
+    with pytest.raises(IndexError):
+        tasks[4]
+    tasks.clear()
+    with pytest.raises(IndexError):
+        tasks.popleft()
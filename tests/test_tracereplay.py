@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from eventsink import NullSink
+from simulation import Simulation
+from trafficprofile import ArrivalProfile, Period, uniform_od
+
+
+def arrival_times(sim):
+    """Times requests arrive at during sim.run"""
+    times = []
+    serve_request = sim.serve_request
+
+    def logged(origin, destination, count, building=0):
+        times.append(sim.env.now)
+        return serve_request(origin, destination, count, building)
+
+    sim.serve_request = logged
+    return times
+
+
+@pytest.mark.parametrize('engine', ['simpy', 'events'])
+def test_trace_replays_from_start_time(tmp_path, engine):
+    trace = tmp_path / 'trace.jsonl'
+    with open(trace, 'w') as rows:
+        for time in (5, 50, 150, 260):
+            rows.write(json.dumps({'time': time, 'origin': 1,
+                'destination': 5, 'count': 1}) + '\n')
+    sim = Simulation(sink=NullSink(), engine=engine, trace=str(trace),
+        start_time=100, streams=1)
+    times = arrival_times(sim)
+    sim.run(400)
+    # rows before the start are skipped, the others keep their times
+    assert times == [150, 260]
+
+
+@pytest.mark.parametrize('engine', ['simpy', 'events'])
+def test_profile_starts_at_start_time(engine):
+    od = uniform_od(tuple(range(1, 10)))
+    # nobody arrives in the first half of the cycle
+    profile = ArrivalProfile([Period(0, 0, od), Period(1000, 0.5, od)],
+        cycle=2000)
+    sim = Simulation(sink=NullSink(), engine=engine, profile=profile,
+        start_time=1000, streams=1)
+    times = arrival_times(sim)
+    sim.run(1200)
+    assert len(times) > 50
+    assert all(1000 <= time <= 1200 for time in times)
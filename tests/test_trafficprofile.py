@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from trafficprofile import AliasTable, ArrivalProfile, Period, office_day, \
+    uniform_od
+
+FLOORS = (1, 2, 3, 4)
+
+
+def profile():
+    """Rate 1 until 100, nothing until 200, rate 2 to the end of a 300
+    long cycle"""
+    od = uniform_od(FLOORS)
+    return ArrivalProfile([Period(0, 1, od), Period(100, 0, od),
+        Period(200, 2, od)], cycle=300)
+
+
+def test_alias_table_draws_weights():
+    weights = np.array([1, 0, 3, 6, 0.5])
+    table = AliasTable(weights)
+    draws = table.sample(200000, np.random.default_rng(0))
+    frequencies = np.bincount(draws, minlength=len(weights))/len(draws)
+    assert frequencies[1] == 0
+    assert frequencies == pytest.approx(weights/weights.sum(), abs=0.004)
+
+
+@pytest.mark.parametrize('weights', [[], [[1, 2]], [1, -1], [0, 0]])
+def test_alias_table_refuses_bad_weights(weights):
+    with pytest.raises(ValueError):
+        AliasTable(weights)
+
+
+def test_invert_undoes_cumulative():
+    arrivals = profile()
+    # every time outside the empty period, over several cycles
+    times = np.array([0, 50, 99.5, 200, 250, 299.9, 300, 330, 560, 1234])
+    hazard = np.array([arrivals.cumulative(time) for time in times])
+    inverted, index = arrivals.invert(hazard)
+    assert inverted == pytest.approx(times)
+    assert (index != 1).all()
+
+
+def test_invert_is_monotone_across_boundaries():
+    arrivals = profile()
+    # expected arrivals per cycle are 100 + 200
+    hazard = np.linspace(0, 3*300, 9001)
+    times, index = arrivals.invert(hazard)
+    assert (np.diff(times) >= 0).all()
+    # the empty period is skipped, arrivals there are at its end
+    offset = times % 300
+    assert not ((offset > 100) & (offset < 200)).any()
+    assert (index != 1).all()
+    assert times[-1] == pytest.approx(900)
+
+
+def test_sample_skips_zero_rate_period():
+    arrivals = profile()
+    rng = np.random.default_rng(1)
+    streams = {'arrivals': rng, 'od': rng}
+    times, index, origins, destinations = arrivals.sample(250, 30000,
+        streams)
+    assert times[0] >= 250
+    assert (np.diff(times) >= 0).all()
+    offset = times % 300
+    assert not ((offset > 100) & (offset < 200)).any()
+    assert (index != 1).all()
+    assert (origins != destinations).all()
+    # 300 expected arrivals per cycle
+    cycles = (times[-1] - 250)/300
+    assert len(times)/cycles == pytest.approx(300, rel=0.03)
+
+
+def test_profile_validation():
+    od = uniform_od(FLOORS)
+    with pytest.raises(ValueError):
+        ArrivalProfile([Period(10, 1, od)], cycle=300)
+    with pytest.raises(ValueError):
+        ArrivalProfile([Period(0, 0, od)], cycle=300)
+    with pytest.raises(ValueError):
+        Period(0, -1, od)
+    assert office_day(FLOORS).size == len(FLOORS)
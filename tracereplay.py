@@ -0,0 +1,148 @@
+import itertools
+import json
+import sys
+
+import numpy as np
+
+
+TRACE_DTYPE = np.dtype([('time', 'f8'), ('origin', 'i4'),
+    ('destination', 'i4'), ('count', 'i4')])
+
+
+class TraceReplay:
+    """
+    Class: Replays recorded traffic instead of generating it. A trace is
+    either a JSON lines file, one request per line with keys time,
+    origin, destination and count, or the same trace converted by
+    convert_trace into a columnar .npy file, which is memory-mapped.
+    Both are read a chunk at a time, so memory stays bounded whatever
+    the trace length. Times are absolute simulation times and must not
+    decrease.
+    """
+    def __init__(self, trace_path, floors: tuple = None,
+            chunk_size: int = 4096):
+        self.trace_path = trace_path
+        self.floors = None if floors is None else frozenset(floors)
+
+        if isinstance(chunk_size, int) and chunk_size >= 1:
+            self.chunk_size = chunk_size
+        else:
+            raise ValueError("Chunk size must be positive integer")
+
+        # rows read so far and time of the last one handed out, so a
+        # new arrivals generator resumes where the last one stopped
+        self.position = 0
+        self.last_time = None
+
+    def is_columnar(self):
+        return str(self.trace_path).endswith('.npy')
+
+    def read_json_lines(self):
+        """Generator of (time, count, origin, destination) from JSONL"""
+        with open(self.trace_path) as trace:
+            for line_no, line in enumerate(trace, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                    yield float(row['time']), int(row['count']), \
+                        int(row['origin']), int(row['destination'])
+                except (KeyError, TypeError, ValueError) as err:
+                    raise ValueError(f'Invalid trace row at line {line_no}'
+                        + f' of {self.trace_path}: {err}')
+
+    def read_columnar(self):
+        """Generator of (time, count, origin, destination) from .npy"""
+        trace = np.load(self.trace_path, mmap_mode='r')
+        if trace.dtype != TRACE_DTYPE:
+            raise ValueError(f'Trace {self.trace_path} must have dtype'
+                + f' {TRACE_DTYPE}')
+
+        for start in range(0, len(trace), self.chunk_size):
+            chunk = trace[start:start + self.chunk_size]
+            yield from zip(chunk['time'].tolist(), chunk['count'].tolist(),
+                chunk['origin'].tolist(), chunk['destination'].tolist())
+
+    def rows(self):
+        if self.is_columnar():
+            return self.read_columnar()
+        return self.read_json_lines()
+
+    def arrivals(self, start_time=0):
+        """
+        Generator of arrivals in the trace, same format as
+        TrafficGenerator.arrivals
+        :param start_time: simulation time replay starts at, earlier
+            rows are skipped. A later generator resumes after the rows
+            read by the last one instead.
+        :return: yields (inter-arrival time, count, origin, destination)
+        """
+        if self.last_time is None:
+            self.last_time = start_time
+            skip_before = start_time
+        else:
+            skip_before = None
+        rows = itertools.islice(self.rows(), self.position, None)
+        for time, count, origin, destination in rows:
+            self.position += 1
+            if skip_before is not None and time < skip_before:
+                continue
+            if time < self.last_time:
+                raise ValueError(f'Trace {self.trace_path} is not sorted'
+                    + f' by time at {time}')
+            if self.floors is not None and \
+            (origin not in self.floors or destination not in self.floors):
+                raise ValueError(f'Request {origin} to {destination} at'
+                    + f' {time} outside service floors')
+
+            last_time, self.last_time = self.last_time, time
+            yield time - last_time, count, origin, destination
+
+    def discard_buffer(self):
+        """Method does nothing, replay draws no arrivals ahead"""
+        pass
+
+    def snapshot(self):
+        """Method returns the replay position as plain data"""
+        return {'position': self.position, 'last_time': self.last_time}
+
+    def restore(self, state):
+        """Method sets the replay position from snapshot"""
+        self.position = state['position']
+        self.last_time = state['last_time']
+
+
+def convert_trace(jsonl_path, npy_path, chunk_size: int = 65536):
+    """
+    Function converts a JSON lines trace into the columnar .npy form
+    read by TraceReplay. The file is counted first and then filled
+    through a memory map, so memory stays bounded.
+
+    :return: (int) number of rows written
+    """
+    source = TraceReplay(jsonl_path, chunk_size=chunk_size)
+    rows = sum(1 for _ in source.read_json_lines())
+
+    trace = np.lib.format.open_memmap(npy_path, mode='w+',
+        dtype=TRACE_DTYPE, shape=(rows,))
+    chunk = []
+    start = 0
+    for time, count, origin, destination in source.read_json_lines():
+        chunk.append((time, origin, destination, count))
+        if len(chunk) == chunk_size:
+            trace[start:start + len(chunk)] = chunk
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        trace[start:start + len(chunk)] = chunk
+    trace.flush()
+    del trace
+    return rows
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        print(f'Converted {convert_trace(sys.argv[1], sys.argv[2])} rows')
+    else:
+        print("Convert a trace to columnar form"+\
+        ": python tracereplay.py TRACE.jsonl TRACE.npy")
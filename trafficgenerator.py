@@ -1,13 +1,19 @@
 import numpy as np
 import random
+from collections import deque
 
 
 class TrafficGenerator:
     """Object of this class generates traffic requesting
     service from elevator(s)."""
-    def __init__(self, environment, dist_lambda: float, floors: tuple):
+    def __init__(self, environment, dist_lambda: float, floors: tuple,
+            chunk_size: int = 4096, streams=None):
         """
         Initialize the traffic object
+
+        :param streams: (dict) numpy.random.Generator of 'arrivals',
+            'od' and 'counts', see streams.RandomStreams, None draws
+            from the global random and np.random
         """
         self.env = environment
         if dist_lambda > 0:
@@ -20,7 +26,24 @@ class TrafficGenerator:
         else:
             raise TypeError("Floors must be of type tuple")
 
+        if len(floors) < 2:
+            raise ValueError("At least two floors are required")
+
+        if isinstance(chunk_size, int) and chunk_size >= 1:
+            self.chunk_size = chunk_size
+        else:
+            raise ValueError("Chunk size must be positive integer")
+
+        self.streams = streams
+
+        # arrivals drawn but not handed out yet, and time of the arrival
+        # next_traffic waits for, both part of a checkpoint
+        self.buffer = deque()
+        self.next_time = None
+
     def generate_time(self):
+        if self.streams is not None:
+            return self.streams['arrivals'].exponential(self.dist_lambda)
         return np.random.exponential(self.dist_lambda)
 
     @staticmethod
@@ -28,10 +51,17 @@ class TrafficGenerator:
         return random.randint(1, 6)
 
     def generate_origin_destination(self):
-        origin = random.choice(self.floors)
-        destination = random.choice([floor for floor in self.floors
-                                     if floor != origin])
-        return origin, destination
+        # same draws as random.choice on floors and then on the floors
+        # other than origin, without building that list
+        if self.streams is not None:
+            origin_index, destination_index = self.streams['od'].integers(
+                (len(self.floors), len(self.floors) - 1)).tolist()
+        else:
+            origin_index = random.randrange(len(self.floors))
+            destination_index = random.randrange(len(self.floors) - 1)
+        if destination_index >= origin_index:
+            destination_index += 1
+        return self.floors[origin_index], self.floors[destination_index]
 
     def time_out(self, time):
         """
@@ -48,8 +78,76 @@ class TrafficGenerator:
         at every call
         :return: count of people, origin floor, destination floor
         """
-        yield self.env.process(self.time_out(self.generate_time()))
-        count = random.randint(1, 6)
+        time = self.generate_time()
+        self.next_time = self.env.now + time
+        yield self.env.process(self.time_out(time))
+        self.next_time = None
+        return self.draw_request()
+
+    def draw_request(self):
+        """
+        Method draws the people count and floors of an arrival
+        :return: count of people, origin floor, destination floor
+        """
+        if self.streams is not None:
+            count = int(self.streams['counts'].integers(1, 7))
+        else:
+            count = random.randint(1, 6)
         origin, destination = self.generate_origin_destination()
 
         return count, origin, destination
+
+    def generate_chunk(self, size):
+        """
+        Method draws size arrivals at once
+        :param size: (int) number of arrivals
+        :return: lists of inter-arrival times, counts, origins and
+            destinations
+        """
+        floors = np.array(self.floors)
+        if self.streams is not None:
+            times = self.streams['arrivals'].exponential(self.dist_lambda,
+                size)
+            counts = self.streams['counts'].integers(1, 7, size)
+            od = self.streams['od'].integers(
+                (len(floors), len(floors) - 1), size=(size, 2))
+            origin_index, shift = od[:, 0], od[:, 1] + 1
+        else:
+            times = np.random.exponential(self.dist_lambda, size)
+            counts = np.random.randint(1, 7, size)
+            origin_index = np.random.randint(0, len(floors), size)
+            shift = np.random.randint(1, len(floors), size)
+        # shift by 1 to n-1 floors, so destination differs from origin
+        destination_index = (origin_index + shift) % len(floors)
+
+        return times.tolist(), counts.tolist(), \
+            floors[origin_index].tolist(), floors[destination_index].tolist()
+
+    def arrivals(self, start_time=0):
+        """
+        Generator of arrivals drawn chunk_size at a time, refilled lazily
+        when a chunk runs out. Meant to feed one long-lived process
+        instead of a process per arrival. The chunk is kept in buffer,
+        so a new generator resumes where the last one stopped.
+        :param start_time: unused, arrivals do not depend on the time of
+            day, as in ProfileTrafficGenerator and TraceReplay
+        :return: yields (inter-arrival time, count, origin, destination)
+        """
+        while True:
+            if not self.buffer:
+                self.buffer.extend(zip(*self.generate_chunk(self.chunk_size)))
+            yield self.buffer.popleft()
+
+    def discard_buffer(self):
+        """Method drops arrivals drawn ahead, the next ones are drawn
+        from the current state of np.random, or of the streams"""
+        self.buffer.clear()
+
+    def snapshot(self):
+        """Method returns the state of the generator as plain data"""
+        return {'buffer': list(self.buffer), 'next_time': self.next_time}
+
+    def restore(self, state):
+        """Method sets the state of the generator from snapshot"""
+        self.buffer = deque(state['buffer'])
+        self.next_time = state['next_time']
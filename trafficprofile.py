@@ -0,0 +1,296 @@
+import numpy as np
+from collections import deque
+
+
+class AliasTable:
+    """
+    Class: Walker/Vose alias table, draws from a discrete distribution
+    in O(1) per sample after O(n) setup
+    """
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=float)
+        if weights.ndim != 1 or len(weights) == 0:
+            raise ValueError('Weights must be a non empty vector')
+        if (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError('Weights must be non negative, not all zero')
+
+        n = len(weights)
+        scaled = weights*n/weights.sum()
+        self.probability = np.ones(n)
+        self.alias = np.arange(n)
+
+        small = [i for i in range(n) if scaled[i] < 1]
+        large = [i for i in range(n) if scaled[i] >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1
+            (small if scaled[more] < 1 else large).append(more)
+        # leftovers are 1 up to rounding
+        for i in small + large:
+            self.probability[i] = 1
+
+    def sample(self, size, rng=None):
+        """
+        Method draws size indices
+        :param rng: (numpy.random.Generator) drawn from, np.random if None
+        :return: (numpy.ndarray) of int
+        """
+        n = len(self.probability)
+        draws = (np.random.random(size) if rng is None
+            else rng.random(size))*n
+        index = draws.astype(np.int64)
+        np.minimum(index, n - 1, out=index)
+        keep = (draws - index) < self.probability[index]
+        return np.where(keep, index, self.alias[index])
+
+
+class Period:
+    """
+    Class: Stretch of a profile with constant arrival rate and fixed
+    origin/destination weights
+
+    :param start: time the period starts, relative to the profile cycle
+    :param rate: mean arrivals per time unit
+    :param od_matrix: n x n weights, od_matrix[i][j] for requests from
+        floors[i] to floors[j], the diagonal is ignored
+    """
+    def __init__(self, start, rate, od_matrix, name=None):
+        if rate < 0:
+            raise ValueError('Arrival rate cannot be negative')
+        self.start = start
+        self.rate = rate
+        self.name = name
+
+        od = np.array(od_matrix, dtype=float)
+        if od.ndim != 2 or od.shape[0] != od.shape[1] or od.shape[0] < 2:
+            raise ValueError('O/D matrix must be square, at least 2 x 2')
+        np.fill_diagonal(od, 0)
+        self.od_matrix = od
+        self.od_table = AliasTable(od.ravel())
+
+
+class ArrivalProfile:
+    """
+    Class: Non-homogeneous Poisson arrivals with a piecewise constant
+    rate that repeats every cycle (a day by default), plus per period
+    origin/destination matrices. Arrival times are drawn by inverting
+    the cumulative rate, which is exact and vectorizes, and O/D pairs
+    from per period alias tables.
+    """
+    def __init__(self, periods, cycle=24*3600):
+        periods = sorted(periods, key=lambda period: period.start)
+        if not periods or periods[0].start != 0:
+            raise ValueError('First period must start at 0')
+        if periods[-1].start >= cycle:
+            raise ValueError('Periods must start within the cycle')
+        sizes = {period.od_matrix.shape for period in periods}
+        if len(sizes) != 1:
+            raise ValueError('All periods need O/D matrices of same size')
+
+        self.periods = periods
+        self.cycle = cycle
+        self.starts = np.array([period.start for period in periods] + [cycle],
+            dtype=float)
+        self.rates = np.array([period.rate for period in periods])
+        # cumulative expected arrivals at each period start
+        self.hazard = np.concatenate([[0],
+            np.cumsum(self.rates*np.diff(self.starts))])
+        if self.hazard[-1] <= 0:
+            raise ValueError('Profile has no arrivals')
+        self.size = sizes.pop()[0]
+
+    def cumulative(self, time):
+        """Method returns expected arrivals from 0 to time"""
+        cycles, offset = divmod(time, self.cycle)
+        index = min(np.searchsorted(self.starts, offset, side='right') - 1,
+            len(self.periods) - 1)
+        return cycles*self.hazard[-1] + self.hazard[index] + \
+            self.rates[index]*(offset - self.starts[index])
+
+    def invert(self, hazard):
+        """
+        Method returns times at which expected arrivals reach hazard,
+        and the index of the period of each
+        """
+        cycles, offset = np.divmod(hazard, self.hazard[-1])
+        index = np.searchsorted(self.hazard, offset, side='right') - 1
+        np.minimum(index, len(self.periods) - 1, out=index)
+        within = (offset - self.hazard[index])/np.maximum(self.rates[index],
+            1e-300)
+        return cycles*self.cycle + self.starts[index] + within, index
+
+    def sample(self, start_time, size, streams=None):
+        """
+        Method draws the next size arrivals after start_time
+        :param streams: (dict) numpy.random.Generator of 'arrivals' and
+            'od', see streams.RandomStreams, np.random if None
+        :return: arrival times, period indices, origin and destination
+            indices (numpy arrays)
+        """
+        gaps = np.random.exponential(1.0, size) if streams is None \
+            else streams['arrivals'].exponential(1.0, size)
+        hazard = self.cumulative(start_time) + np.cumsum(gaps)
+        times, period_index = self.invert(hazard)
+        # guard rounding, times must not go back
+        np.maximum.accumulate(np.maximum(times, start_time), out=times)
+
+        pairs = np.empty(size, dtype=np.int64)
+        for index, period in enumerate(self.periods):
+            mask = period_index == index
+            count = int(mask.sum())
+            if count:
+                pairs[mask] = period.od_table.sample(count,
+                    None if streams is None else streams['od'])
+        origins, destinations = np.divmod(pairs, self.size)
+        return times, period_index, origins, destinations
+
+
+class ProfileTrafficGenerator:
+    """
+    Object of this class generates traffic following an ArrivalProfile,
+    with the same interface as TrafficGenerator
+    """
+    def __init__(self, environment, profile: ArrivalProfile, floors: tuple,
+            chunk_size: int = 4096, streams=None):
+        """
+        :param streams: (dict) numpy.random.Generator of 'arrivals',
+            'od' and 'counts', see streams.RandomStreams, None draws
+            from the global np.random
+        """
+        self.env = environment
+        if type(floors) == tuple:
+            self.floors = floors
+        else:
+            raise TypeError("Floors must be of type tuple")
+        if profile.size != len(floors):
+            raise ValueError("O/D matrices must match the number of floors")
+        self.profile = profile
+
+        if isinstance(chunk_size, int) and chunk_size >= 1:
+            self.chunk_size = chunk_size
+        else:
+            raise ValueError("Chunk size must be positive integer")
+        self.stream = None
+        self.streams = streams
+
+        # arrivals drawn but not handed out yet, and the time of the
+        # last one drawn, both part of a checkpoint
+        self.buffer = deque()
+        self.time = None
+
+    def generate_chunk(self, start_time, size):
+        """
+        Method draws size arrivals following start_time
+        :return: lists of inter-arrival times, counts, origins and
+            destinations
+        """
+        floors = np.array(self.floors)
+        times, _, origins, destinations = self.profile.sample(start_time,
+            size, self.streams)
+        gaps = np.diff(times, prepend=start_time)
+        counts = np.random.randint(1, 7, size) if self.streams is None \
+            else self.streams['counts'].integers(1, 7, size)
+        return gaps.tolist(), counts.tolist(), floors[origins].tolist(), \
+            floors[destinations].tolist()
+
+    def arrivals(self, start_time=0):
+        """
+        Generator of arrivals drawn chunk_size at a time. The chunk is
+        kept in buffer, so a new generator resumes where the last one
+        stopped, start_time only applies to the first.
+        :return: yields (inter-arrival time, count, origin, destination)
+        """
+        if self.time is None:
+            self.time = start_time
+        while True:
+            if not self.buffer:
+                chunk = self.generate_chunk(self.time, self.chunk_size)
+                self.time += sum(chunk[0])
+                self.buffer.extend(zip(*chunk))
+            yield self.buffer.popleft()
+
+    def next_traffic(self):
+        """
+        Method returns the next arrival of the profile, simpy process
+        :return: count of people, origin floor, destination floor
+        """
+        if self.stream is None:
+            self.stream = self.arrivals(self.env.now)
+        time, count, origin, destination = next(self.stream)
+        if time > 0:
+            yield self.env.timeout(time)
+        return count, origin, destination
+
+    def discard_buffer(self):
+        """Method drops arrivals drawn ahead, the next ones are drawn
+        from the current state of np.random, or of the streams"""
+        if self.buffer:
+            self.time -= sum(arrival[0] for arrival in self.buffer)
+            self.buffer.clear()
+
+    def snapshot(self):
+        """Method returns the state of the generator as plain data"""
+        return {'buffer': list(self.buffer), 'time': self.time}
+
+    def restore(self, state):
+        """Method sets the state of the generator from snapshot"""
+        self.buffer = deque(state['buffer'])
+        self.time = state['time']
+
+
+def uniform_od(floors):
+    """Returns O/D weights uniform over all pairs of floors"""
+    n = len(floors)
+    return np.ones((n, n)) - np.eye(n)
+
+
+def lobby_od(floors, lobby, share, inbound=True):
+    """
+    Returns O/D weights where share of the requests go from the lobby to
+    other floors (inbound) or from other floors to the lobby, and the
+    rest is uniform between all floors
+    """
+    n = len(floors)
+    lobby_index = floors.index(lobby)
+    od = uniform_od(floors)*(1 - share)/(n*(n - 1))
+    lobby_pairs = np.zeros((n, n))
+    if inbound:
+        lobby_pairs[lobby_index, :] = 1
+    else:
+        lobby_pairs[:, lobby_index] = 1
+    lobby_pairs[lobby_index, lobby_index] = 0
+    return od + lobby_pairs*share/(n - 1)
+
+
+def office_day(floors, peak_rate=0.5, lobby=None, hour=3600):
+    """
+    Function returns a daily office building profile: quiet night,
+    up-peak, inter-floor morning, lunch (both ways through the lobby),
+    inter-floor afternoon, down-peak, quiet evening
+
+    :param peak_rate: arrivals per time unit at up and down peak
+    :param lobby: lobby floor, lowest floor by default
+    :param hour: time units per hour
+    """
+    floors = tuple(floors)
+    lobby = floors[0] if lobby is None else lobby
+    quiet = uniform_od(floors)
+    lunch = (lobby_od(floors, lobby, 0.8, inbound=True) +
+        lobby_od(floors, lobby, 0.8, inbound=False))/2
+    return ArrivalProfile([
+        Period(0, peak_rate*0.02, quiet, 'night'),
+        Period(7*hour, peak_rate, lobby_od(floors, lobby, 0.85), 'up-peak'),
+        Period(9.5*hour, peak_rate*0.3, quiet, 'morning'),
+        Period(12*hour, peak_rate*0.7, lunch, 'lunch'),
+        Period(13.5*hour, peak_rate*0.3, quiet, 'afternoon'),
+        Period(16.5*hour, peak_rate,
+            lobby_od(floors, lobby, 0.85, inbound=False), 'down-peak'),
+        Period(18.5*hour, peak_rate*0.05, quiet, 'evening'),
+    ], cycle=24*hour)
+
+
+if __name__ == '__main__':
+    pass